@@ -0,0 +1,423 @@
+"""
+Adaptive quizzes: ask the most informative question until mastery is clear
+
+Every quiz item has a difficulty and a discrimination, and every topic an
+ability, on the scale of a three-parameter logistic (3PL) item response
+model: a learner of ability t answers an item right with probability
+
+    P(t) = c + (1 - c) / (1 + exp(-discrimination * (t - difficulty)))
+
+where c is the chance of guessing right (a quarter for multiple choice, a
+half for true/false, none for typed answers). calibrate() folds the quiz
+answers logged since its last run into these estimates, one answer at a
+time like an Elo rating, so keeping them current costs a few microseconds
+per new answer and never refits the history.
+
+An AdaptiveQuizSession keeps the learner's ability as a distribution over a
+grid of values, starting from the topic's estimate. The log probabilities
+of a right and a wrong answer and the Fisher information per squared
+discrimination depend on an item only through z = discrimination *
+(ability - difficulty), so they are tabulated once over a fine grid of z
+for each guessing chance. A session looks rows up in these tables instead
+of evaluating exponentials: the information of every question at a grid
+point of ability (filled the first time the estimate lands there) and the
+log probabilities of an answered question at every grid point. After each
+answer the distribution is updated by adding such a row, and the next
+question is the unasked one with the most information at the current
+estimate. The quiz stops as soon as the learner is at least CONFIDENCE
+sure to be above or below MASTERY_ABILITY, or the estimate is precise to
+STOP_ERROR, instead of after every question.
+
+Usage: python adaptive_quiz.py [calibrate|--self-check]
+"""
+
+import hashlib
+import math
+import time
+from array import array
+from functools import lru_cache
+
+from study_session import ASKING, FINISHED, QuizSession
+
+# Chance of answering right by guessing, per quiz kind
+GUESSING = {'mcq_questions': 0.25, 'true_false': 0.5, 'fill_blanks': 0.0}
+# Estimates of items nobody has answered yet
+DEFAULT_DIFFICULTY = 0.0
+DEFAULT_DISCRIMINATION = 1.0
+MIN_DISCRIMINATION = 0.25
+MAX_DISCRIMINATION = 3.0
+# Step sizes of the incremental updates: base / (1 + answers seen / RATE_HALF_LIFE), never below the floor.
+# Abilities keep a higher floor because learners keep learning.
+ITEM_RATE, ITEM_RATE_FLOOR = 0.6, 0.05
+ABILITY_RATE, ABILITY_RATE_FLOOR = 0.6, 0.15
+RATE_HALF_LIFE = 10.0
+
+# Ability grid of the session's estimate and the width of its prior around the topic's ability
+GRID = [i / 10.0 for i in range(-40, 41)]
+PRIOR_SD = 1.0
+# The quiz stops when the learner is this sure to be above or below the mastery ability...
+MASTERY_ABILITY = 0.5
+CONFIDENCE = 0.9
+# ...or the ability is known to this standard error, but never before MIN_QUESTIONS
+STOP_ERROR = 0.35
+MIN_QUESTIONS = 3
+# Grid of z = discrimination * (ability - difficulty) of the lookup tables
+Z_LIMIT = 15.0
+Z_STEP = 0.01
+
+def item_id(kind, item):
+    """Stable id of a quiz item, from its question and expected answer"""
+    return _item_id(kind, item['question'], item['correct'] if kind == 'mcq_questions' else item['answer'])
+
+@lru_cache(maxsize=65536)
+def _item_id(kind, question, expected):
+    return hashlib.sha1(f"{kind}\n{question}\n{expected}".encode("utf-8")).hexdigest()[:16]
+
+def probability(ability, difficulty, discrimination, guessing):
+    z = max(-30.0, min(30.0, discrimination * (ability - difficulty)))
+    return guessing + (1.0 - guessing) / (1.0 + math.exp(-z))
+
+def information(ability, difficulty, discrimination, guessing):
+    """Fisher information of an item about the ability of a learner at ability"""
+    p = probability(ability, difficulty, discrimination, guessing)
+    return discrimination ** 2 * ((p - guessing) / (1.0 - guessing)) ** 2 * (1.0 - p) / p
+
+def _z_tables(guessing):
+    """log P(right), log P(wrong) and information / discrimination^2 at every point of the z grid"""
+    log_right = array('d')
+    log_wrong = array('d')
+    unit_information = array('d')
+    for k in range(_Z_LAST + 1):
+        z = -Z_LIMIT + k * Z_STEP
+        p = probability(z, 0.0, 1.0, guessing)
+        log_right.append(math.log(p))
+        log_wrong.append(math.log(1.0 - p))
+        unit_information.append(information(z, 0.0, 1.0, guessing))
+    return log_right, log_wrong, unit_information
+
+_TABLES = {}
+
+def z_tables(guessing):
+    """The lookup tables of a guessing chance, built on first use"""
+    tables = _TABLES.get(guessing)
+    if tables is None:
+        tables = _TABLES[guessing] = _z_tables(guessing)
+    return tables
+
+_Z_LAST = int(round(2 * Z_LIMIT / Z_STEP))
+
+def _z_indices(difficulty, discrimination, grid=GRID):
+    """Table index of z at each ability of grid, which is evenly spaced, so the indices are too"""
+    start = (discrimination * (grid[0] - difficulty) + Z_LIMIT) / Z_STEP + 0.5
+    stride = discrimination * (grid[1] - grid[0]) / Z_STEP
+    last = _Z_LAST
+    return [min(last, max(0, int(start + g * stride))) for g in range(len(grid))]
+
+def _rate(base, floor, seen):
+    return max(floor, base / (1.0 + seen / RATE_HALF_LIFE))
+
+def update(ability, difficulty, discrimination, guessing, score, ability_rate, item_rate):
+    """One answer's gradient step on (ability, difficulty, discrimination); score is 0 to 1"""
+    z = max(-30.0, min(30.0, discrimination * (ability - difficulty)))
+    logistic = 1.0 / (1.0 + math.exp(-z))
+    p = min(max(guessing + (1.0 - guessing) * logistic, 1e-6), 1 - 1e-6)
+    # Derivative of the answer's log likelihood with respect to z
+    slope = (score - p) / (p * (1.0 - p)) * (1.0 - guessing) * logistic * (1.0 - logistic)
+    new_ability = ability + ability_rate * discrimination * slope
+    new_difficulty = difficulty - item_rate * discrimination * slope
+    new_discrimination = discrimination + 0.3 * item_rate * (ability - difficulty) * slope
+    return new_ability, new_difficulty, min(MAX_DISCRIMINATION, max(MIN_DISCRIMINATION, new_discrimination))
+
+def calibrate(store=None):
+    """
+    Update item and ability estimates with the quiz answers logged since the
+    last call; returns the number of answers used.
+
+    Answers logged without their expected answer (before it was stored)
+    cannot be matched to an item and are skipped.
+    """
+    if store is None:
+        from review_store import get_store
+        store = get_store()
+    after = int(store.get_meta('calibrated_until', 0))
+    attempts = store.attempts_since(after)
+    if not attempts:
+        return 0
+    stats = {}
+    changed = {}
+    abilities = store.abilities()
+    changed_abilities = {}
+    used = 0
+    for attempt_id, topic, kind, question, expected, score in attempts:
+        if not expected or kind not in GUESSING:
+            continue
+        kind_stats = stats.get(kind)
+        if kind_stats is None:
+            kind_stats = stats[kind] = store.item_stats(kind)
+        key = item_id(kind, {'question': question, 'answer': expected, 'correct': expected})
+        difficulty, discrimination, seen = kind_stats.get(key, (DEFAULT_DIFFICULTY, DEFAULT_DISCRIMINATION, 0))
+        ability, answers = changed_abilities.get(topic) or abilities.get(topic, (0.0, 0))
+        ability, difficulty, discrimination = update(
+            ability, difficulty, discrimination, GUESSING[kind], score,
+            _rate(ABILITY_RATE, ABILITY_RATE_FLOOR, answers), _rate(ITEM_RATE, ITEM_RATE_FLOOR, seen))
+        kind_stats[key] = changed.setdefault(kind, {})[key] = (difficulty, discrimination, seen + 1)
+        changed_abilities[topic] = (ability, answers + 1)
+        used += 1
+    for kind, kind_stats in changed.items():
+        store.save_item_stats(kind, kind_stats)
+    store.save_abilities(changed_abilities)
+    store.set_meta('calibrated_until', attempts[-1][0])
+    return used
+
+def load_estimates(kind, topic=None, store=None):
+    """(item stats of the kind, ability of the topic) after calibrating with the latest answers"""
+    if store is None:
+        from review_store import get_store
+        store = get_store()
+    calibrate(store)
+    ability = store.abilities().get(topic, (0.0, 0))[0] if topic is not None else 0.0
+    return store.item_stats(kind), ability
+
+class AdaptiveQuizSession(QuizSession):
+    """
+    A QuizSession that picks each question by its information about the
+    learner and stops once mastery is clear.
+
+    item_stats is {item_id: (difficulty, discrimination, attempts)} as
+    calibrate() keeps it and ability the topic's current estimate; see
+    load_estimates(). At most max_questions are asked (default: all).
+    """
+
+    def __init__(self, kind, questions, item_stats=None, ability=0.0, max_questions=None, on_answer=None,
+                 clock=time.time):
+        super().__init__(kind, questions, on_answer=on_answer, clock=clock)
+        item_stats = item_stats or {}
+        count = len(self.questions)
+        self.limit = count if max_questions is None else min(max_questions, count)
+        self.order = array('I')
+        self._asked = bytearray(count)
+        self._difficulty = array('d')
+        self._discrimination = array('d')
+        for item in self.questions:
+            difficulty, discrimination = item_stats.get(item_id(kind, item),
+                                                        (DEFAULT_DIFFICULTY, DEFAULT_DISCRIMINATION, 0))[:2]
+            self._difficulty.append(difficulty)
+            self._discrimination.append(discrimination)
+        self._log_right, self._log_wrong, self._unit_information = z_tables(GUESSING[kind])
+        # Grid point -> every question's information there, filled when the estimate first lands on it
+        self._information = {}
+        self._log_posterior = array('d', [-0.5 * ((t - ability) / PRIOR_SD) ** 2 for t in GRID])
+        self._estimate()
+
+    def __len__(self):
+        return self.limit
+
+    def submit(self, text):
+        result = super().submit(text)
+        index = self.order[self.position]
+        score = result['points']
+        log_right, log_wrong = self._log_right, self._log_wrong
+        posterior = self._log_posterior
+        for g, k in enumerate(_z_indices(self._difficulty[index], self._discrimination[index])):
+            posterior[g] += score * log_right[k] + (1.0 - score) * log_wrong[k]
+        self._estimate()
+        return result
+
+    def _information_at(self, grid_point):
+        row = self._information.get(grid_point)
+        if row is None:
+            t = GRID[grid_point]
+            unit = self._unit_information
+            last = _Z_LAST
+            row = self._information[grid_point] = array('d', [
+                discrimination * discrimination
+                * unit[min(last, max(0, int((discrimination * (t - difficulty) + Z_LIMIT) / Z_STEP + 0.5)))]
+                for difficulty, discrimination in zip(self._difficulty, self._discrimination)])
+        return row
+
+    def _estimate(self):
+        """Posterior mean, standard error and probability of mastery of the ability"""
+        top = max(self._log_posterior)
+        weights = [math.exp(value - top) for value in self._log_posterior]
+        total = sum(weights)
+        mean = sum(w * t for w, t in zip(weights, GRID)) / total
+        variance = sum(w * (t - mean) ** 2 for w, t in zip(weights, GRID)) / total
+        self.ability = mean
+        self.standard_error = math.sqrt(variance)
+        self.mastery = sum(w for w, t in zip(weights, GRID) if t >= MASTERY_ABILITY) / total
+
+    def _done(self):
+        answered = len(self.results)
+        if answered >= self.limit:
+            return True
+        if answered < MIN_QUESTIONS:
+            return False
+        return (self.mastery >= CONFIDENCE or self.mastery <= 1.0 - CONFIDENCE
+                or self.standard_error <= STOP_ERROR)
+
+    def _choose(self):
+        """Index of the unasked question with the most information at the current estimate"""
+        grid_point = min(len(GRID) - 1, max(0, round((self.ability - GRID[0]) * 10)))
+        row = self._information_at(grid_point)
+        asked = self._asked
+        best = None
+        best_information = -1.0
+        for index in range(len(row)):
+            if not asked[index] and row[index] > best_information:
+                best, best_information = index, row[index]
+        return best
+
+    def _advance(self):
+        index = None if self._done() else self._choose()
+        if index is None:
+            self.state = FINISHED
+            self.finished = self.clock()
+            return None
+        self.order.append(index)
+        self._asked[index] = 1
+        self.position += 1
+        self.state = ASKING
+        return self.prompt()
+
+    def summary(self):
+        summary = super().summary()
+        summary.update(ability=self.ability, standard_error=self.standard_error, mastery=self.mastery,
+                       available=len(self.questions))
+        return summary
+
+def format_mastery(summary):
+    """One line about the mastery estimate of an adaptive quiz's summary"""
+    verdict = "mastered" if summary['mastery'] >= CONFIDENCE else (
+        "not mastered yet" if summary['mastery'] <= 1.0 - CONFIDENCE else "not clear yet")
+    return (f"🧠 Topic {verdict}: {summary['mastery']:.0%} likely above the mastery level "
+            f"after {summary['answered']} of {summary['available']} questions")
+
+# --- Simulation, for the self-check and benchmarks/bench_adaptive.py ---
+
+def simulate_bank(kind, count, rng):
+    """count questions with true (difficulty, discrimination) and their item stats as calibrate() keeps them"""
+    questions = []
+    stats = {}
+    for number in range(count):
+        item = {'question': f"Question {number}?", 'answer': f"answer {number}", 'explanation': ""}
+        if kind == 'mcq_questions':
+            item = {'question': item['question'], 'options': [f"{letter}) option {number}" for letter in "ABCD"],
+                    'correct': "ABCD"[number % 4], 'explanation': ""}
+        elif kind == 'true_false':
+            item['answer'] = "True" if number % 2 else "False"
+        questions.append(item)
+        stats[item_id(kind, item)] = (rng.gauss(0.0, 1.0), rng.uniform(0.7, 2.0), 100)
+    return questions, stats
+
+def simulated_answer(kind, ability, stats, rng):
+    """Answer function for run_quiz of a learner of true ability"""
+    def answer(prompt, item):
+        difficulty, discrimination, _ = stats[item_id(kind, item)]
+        right = rng.random() < probability(ability, difficulty, discrimination, 0.0)
+        if kind == 'mcq_questions':
+            if right:
+                return item['correct']
+            return rng.choice("ABCD")
+        if kind == 'true_false':
+            truth = item['answer'].lower().startswith('true')
+            return "t" if (truth if right else rng.random() < 0.5) else "f"
+        return item['answer'] if right else "no idea"
+    return answer
+
+def _run_self_check():
+    """Recover item estimates from simulated answers and check adaptive quizzes stop early and classify well"""
+    import os
+    import random
+    import tempfile
+
+    from deck import Deck
+    from review_store import ReviewStore
+    from study_session import run_quiz
+
+    problems = []
+    rng = random.Random(0)
+    for t in (-2.0, 0.0, 1.5):
+        numeric = (math.log(probability(t + 1e-5, 0.3, 1.4, 0.25)) - math.log(probability(t - 1e-5, 0.3, 1.4, 0.25))) \
+            / 2e-5
+        p = probability(t, 0.3, 1.4, 0.25)
+        # Fisher information of a right/wrong answer: P'^2 / (P (1 - P))
+        expected = (numeric * p) ** 2 / (p * (1 - p))
+        if abs(information(t, 0.3, 1.4, 0.25) - expected) > 1e-4:
+            problems.append(f"information at {t} is {information(t, 0.3, 1.4, 0.25)}, expected {expected}")
+
+    # Calibration: 150 fill-in-the-blank items, 400 learners answering 30 of them each, in two batches
+    questions, truth = simulate_bank('fill_blanks', 150, rng)
+    learners = [rng.gauss(0.0, 1.0) for _ in range(400)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReviewStore(os.path.join(tmp, "reviews.sqlite3"))
+        used = 0
+        for batch in (learners[:200], learners[200:]):
+            for number, ability in enumerate(batch):
+                topic = f"learner{number}-{ability:.3f}"
+                for item in rng.sample(questions, 30):
+                    difficulty, discrimination, _ = truth[item_id('fill_blanks', item)]
+                    score = 1 if rng.random() < probability(ability, difficulty, discrimination, 0.0) else 0
+                    store.record_attempt(0.0, topic, 'fill_blanks', item['question'], "", score,
+                                         expected=item['answer'])
+            started = time.perf_counter()
+            used += calibrate(store)
+            seconds = time.perf_counter() - started
+        if used != 400 * 30 or calibrate(store) != 0:
+            problems.append(f"calibration used {used} answers, expected {400 * 30} once")
+        estimated = store.item_stats('fill_blanks')
+        store.close()
+    pairs = [(truth[key][0], estimated[key][0]) for key in truth if key in estimated]
+
+    def correlation(pairs):
+        n = len(pairs)
+        mx = sum(x for x, _ in pairs) / n
+        my = sum(y for _, y in pairs) / n
+        sxy = sum((x - mx) * (y - my) for x, y in pairs)
+        sxx = sum((x - mx) ** 2 for x, _ in pairs)
+        syy = sum((y - my) ** 2 for _, y in pairs)
+        return sxy / math.sqrt(sxx * syy)
+    difficulty_correlation = correlation(pairs)
+    if difficulty_correlation < 0.85:
+        problems.append(f"estimated difficulties correlate {difficulty_correlation:.2f} with the true ones")
+
+    # Adaptive quizzes over a 60-question bank with known items
+    questions, stats = simulate_bank('fill_blanks', 60, rng)
+    questions = Deck('fill_blanks', questions)
+    asked = []
+    correct = 0
+    learners = 300
+    started = time.perf_counter()
+    for _ in range(learners):
+        ability = rng.gauss(0.0, 1.2)
+        session = AdaptiveQuizSession('fill_blanks', questions, stats)
+        summary = run_quiz(session, simulated_answer('fill_blanks', ability, stats, rng))
+        asked.append(summary['answered'])
+        correct += (summary['mastery'] >= 0.5) == (ability >= MASTERY_ABILITY)
+    per_answer = (time.perf_counter() - started) / sum(asked) * 1e6
+    mean_asked = sum(asked) / learners
+    if mean_asked > 0.5 * len(questions) or correct / learners < 0.85:
+        problems.append(f"adaptive quizzes asked {mean_asked:.1f} of {len(questions)} questions "
+                        f"and classified {correct / learners:.0%} of learners right")
+
+    if problems:
+        print("❌ Adaptive quiz check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ Calibration recovers item difficulties (r = {difficulty_correlation:.2f}) at "
+          f"{seconds / (200 * 30) * 1e6:.0f} µs per answer")
+    print(f"✅ Adaptive quizzes asked {mean_asked:.1f} of {len(questions)} questions and classified "
+          f"{correct / learners:.0%} of learners right ({per_answer:.0f} µs per answer)")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    elif command == "calibrate":
+        started = time.perf_counter()
+        used = calibrate()
+        print(f"✅ Calibrated with {used} new answer(s) in {time.perf_counter() - started:.2f}s")
+    else:
+        print("Usage: python adaptive_quiz.py [calibrate|--self-check]")
@@ -1,84 +1,553 @@
+import json
 import os
+import threading
 from dotenv import load_dotenv
 import anthropic
 
+from artifact_parser import parse, validate, format_items
+from generation_engine import map_concurrent
+from map_reduce import map_reduce, generate_balanced, join_parts, chunk_text, estimate_tokens
+from response_cache import get_cache, make_key
+from request_scheduler import get_scheduler, GenerationError
+from llm_backend import make_client
+
 load_dotenv()
 API_KEY = os.getenv("ANTHROPIC_API_KEY")
-client = anthropic.Anthropic(api_key=API_KEY)
-
-def generate_summary(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates concise, well-structured summaries.",
-        messages=[
-            {"role": "user", "content": f"Create a comprehensive but concise summary of the following text. Include key points, main concepts, and important details:\n\n{text}"}
-        ],
+# The real API client, or an offline fake with SHRINX_BACKEND=fake. Retries are
+# handled by the request scheduler, which also paces requests to the rate limits.
+client = make_client(API_KEY)
+
+MODEL = "claude-3-5-sonnet-20241022"
+
+# Every artifact request for a document shares this system prompt and then
+# the document itself, marked with cache_control. That prefix is identical
+# across the seven artifact prompts, so after the first request the document
+# is read from the prompt cache instead of being billed and processed again.
+SYSTEM_PROMPT = "You are a helpful study assistant that turns course material into summaries, study notes, flashcards and quiz questions."
+
+# Prompts shorter than this are not cached by the API, so priming them is pointless
+MIN_CACHEABLE_TOKENS = 1024
+
+_usage_listeners = []
+
+# Long documents are split into chunks; each generator below works on one
+# chunk and the results are merged (summary, notes) or the requested number
+# of items is spread across the chunks (flashcards and questions). Pass
+# chunks from chunker.chunk_pdf to use section-aligned chunks from the PDF.
+
+def generate_summary(text, chunks=None):
+    return map_reduce(text, _summarize_chunk, _combine_summaries, chunks=chunks)
+
+def generate_notes(text, chunks=None):
+    return map_reduce(text, _notes_for_chunk, _combine_notes, chunks=chunks)
+
+def generate_flashcards(text, count=10, chunks=None):
+    return generate_balanced(text, count, _flashcards_for_chunk, separator="\n---\n", chunks=chunks)
+
+def generate_mcq_questions(text, count=5, chunks=None):
+    return generate_balanced(text, count, _mcq_for_chunk, chunks=chunks)
+
+def generate_fill_blanks(text, count=5, chunks=None):
+    return generate_balanced(text, count, _fill_blanks_for_chunk, chunks=chunks)
+
+def generate_true_false(text, count=5, chunks=None):
+    return generate_balanced(text, count, _true_false_for_chunk, chunks=chunks)
+
+def generate_qa_questions(text, count=5, chunks=None):
+    return generate_balanced(text, count, _qa_for_chunk, chunks=chunks)
+
+def _summarize_chunk(text):
+    return _request(
+        "summary",
+        template="Create a comprehensive but concise summary of the document above. Include key points, main concepts, and important details.",
+        text=text,
         max_tokens=800
     )
-    return response.content[0].text.strip()
-
-def generate_notes(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates detailed study notes.",
-        messages=[
-            {"role": "user", "content": f"Create detailed study notes from the following text. Organize with clear headings, bullet points, and key concepts:\n\n{text}"}
-        ],
-        max_tokens=1000
-    )
-    return response.content[0].text.strip()
-
-def generate_flashcards(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates flashcards for studying.",
-        messages=[
-            {"role": "user", "content": f"Create 10 flashcards from the following text. Format each as 'Q: [question]\\nA: [answer]\\n---\\n':\n\n{text}"}
-        ],
-        max_tokens=1200
-    )
-    return response.content[0].text.strip()
-
-def generate_mcq_questions(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates multiple choice questions with explanations.",
-        messages=[
-            {"role": "user", "content": f"Create 5 multiple choice questions based on this text. For each question, provide:\n- The question\n- Four options (A-D)\n- The correct answer\n- A brief explanation\n\nFormat: Q1: [question]\\nA) [option]\\nB) [option]\\nC) [option]\\nD) [option]\\nCorrect: [letter]\\nExplanation: [explanation]\\n\\n{text}"}
-        ],
-        max_tokens=1500
+
+def _combine_summaries(parts):
+    return _request(
+        "summary (combine)",
+        template="The following are summaries of consecutive sections of one document. Combine them into a single comprehensive but concise summary of the whole document. Include key points, main concepts, and important details:\n\n{text}",
+        text=join_parts(parts),
+        max_tokens=800,
+        cache_document=False
     )
-    return response.content[0].text.strip()
-
-def generate_fill_blanks(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates fill-in-the-blank questions.",
-        messages=[
-            {"role": "user", "content": f"Create 5 fill-in-the-blank questions from this text. Format each as:\\nQ: [question with ___ for blanks]\\nA: [answer]\\nExplanation: [brief explanation]\\n\\n{text}"}
-        ],
+
+def _notes_for_chunk(text):
+    return _request(
+        "notes",
+        template="Create detailed study notes from the document above. Organize with clear headings, bullet points, and key concepts.",
+        text=text,
         max_tokens=1000
     )
-    return response.content[0].text.strip()
-
-def generate_true_false(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates true/false questions.",
-        messages=[
-            {"role": "user", "content": f"Create 5 true/false questions from this text. Format each as:\\nQ: [statement]\\nA: [True/False]\\nExplanation: [explanation]\\n\\n{text}"}
-        ],
-        max_tokens=1000
+
+def _combine_notes(parts):
+    return _request(
+        "notes (combine)",
+        template="The following are study notes for consecutive sections of one document. Merge them into one set of detailed study notes, removing repetition. Organize with clear headings, bullet points, and key concepts:\n\n{text}",
+        text=join_parts(parts),
+        max_tokens=1000,
+        cache_document=False
+    )
+
+# Question style prompts; {count} is the number of items to ask for
+FLASHCARDS_TEMPLATE = "Create {count} flashcards from the document above. Format each as 'Q: [question]\\nA: [answer]\\n---\\n'"
+MCQ_TEMPLATE = "Create {count} multiple choice questions based on the document above. For each question, provide:\n- The question\n- Four options (A-D)\n- The correct answer\n- A brief explanation\n\nFormat: Q1: [question]\\nA) [option]\\nB) [option]\\nC) [option]\\nD) [option]\\nCorrect: [letter]\\nExplanation: [explanation]"
+FILL_BLANKS_TEMPLATE = "Create {count} fill-in-the-blank questions from the document above. Format each as:\\nQ: [question with ___ for blanks]\\nA: [answer]\\nExplanation: [brief explanation]"
+TRUE_FALSE_TEMPLATE = "Create {count} true/false questions from the document above. Format each as:\\nQ: [statement]\\nA: [True/False]\\nExplanation: [explanation]"
+QA_TEMPLATE = "Create {count} detailed question-answer pairs from the document above. Format each as:\\nQ: [question]\\nA: [detailed answer]"
+
+# Follow-up requests for items that were missing or unusable in a response
+MAX_REPAIR_ROUNDS = 2
+REPAIR_NOTE = "\n\nThese questions already exist, so cover different points:\n{questions}"
+
+def _flashcards_for_chunk(text, count):
+    return _generate_items("flashcards", FLASHCARDS_TEMPLATE, text, count, max_tokens=1200)
+
+def _mcq_for_chunk(text, count):
+    return _generate_items("mcq_questions", MCQ_TEMPLATE, text, count, max_tokens=1500)
+
+def _fill_blanks_for_chunk(text, count):
+    return _generate_items("fill_blanks", FILL_BLANKS_TEMPLATE, text, count, max_tokens=1000)
+
+def _true_false_for_chunk(text, count):
+    return _generate_items("true_false", TRUE_FALSE_TEMPLATE, text, count, max_tokens=1000)
+
+def _qa_for_chunk(text, count):
+    return _generate_items("qa_questions", QA_TEMPLATE, text, count, max_tokens=1500)
+
+def _generate_items(kind, template, text, count, max_tokens):
+    """
+    Generate count items of one kind for a chunk, topping up any that came back unusable.
+
+    The response is parsed and validated. If items are missing or
+    malformed, a follow-up request asks for just the missing number (the
+    document is already in the prompt cache, so it costs little) and the new
+    items are merged with the good ones. A complete response is returned as is.
+    """
+    response_text = _request(kind, template.format(count=count), text, max_tokens)
+    items, errors = parse(kind, response_text)
+    good, rejected = validate(kind, items)
+    if len(good) >= count and not errors and not rejected:
+        return response_text
+
+    for _ in range(MAX_REPAIR_ROUNDS):
+        missing = count - len(good)
+        if missing <= 0:
+            break
+        questions = "\n".join(f"- {item['question'][:120]}" for item in good)
+        instruction = template.format(count=missing) + (REPAIR_NOTE.format(questions=questions) if good else "")
+        try:
+            extra_text = _request(kind, instruction, text, min(max_tokens, max_tokens * missing // count + 200))
+        except GenerationError:
+            break  # keep the good items rather than fail the whole artifact
+        extra, _ = parse(kind, extra_text)
+        good, _ = validate(kind, good + extra)
+    if not good:
+        raise GenerationError(f"{kind} returned no usable items", kind)
+    return format_items(kind, good[:count])
+
+# Bundle mode: every artifact from a single request. The model fills in a
+# tool call whose input schema describes all seven artifacts, so the result
+# arrives as structured JSON instead of free text.
+
+BUNDLE_MAX_TOKENS = 8000
+BUNDLE_VERSION = 1
+
+class BundleError(Exception):
+    """The bundled response was truncated or unusable; fall back to per-artifact requests"""
+
+def _items_schema(properties, required):
+    return {"type": "array", "items": {"type": "object", "properties": properties, "required": required}}
+
+BUNDLE_TOOL = {
+    "name": "save_study_materials",
+    "description": "Save the study materials created from the document.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "Comprehensive but concise summary with key points, main concepts and important details."},
+            "notes": {"type": "string", "description": "Detailed study notes with clear headings, bullet points and key concepts."},
+            "flashcards": _items_schema(
+                {"question": {"type": "string"}, "answer": {"type": "string"}},
+                ["question", "answer"]),
+            "mcq_questions": _items_schema(
+                {"question": {"type": "string"},
+                 "options": {"type": "array", "items": {"type": "string"}, "minItems": 4, "maxItems": 4,
+                             "description": "Four options without letter prefixes."},
+                 "correct": {"type": "string", "enum": ["A", "B", "C", "D"]},
+                 "explanation": {"type": "string"}},
+                ["question", "options", "correct", "explanation"]),
+            "fill_blanks": _items_schema(
+                {"question": {"type": "string", "description": "Sentence with ___ for the blank."},
+                 "answer": {"type": "string"},
+                 "explanation": {"type": "string"}},
+                ["question", "answer", "explanation"]),
+            "true_false": _items_schema(
+                {"question": {"type": "string", "description": "A statement."},
+                 "answer": {"type": "boolean"},
+                 "explanation": {"type": "string"}},
+                ["question", "answer", "explanation"]),
+            "qa_questions": _items_schema(
+                {"question": {"type": "string"}, "answer": {"type": "string", "description": "Detailed answer."}},
+                ["question", "answer"]),
+        },
+        "required": ["summary", "notes", "flashcards", "mcq_questions", "fill_blanks", "true_false", "qa_questions"],
+    },
+}
+
+BUNDLE_COUNTS = {'flashcards': 10, 'mcq_questions': 5, 'fill_blanks': 5, 'true_false': 5, 'qa_questions': 5}
+
+def generate_bundle(text, chunks=None):
+    """
+    Generate every artifact in one request and return {name: structured value}.
+
+    Only artifacts that came back complete and well-formed are returned;
+    generate the missing ones with the per-artifact functions. Raises
+    BundleError when the response was truncated or had no tool call, and
+    when the document is too long for one request.
+    """
+    documents = chunks if chunks is not None else chunk_text(text)
+    if len(documents) > 1:
+        raise BundleError("document is split into several chunks; bundle mode needs a single request")
+    document = documents[0].text if documents and hasattr(documents[0], "text") else (documents[0] if documents else text)
+
+    instruction = ("Create study materials from the document above and save them with the save_study_materials tool: "
+                   "a summary, study notes, " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in BUNDLE_COUNTS.items()) + ".")
+    template = json.dumps({'instruction': instruction, 'tool': BUNDLE_TOOL}, sort_keys=True)
+    cache = get_cache()
+    key = make_key(MODEL, SYSTEM_PROMPT, template, BUNDLE_MAX_TOKENS, document)
+    cached = cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    response = _create(
+        "bundle",
+        messages=document_messages(document, instruction),
+        tools=[BUNDLE_TOOL],
+        tool_choice={"type": "tool", "name": BUNDLE_TOOL["name"]},
+        max_tokens=BUNDLE_MAX_TOKENS
     )
-    return response.content[0].text.strip()
-
-def generate_qa_questions(text):
-    response = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        system="You are a helpful assistant that creates question-answer pairs.",
-        messages=[
-            {"role": "user", "content": f"Create 5 detailed question-answer pairs from this text. Format each as:\\nQ: [question]\\nA: [detailed answer]\\n\\n{text}"}
-        ],
-        max_tokens=1500
+    if response.stop_reason == "max_tokens":
+        raise BundleError("bundled response was truncated")
+    tool_input = next((block.input for block in response.content if block.type == "tool_use"), None)
+    if not isinstance(tool_input, dict):
+        raise BundleError("response did not contain the study materials tool call")
+
+    bundle = validate_bundle(tool_input)
+    if bundle:
+        cache.put(key, json.dumps(bundle))
+    return bundle
+
+def validate_bundle(data):
+    """Keep only the artifacts that are present and well-formed"""
+    bundle = {}
+    for name in ('summary', 'notes'):
+        if isinstance(data.get(name), str) and data[name].strip():
+            bundle[name] = data[name].strip()
+
+    def items(name, check):
+        valid = [item for item in data.get(name) or [] if isinstance(item, dict) and check(item)]
+        if valid:
+            bundle[name] = valid
+
+    def filled(item, *fields):
+        return all(isinstance(item.get(field), str) and item[field].strip() for field in fields)
+
+    items('flashcards', lambda item: filled(item, 'question', 'answer'))
+    items('mcq_questions', lambda item: filled(item, 'question') and item.get('correct') in ('A', 'B', 'C', 'D')
+          and isinstance(item.get('options'), list) and len(item['options']) == 4)
+    items('fill_blanks', lambda item: filled(item, 'question', 'answer'))
+    items('true_false', lambda item: filled(item, 'question') and isinstance(item.get('answer'), bool))
+    items('qa_questions', lambda item: filled(item, 'question', 'answer'))
+    return bundle
+
+def format_artifact(name, value):
+    """Render a structured bundle artifact in the same text format as the per-artifact generators"""
+    if name in ('summary', 'notes'):
+        return value
+    if name == 'flashcards':
+        return "\n---\n".join(f"Q: {card['question']}\nA: {card['answer']}" for card in value)
+    if name == 'mcq_questions':
+        blocks = []
+        for i, q in enumerate(value, 1):
+            options = "\n".join(f"{letter}) {option}" for letter, option in zip("ABCD", q['options']))
+            blocks.append(f"Q{i}: {q['question']}\n{options}\nCorrect: {q['correct']}\nExplanation: {q.get('explanation', '')}")
+        return "\n\n".join(blocks)
+    if name in ('fill_blanks', 'true_false'):
+        return "\n\n".join(
+            f"Q: {q['question']}\nA: {q['answer'] if not isinstance(q['answer'], bool) else ('True' if q['answer'] else 'False')}"
+            f"\nExplanation: {q.get('explanation', '')}" for q in value)
+    return "\n\n".join(f"Q: {q['question']}\nA: {q['answer']}" for q in value)
+
+def bundle_sidecar(bundle):
+    """JSON document saved next to the text files in bundle mode"""
+    return json.dumps({'version': BUNDLE_VERSION, 'artifacts': bundle}, indent=2, ensure_ascii=False)
+
+def document_messages(document, instruction):
+    """User turn with the document as a cacheable prefix block followed by the instruction"""
+    return [
+        {"role": "user", "content": [
+            {"type": "text", "text": f"<document>\n{document}\n</document>", "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": instruction}
+        ]}
+    ]
+
+def _request(label, template, text, max_tokens, cache_document=True):
+    """
+    Send one generation request, reusing a stored response when possible.
+
+    With cache_document the text goes in the shared cacheable prefix and
+    template is the instruction that follows it; otherwise {text} in the
+    template is filled in and nothing is marked for prompt caching.
+    """
+    cache = get_cache()
+    key = make_key(MODEL, SYSTEM_PROMPT, template, max_tokens, text)
+    response_text = cache.get(key)
+    if response_text is not None:
+        return response_text
+
+    if cache_document:
+        messages = document_messages(text, template)
+    else:
+        messages = [{"role": "user", "content": template.format(text=text)}]
+    if _collected_requests is not None:
+        _defer(key, label, {'model': MODEL, 'system': SYSTEM_PROMPT, 'messages': messages, 'max_tokens': max_tokens})
+    response = _create(label, messages=messages, max_tokens=max_tokens)
+    response_text = response.content[0].text.strip() if response.content else ""
+    if not response_text:
+        raise GenerationError(f"{label} returned an empty response", label)
+    # Only complete responses are cached; a truncated one would be served again on every retry
+    if response.stop_reason != "max_tokens":
+        cache.put(key, response_text)
+    return response_text
+
+# Batch collection: while collecting, a request that is not in the response
+# cache is recorded instead of sent and the generator stops with
+# DeferredRequest. Once the batch results are stored in the response cache,
+# running the generators again gets further (e.g. from the per-chunk
+# requests to the combine step) until every artifact completes.
+
+class DeferredRequest(Exception):
+    """A generator needs a response that has not been fetched yet"""
+
+_collected_requests = None
+_collect_lock = threading.Lock()
+
+def start_collecting():
+    """Record uncached requests instead of sending them"""
+    global _collected_requests
+    _collected_requests = {}
+
+def stop_collecting():
+    """Stop collecting and return {cache_key: {'label': ..., 'params': messages.create kwargs}}"""
+    global _collected_requests
+    with _collect_lock:
+        collected, _collected_requests = _collected_requests or {}, None
+    return collected
+
+def _defer(key, label, params):
+    with _collect_lock:
+        if _collected_requests is not None:
+            _collected_requests[key] = {'label': label, 'params': params}
+    raise DeferredRequest(label)
+
+def store_batch_result(key, label, message):
+    """Save a message returned by a batch so the next generator run picks it up from the response cache"""
+    _report_usage(label, message.usage)
+    response_text = message.content[0].text.strip() if message.content else ""
+    if not response_text:
+        return False
+    # A truncated batch response is kept anyway; re-running the batch would cost as much again
+    get_cache().put(key, response_text)
+    return True
+
+def _create(label, messages, max_tokens, **kwargs):
+    """Send one messages request through the shared scheduler and report its token usage"""
+    estimated = estimate_tokens(SYSTEM_PROMPT + json.dumps(messages))
+    response = get_scheduler().create_message(
+        client,
+        label=label,
+        estimated_input_tokens=estimated,
+        model=MODEL,
+        system=SYSTEM_PROMPT,
+        messages=messages,
+        max_tokens=max_tokens,
+        **kwargs
     )
-    return response.content[0].text.strip()
\ No newline at end of file
+    _report_usage(label, response.usage)
+    return response
+
+def prime_document_cache(text, chunks=None):
+    """
+    Write each document chunk to the prompt cache with a one-token request.
+
+    Call this before firing the artifact requests in parallel: requests
+    sent at the same moment cannot read a cache entry that none of them has
+    written yet, so without priming every one of them pays a cache write.
+    """
+    if chunks is None:
+        chunks = chunk_text(text)
+    documents = [chunk.text if hasattr(chunk, "text") else chunk for chunk in chunks]
+    documents = [doc for doc in documents if estimate_tokens(doc) >= MIN_CACHEABLE_TOKENS]
+
+    def prime(document):
+        _create("cache warm-up", document_messages(document, "Reply with OK."), 1)
+
+    map_concurrent(prime, documents)
+    return len(documents)
+
+def add_usage_listener(listener):
+    """Register listener(record) to be called with the token usage of every API call"""
+    _usage_listeners.append(listener)
+
+def remove_usage_listener(listener):
+    if listener in _usage_listeners:
+        _usage_listeners.remove(listener)
+
+def _report_usage(label, usage):
+    record = {
+        'label': label,
+        'input_tokens': getattr(usage, "input_tokens", 0) or 0,
+        'output_tokens': getattr(usage, "output_tokens", 0) or 0,
+        'cache_creation_input_tokens': getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        'cache_read_input_tokens': getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
+    for listener in list(_usage_listeners):
+        listener(record)
+
+def format_usage(record):
+    """One-line summary of a usage record"""
+    return (f"{record['label']}: {record['cache_read_input_tokens']} cache read, "
+            f"{record['cache_creation_input_tokens']} cache write, "
+            f"{record['input_tokens']} uncached input, {record['output_tokens']} output tokens")
+
+def _run_stub_self_check():
+    """Run all seven generators against a local stub of the messages endpoint and check the request shape"""
+    import re
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from pathlib import Path
+
+    import request_scheduler
+    import response_cache
+
+    requests = []
+    throttled = []
+    seen_prefixes = set()
+    lock = threading.Lock()
+
+    def stub_items(instruction, number):
+        """The number of items asked for, except that the first flashcard reply leaves its last answer out"""
+        match = re.search(r"Create (\d+)", instruction)
+        count = int(match.group(1)) if match else 1
+        if "multiple choice" in instruction:
+            return "\n\n".join(f"Q{i}: Stub question {number}.{i}?\nA) One\nB) Two\nC) Three\nD) Four\nCorrect: A"
+                               for i in range(1, count + 1))
+        cards = [f"Q: Stub ___ question {number}.{i}?\nA: True" for i in range(1, count + 1)]
+        if "flashcards" in instruction and "already exist" not in instruction:
+            cards[-1] = cards[-1].split("\n")[0]
+        return "\n---\n".join(cards)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            content = body['messages'][0]['content']
+            usage = {'input_tokens': 20, 'output_tokens': 5,
+                     'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+            if isinstance(content, list) and content[0].get('cache_control'):
+                prefix = json.dumps([body['system'], content[0]['text']])
+                prefix_tokens = estimate_tokens(body['system'] + content[0]['text'])
+                with lock:
+                    hit = prefix in seen_prefixes
+                    seen_prefixes.add(prefix)
+                usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] = prefix_tokens
+            with lock:
+                requests.append(body)
+                # Throttle the first artifact request once to exercise the scheduler's retry path
+                throttle = len(requests) == 2
+                if throttle:
+                    throttled.append(body)
+            if throttle:
+                reply = json.dumps({'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'stub 429'}}).encode("utf-8")
+                self.send_response(429)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('retry-after', '0')
+                self.send_header('Content-Length', str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+                return
+            instruction = content[1]['text'] if isinstance(content, list) and len(content) > 1 else ""
+            reply = json.dumps({
+                'id': f"msg_{len(requests)}", 'type': 'message', 'role': 'assistant', 'model': body['model'],
+                'content': [{'type': 'text', 'text': stub_items(instruction, len(requests))}],
+                'stop_reason': 'end_turn', 'stop_sequence': None, 'usage': usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    global client
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = anthropic.Anthropic(api_key="stub-key", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0)
+
+    records = []
+    results = {}
+    add_usage_listener(records.append)
+    with tempfile.TemporaryDirectory() as tmp:
+        response_cache._default_cache = response_cache.ResponseCache(Path(tmp) / "responses.sqlite3")
+        request_scheduler._default_scheduler = request_scheduler.RequestScheduler(
+            rpm=10000, input_tpm=10 ** 9, output_tpm=10 ** 9)
+        document = ("The mitochondria is the powerhouse of the cell. " * 400).strip()
+        prime_document_cache(document)
+        for generate in (generate_summary, generate_notes, generate_flashcards, generate_mcq_questions,
+                         generate_fill_blanks, generate_true_false, generate_qa_questions):
+            results[generate.__name__] = generate(document)
+        response_cache._default_cache.close()
+        response_cache._default_cache = None
+    server.shutdown()
+
+    problems = []
+    prefixes = {json.dumps([r['system'], r['messages'][0]['content'][0]]) for r in requests}
+    if len(requests) != 10:
+        problems.append(f"expected 10 requests (1 warm-up + 7 artifacts + 1 retry + 1 repair), got {len(requests)}")
+    if len(records) != 9 or request_scheduler.get_scheduler().stats['retries'] != 1:
+        problems.append("the throttled request was not retried exactly once")
+    repairs = [r['messages'][0]['content'][1]['text'] for r in requests if "already exist" in r['messages'][0]['content'][1]['text']]
+    if len(repairs) != 1 or not repairs[0].startswith("Create 1 flashcards"):
+        problems.append("the flashcard with a missing answer was not requested again on its own")
+    if len(parse('flashcards', results['generate_flashcards'])[0]) != 10:
+        problems.append("the repaired flashcards were not merged with the good ones")
+    if len(prefixes) != 1:
+        problems.append(f"expected one shared system + document prefix, got {len(prefixes)}")
+    for r in requests:
+        blocks = r['messages'][0]['content']
+        if blocks[0].get('cache_control') != {'type': 'ephemeral'} or document not in blocks[0]['text']:
+            problems.append("document block is not first or not marked with cache_control")
+        if len(blocks) != 2 or 'cache_control' in blocks[1]:
+            problems.append("instruction must follow the document as a separate, uncached block")
+    if any(record['cache_read_input_tokens'] == 0 for record in records[1:]):
+        problems.append("artifact requests after the warm-up did not read the prompt cache")
+
+    for record in records:
+        print(f"  {format_usage(record)}")
+    if problems:
+        print("❌ Request shape check failed:")
+        for problem in sorted(set(problems)):
+            print(f"   - {problem}")
+        return False
+    print(f"✅ {len(requests)} requests (one retried after a 429, one repair) share one cached document prefix")
+    return True
+
+# Test function
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "--self-check":
+        sys.exit(0 if _run_stub_self_check() else 1)
+    print("Usage: python ai_utils.py --self-check")
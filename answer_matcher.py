@@ -0,0 +1,469 @@
+"""
+Grading of typed answers to fill-in-the-blank questions
+
+Answers are compared after normalization: Unicode compatibility forms and
+accents are folded, case and punctuation dropped, thousands separators and
+trailing ".0" removed from numbers, number words up to a hundred turned
+into digits and every word lightly stemmed, so "Mitochondria." and
+"mitochondrion", "1,000" and "1000" or "three" and "3" are the same answer.
+Signs of numbers and charges of ions are kept ("-40", "10^-3", "Cl-"), and
+numbers are never forgiven as typos.
+
+An answer is correct when it equals one of the accepted variants (the
+whole answer, alternatives separated by ";", "or" or a "/" between two
+words, and the text inside or outside parentheses; fractions and units
+such as "3/4" and "km/h" stay one word) or is within a typo budget of one edit, by
+a banded edit distance (Levenshtein with swapped letters counted as one
+edit) that gives up as soon as the budget is exceeded. Stems are compared
+exactly and typos are looked for in the unstemmed words. Typos never
+change the first or last letters of a word, which is where technical terms
+differ (chloride/chlorine, nitrate/nitrite, efferent/afferent,
+abduction/adduction, ionic/ironic); only doubled letters and two swapped
+neighbours are forgiven there. At most one typo is forgiven per answer,
+since prefixes of opposite meaning are often two edits apart
+(hypotonic/hypertonic, exothermic/endothermic). It is partly correct when
+most of the answer's words appear in it, each allowing one typo. The
+variants of an answer are worked out once and cached, so grading a
+response takes a few microseconds and whole quiz histories can be
+regraded in bulk.
+
+Usage: python answer_matcher.py [regrade|--self-check]
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+CORRECT = 'correct'
+PARTIAL = 'partial'
+WRONG = 'wrong'
+SCORES = {CORRECT: 1, PARTIAL: 0.5, WRONG: 0}
+
+# Share of the answer's words a response must contain to be partly correct
+PARTIAL_RATIO = 0.6
+
+_NUMBER_WORDS = {
+    word: str(value) for value, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+        "sixteen seventeen eighteen nineteen twenty".split())
+}
+_NUMBER_WORDS.update({'thirty': '30', 'forty': '40', 'fifty': '50', 'sixty': '60', 'seventy': '70',
+                      'eighty': '80', 'ninety': '90', 'hundred': '100'})
+_FILLERS = frozenset(('a', 'an', 'the', 'and'))
+
+_COMBINING = re.compile(r"[̀-ͯ]")
+_THOUSANDS = re.compile(r"(?<=\d)[,_](?=\d{3}(?!\d))")
+_DECIMAL_ZEROS = re.compile(r"(?<=\d)(\.\d*?)0+(?!\d)")
+# Words are runs of letters and digits; a point between digits, a slash inside a
+# fraction or unit ("3/4", "m/s"), an exponent ("10^-3"), the sign of a number
+# ("-40") and the charge of an ion ("Cl-", "Ca2+") are kept as part of the word
+_WORDS = re.compile(r"(?:(?<![^\W_])[-+](?=\d))?[^\W_]+(?:(?:(?<=\d)\.(?=\d)|/|\^[-+]?)[^\W_]+)*"
+                    r"(?:[-+](?![^\W_]))?")
+_PLUS = re.compile(r"(?:^|(?<=\^))\+")
+_SLASH_SPACES = re.compile(r"(?<=[^\W_])\s*/\s*(?=[^\W_])")
+_ALTERNATIVES = re.compile(r"\s*(?:;|\bor\b)\s*")
+# A slash between two words separates alternative answers ("glucose/sugar"),
+# unless either word is a number or a unit ("3/4", "m/s", "km/h", "mol/L")
+_SLASH = re.compile(r"([^\W_]+)\s*/\s*(?=([^\W_]+))")
+_UNITS = frozenset(
+    "m cm mm km nm s ms min h hr day yr year g mg kg l ml mol mmol j kj cal kcal n w kw v a pa kpa "
+    "atm hz k c mph kph".split())
+_PARENTHESES = re.compile(r"\(([^()]*)\)")
+
+# Longest first; (suffix, replacement). Covers English plurals and verb forms and the
+# Latin and Greek endings common in science (bacterium/bacteria, nucleus/nuclei)
+_SUFFIXES = (
+    ('ations', ''), ('ation', ''), ('ions', ''), ('uses', ''), ('ies', 'y'), ('ium', ''), ('ion', ''),
+    ('ing', ''), ('ia', ''), ('ae', ''), ('um', ''), ('us', ''), ('es', ''), ('ed', ''), ('ly', ''),
+    ('a', ''), ('i', ''), ('e', ''), ('s', ''),
+)
+# Shortest stem a suffix may leave: shorter stems of unrelated words collide
+# (soda/sodium, date/data, visa/vision, act/action). Plurals may leave three (cats/cat, fixes/fix).
+MIN_STEM = 4
+_SIBILANT_PLURAL = re.compile(r"(?:[sxz]|ch|sh)es$")
+
+# Letters at the start and end of a word that the typo budget may not change
+START = 3
+ENDING = 3
+_REPEATS = re.compile(r"(.)\1+")
+
+def _drop_decimal_zeros(match):
+    # "2.50" -> "2.5", "3.0" -> "3"
+    digits = match.group(1)
+    return "" if digits == "." else digits
+
+def normalize(text):
+    """Words of text after folding case, accents, punctuation and number formats"""
+    text = _COMBINING.sub("", unicodedata.normalize("NFKD", text)).casefold()
+    text = text.replace("%", " percent ").replace("\u2212", "-")
+    text = _DECIMAL_ZEROS.sub(_drop_decimal_zeros, _THOUSANDS.sub("", text))
+    # "+40" and "10^+3" are the same numbers as "40" and "10^3"
+    words = [_NUMBER_WORDS.get(word, word) for word in
+             (_PLUS.sub("", word) if word[-1].isdigit() else word
+              for word in _WORDS.findall(_SLASH_SPACES.sub("/", text)))]
+    if len(words) > 1:
+        words = [word for word in words if word not in _FILLERS] or words
+    return words
+
+def stem(word):
+    """Light suffix stripping that maps singular and plural forms to one stem"""
+    if len(word) <= 3 or word[-1].isdigit():
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        plural = suffix == 's' or (suffix == 'es' and _SIBILANT_PLURAL.search(word))
+        if len(word) - len(suffix) >= (3 if plural else MIN_STEM):
+            if suffix == 's' and word.endswith('ss'):
+                return word
+            return word[:-len(suffix)] + replacement
+    return word
+
+def stems(text):
+    return [stem(word) for word in normalize(text)]
+
+def bounded_distance(a, b, limit):
+    """
+    Edit distance of a and b, or limit + 1 as soon as it is known to be larger.
+
+    Insertions, deletions, substitutions and swaps of two neighbouring
+    letters each count as one edit (optimal string alignment).
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    length_a, length_b = len(a), len(b)
+    over = limit + 1
+    if length_b - length_a > limit:
+        return over
+    before = None
+    previous = list(range(length_b + 1))
+    for i in range(1, length_a + 1):
+        # Only cells within `limit` of the diagonal can stay within the budget
+        low = max(1, i - limit)
+        high = min(length_b, i + limit)
+        current = [over] * (length_b + 1)
+        current[0] = i if i <= limit else over
+        best = current[0]
+        char = a[i - 1]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if j > 1 and before is not None and char == b[j - 2] and a[i - 2] == b[j - 1] \
+                    and before[j - 2] + 1 < value:
+                value = before[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        before, previous = previous, current
+    return previous[length_b] if previous[length_b] <= limit else over
+
+def _singular(word):
+    return word[:-1] if word.endswith('s') else word
+
+def _ends_with(typed, ending):
+    """Whether typed ends with ending, as typed or with two neighbouring letters swapped"""
+    if typed.endswith(ending):
+        return True
+    for i in range(max(0, len(typed) - len(ending) - 1), len(typed) - 1):
+        if (typed[:i] + typed[i + 1] + typed[i] + typed[i + 2:]).endswith(ending):
+            return True
+    return False
+
+def same_ending(typed, word):
+    """
+    Whether typed ends like word: their last ENDING letters are equal,
+    allowing a swap of two neighbouring letters, doubled letters and a
+    plural "s".
+    """
+    for typed, word in ((typed, word), (_singular(typed), _singular(word))):
+        if _ends_with(typed, word[-ENDING:]) or \
+                _ends_with(_REPEATS.sub(r"\1", typed), _REPEATS.sub(r"\1", word)[-ENDING:]):
+            return True
+    return False
+
+def same_start(typed, word):
+    """
+    Whether typed starts like word: their first START letters are equal,
+    allowing a swap of two neighbouring letters and doubled letters.
+    """
+    start = word[:START][::-1]
+    if _ends_with(typed[::-1], start):
+        return True
+    return _ends_with(_REPEATS.sub(r"\1", typed)[::-1], _REPEATS.sub(r"\1", word)[:START][::-1])
+
+def same_edges(typed, word):
+    """Whether typed starts and ends like word; numbers must be equal"""
+    if any(char.isdigit() for char in typed + word):
+        return typed == word
+    return same_start(typed, word) and same_ending(typed, word)
+
+def same_endings(typed, words):
+    """same_edges for every word of two phrases, or for the whole phrases if their words do not line up"""
+    if len(typed) != len(words):
+        return same_edges("".join(typed), "".join(words))
+    return all(same_edges(a, b) for a, b in zip(typed, words))
+
+def typo_budget(text):
+    """Edits allowed when comparing against text: none for short words, one otherwise"""
+    return 0 if len(text) < 5 else 1
+
+def _is_term(word):
+    """Whether word can be one of two alternatives around a slash, i.e. is no number or unit"""
+    return not any(char.isdigit() for char in word) and word.casefold() not in _UNITS
+
+def split_alternatives(form):
+    """The alternatives in form, separated by ";", "or" or a slash between two terms"""
+    alternatives = []
+    for part in _ALTERNATIVES.split(form):
+        start = 0
+        for match in _SLASH.finditer(part):
+            if _is_term(match.group(1)) and _is_term(match.group(2)):
+                alternatives.append(part[start:match.end(1)])
+                start = match.end()
+        alternatives.append(part[start:])
+    return alternatives
+
+def variants(answer):
+    """Accepted forms of an answer: whole, each alternative, and with or without its parentheses"""
+    forms = [answer]
+    inside = _PARENTHESES.findall(answer)
+    outside = _PARENTHESES.sub(" ", answer)
+    forms.append(outside)
+    forms.extend(inside)
+    for form in list(forms):
+        forms.extend(split_alternatives(form))
+    return forms
+
+class AnswerKey:
+    """The accepted variants of one answer, normalized once"""
+    __slots__ = ('answer', 'exact', 'near', 'words')
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.exact = set()
+        self.near = []
+        for form in variants(answer):
+            words = normalize(form)
+            key = " ".join(stem(word) for word in words)
+            if key and key not in self.exact:
+                self.exact.add(key)
+                text = " ".join(words)
+                budget = typo_budget(text)
+                if budget:
+                    self.near.append((text, budget, words))
+        self.words = set(stems(_PARENTHESES.sub(" ", answer))) or set(stems(answer))
+
+    def grade(self, response):
+        """CORRECT, PARTIAL or WRONG"""
+        typed = normalize(response)
+        if not typed:
+            return WRONG
+        words = [stem(word) for word in typed]
+        if " ".join(words) in self.exact:
+            return CORRECT
+        text = " ".join(typed)
+        for variant, budget, variant_words in self.near:
+            if bounded_distance(text, variant, budget) <= budget and same_endings(typed, variant_words):
+                return CORRECT
+        if not self.words:
+            return WRONG
+        matched = 0
+        for word in self.words:
+            if word in words or (len(word) >= 5 and any(bounded_distance(word, other, 1) <= 1
+                                                         and same_edges(other, word) for other in words)):
+                matched += 1
+        return PARTIAL if matched / len(self.words) >= PARTIAL_RATIO else WRONG
+
+@lru_cache(maxsize=8192)
+def answer_key(answer):
+    """AnswerKey of an answer, built once per distinct answer"""
+    return AnswerKey(answer)
+
+def grade_answer(response, answer):
+    return answer_key(answer).grade(response)
+
+def regrade(store=None, kinds=('fill_blanks',)):
+    """Re-score stored quiz answers with the current matcher; returns (attempts checked, scores changed)"""
+    if store is None:
+        from review_store import get_store
+        store = get_store()
+    checked = 0
+    changed = []
+    for attempt_id, kind, expected, response, score in store.quiz_attempts(kinds):
+        if not expected:
+            continue
+        checked += 1
+        new_score = SCORES[grade_answer(response, expected)]
+        if new_score != score:
+            changed.append((new_score, attempt_id))
+    store.update_scores(changed)
+    return checked, len(changed)
+
+def _run_self_check():
+    """Grade known cases, compare the banded distance with a full one and time bulk grading"""
+    import random
+    import time
+
+    problems = []
+    cases = [
+        ("mitochondria.", "mitochondrion", CORRECT),
+        ("Mitochondria", "mitochondria", CORRECT),
+        ("the nucleus", "Nuclei", CORRECT),
+        ("bacteria", "bacterium", CORRECT),
+        ("1,000", "1000", CORRECT),
+        ("three", "3", CORRECT),
+        ("2.50", "2.5", CORRECT),
+        ("50%", "50 percent", CORRECT),
+        ("Café", "cafe", CORRECT),
+        ("ATP", "adenosine triphosphate (ATP)", CORRECT),
+        ("adenosine triphosphate", "adenosine triphosphate (ATP)", CORRECT),
+        ("chlorophyl", "chlorophyll", CORRECT),
+        ("photosynthesiss", "photosynthesis", CORRECT),
+        ("glucose", "glucose / sugar", CORRECT),
+        ("sugar", "glucose / sugar", CORRECT),
+        ("light reaction", "the light reactions", CORRECT),
+        ("Calvin", "Calvin cycle", WRONG),
+        ("the Calvin cycle in plants", "Calvin cycle", PARTIAL),
+        ("carbon dioxide water", "carbon dioxide and water", CORRECT),
+        ("oxygen", "carbon dioxide", WRONG),
+        ("ATP", "ADP", WRONG),
+        ("cat", "cut", WRONG),
+        ("oxgyen", "oxygen", CORRECT),
+        ("ccyle", "cycle", CORRECT),
+        ("enzmye", "enzyme", CORRECT),
+        ("", "anything", WRONG),
+        ("12", "21", WRONG),
+        ("DNA", "RNA", WRONG),
+        ("enzymes", "enzyme", CORRECT),
+        ("cats", "cat", CORRECT),
+        ("fixes", "fix", CORRECT),
+        ("Stomaat", "Stomata", CORRECT),
+        ("grene", "green", CORRECT),
+        ("the genes", "gene", CORRECT),
+        ("sodium chlorid", "sodium chloride", CORRECT),
+        # Endings tell these apart, and short stems must not collide
+        ("chlorine", "chloride", WRONG),
+        ("nitrate", "nitrite", WRONG),
+        ("nitrite", "nitrate", WRONG),
+        ("sulfate", "sulfite", WRONG),
+        ("ethane", "ethene", WRONG),
+        ("ethene", "ethyne", WRONG),
+        ("ethane", "ethyne", WRONG),
+        ("alkane", "alkene", WRONG),
+        ("soda", "sodium", WRONG),
+        ("date", "data", WRONG),
+        ("vision", "visa", WRONG),
+        ("action", "act", WRONG),
+        ("sodium chlorine", "sodium chloride", WRONG),
+        # Prefixes of opposite meaning differ by one or two edits near the start
+        ("hypotonic", "hypertonic", WRONG),
+        ("hypertonic", "hypotonic", WRONG),
+        ("exothermic", "endothermic", WRONG),
+        ("hypoglycemia", "hyperglycemia", WRONG),
+        ("hypothyroidism", "hyperthyroidism", WRONG),
+        ("efferent", "afferent", WRONG),
+        ("afferent", "efferent", WRONG),
+        ("abduction", "adduction", WRONG),
+        ("absorption", "adsorption", WRONG),
+        ("ionic", "ironic", WRONG),
+        ("ironic", "ionic", WRONG),
+        ("efferent neurons", "afferent neurons", WRONG),
+        # Fractions and units are one answer, not alternatives
+        ("3/4", "3/4", CORRECT),
+        ("3 / 4", "3/4", CORRECT),
+        ("3", "3/4", WRONG),
+        ("4", "3/4", WRONG),
+        ("2", "1/2", WRONG),
+        ("1/2", "1/2", CORRECT),
+        ("m/s", "m/s", CORRECT),
+        ("m", "m/s", WRONG),
+        ("s", "m/s", WRONG),
+        ("km", "km/h", WRONG),
+        ("km/h", "km/h", CORRECT),
+        ("9.8 m/s", "9.8 m/s", CORRECT),
+        ("9.8 m/s north", "9.8 m/s", PARTIAL),
+        ("sugar", "glucose/sugar", CORRECT),
+        ("DNA", "DNA / RNA", CORRECT),
+        # Signs and charges are part of the answer
+        ("-40", "40", WRONG),
+        ("40", "-40", WRONG),
+        ("-40", "-40", CORRECT),
+        ("−40", "-40", CORRECT),
+        ("+40", "40", CORRECT),
+        ("10^-3", "10^3", WRONG),
+        ("10^3", "10^-3", WRONG),
+        ("10^+3", "10^3", CORRECT),
+        ("Cl+", "Cl-", WRONG),
+        ("Cl", "Cl-", WRONG),
+        ("Cl-", "Cl-", CORRECT),
+        ("Ca2+", "Ca2+", CORRECT),
+        ("Ca+", "Ca2+", WRONG),
+        ("5-10", "5 to 10", PARTIAL),
+        ("40000", "4000", WRONG),
+        ("carbon-dioxide", "carbon dioxide", CORRECT),
+    ]
+    for response, answer, expected in cases:
+        verdict = grade_answer(response, answer)
+        if verdict != expected:
+            problems.append(f"{response!r} for {answer!r} graded {verdict}, expected {expected}")
+
+    def full_distance(a, b):
+        before = None
+        previous = list(range(len(b) + 1))
+        for i, char in enumerate(a, 1):
+            current = [i]
+            for j, other in enumerate(b, 1):
+                value = min(previous[j - 1] + (char != other), previous[j] + 1, current[j - 1] + 1)
+                if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                    value = min(value, before[j - 2] + 1)
+                current.append(value)
+            before, previous = previous, current
+        return previous[-1]
+
+    rng = random.Random(0)
+    for _ in range(3000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randrange(9)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randrange(9)))
+        limit = rng.randrange(4)
+        if bounded_distance(a, b, limit) != min(full_distance(a, b), limit + 1):
+            problems.append(f"bounded distance of {a!r} and {b!r} within {limit} is wrong")
+            break
+
+    answers = [answer for _, answer, _ in cases]
+    responses = [response for response, _, _ in cases]
+    count = 100000
+    pairs = [(rng.choice(responses), rng.choice(answers)) for _ in range(count)]
+    started = time.perf_counter()
+    for response, answer in pairs:
+        grade_answer(response, answer)
+    per_answer = (time.perf_counter() - started) / count * 1e6
+    if per_answer > 1000:
+        problems.append(f"grading takes {per_answer:.0f} µs per answer")
+
+    if problems:
+        print("❌ Answer matcher check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ {len(cases)} grading cases pass; {per_answer:.1f} µs per answer over {count} random answers")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    elif command == "regrade":
+        import time
+        started = time.perf_counter()
+        checked, changed = regrade()
+        print(f"✅ Regraded {checked} answer(s) in {time.perf_counter() - started:.2f}s; {changed} score(s) changed")
+    else:
+        print("Usage: python answer_matcher.py [regrade|--self-check]")
@@ -0,0 +1,340 @@
+"""
+Single-pass parser for every question and flashcard format
+
+One compiled pattern per format matches a complete well-formed block
+(question, options, answer, correct letter, explanation) together with the
+blank and separator lines before it, so on regular output the parser
+matches block after block without ever searching. Irregular text - blocks
+with blank lines or wrapped lines inside them, fields in an unusual order,
+or genuinely malformed output - goes to a line tokenizer: every line is
+classified by one compiled pattern and fed to a small state machine. A
+block starts at its question line, so blank lines inside it do not break
+it and plain text lines continue the field above them. Blocks that still
+cannot be completed are reported as ParseErrors with their line number
+instead of being silently dropped.
+
+The same state machine parses text that is still streaming in
+(LineParser.feed), so streamed and complete texts give identical items.
+"""
+
+import re
+
+KINDS = ('mcq_questions', 'fill_blanks', 'true_false', 'qa_questions', 'flashcards')
+
+_QUESTION = r"Q(?:uestion)?[ \t]*\d*[ \t]*[:.]"
+
+# Line tokenizer: one alternative per line type, the named group that matched says which
+LINE_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"-{3,}[ \t\r]*$(?P<separator>)"
+    rf"|{_QUESTION}(?P<question>.*)"
+    r"|(?P<letter>[A-D])\)(?P<option>.*)"
+    r"|A:(?P<answer>.*)"
+    r"|Correct(?: [Aa]nswer)?:(?P<correct>.*)"
+    r"|Explanation:(?P<explanation>.*)"
+    r"|\r?$(?P<blank>)"
+    r"|(?P<text>.*)"
+    r")",
+    re.MULTILINE
+)
+
+
+# Field values are captured without surrounding whitespace so items need no stripping
+_VALUE = r"[ \t]*(\S(?:.*\S)?)[ \t\r]*"
+_OPTIONAL_VALUE = r"[ \t]*(\S(?:.*\S)?)?[ \t\r]*"
+# Blank and separator lines before a block are consumed with it, so blocks match back to back
+_BLOCK_START = rf"\s*(?:^[ \t]*-{{3,}}[ \t\r]*$\s*)*^[ \t]*{_QUESTION}{_VALUE}\n"
+_ANSWER_BLOCK = rf"{_BLOCK_START}[ \t]*A:{_VALUE}"
+
+BLOCK_PATTERNS = {
+    'mcq_questions': re.compile(
+        _BLOCK_START +
+        rf"[ \t]*A\){_OPTIONAL_VALUE}\n"
+        rf"[ \t]*B\){_OPTIONAL_VALUE}\n"
+        rf"[ \t]*C\){_OPTIONAL_VALUE}\n"
+        rf"[ \t]*D\){_OPTIONAL_VALUE}\n"
+        r"[ \t]*Correct(?: [Aa]nswer)?:[ \t]*([A-Da-d]).*"
+        rf"(?:\n[ \t]*Explanation:{_OPTIONAL_VALUE})?",
+        re.MULTILINE
+    ),
+    'fill_blanks': re.compile(rf"{_ANSWER_BLOCK}(?:\n[ \t]*Explanation:{_OPTIONAL_VALUE})?", re.MULTILINE),
+    'flashcards': re.compile(_ANSWER_BLOCK, re.MULTILINE),
+}
+BLOCK_PATTERNS['true_false'] = BLOCK_PATTERNS['qa_questions'] = BLOCK_PATTERNS['fill_blanks']
+
+# Candidate block starts; the leading newline lets the regex engine skip ahead quickly
+_QUESTION_LINE = re.compile(rf"\n[ \t]*{_QUESTION}")
+# A block has ended when only a new question, a separator or the end of the text follows it
+BLOCK_END = re.compile(rf"\s*(?:\Z|-{{3,}}[ \t\r]*$|{_QUESTION})", re.MULTILINE)
+CORRECT_LETTER = re.compile(r"[A-D]")
+# Text after the last well-formed block that holds nothing but blank lines and separators
+_EMPTY_GAP = re.compile(r"[\s-]*")
+
+class ParseError:
+    """A block that could not be parsed: its first line number, question and the reason"""
+    __slots__ = ('line', 'question', 'message')
+
+    def __init__(self, line, question, message):
+        self.line = line
+        self.question = question
+        self.message = message
+
+    def to_dict(self):
+        return {'line': self.line, 'question': self.question, 'error': self.message}
+
+    def __repr__(self):
+        return f"line {self.line}: {self.message}"
+
+def _mcq_item(question, options, correct, explanation):
+    return {'question': question, 'options': options, 'correct': correct, 'explanation': explanation}
+
+def _answer_item(question, answer, explanation):
+    return {'question': question, 'answer': answer, 'explanation': explanation}
+
+def _card_item(question, answer, explanation):
+    return {'question': question, 'answer': answer}
+
+def _build_mcq(match):
+    question, a, b, c, d, correct, explanation = match.groups("")
+    return _mcq_item(question, [f"A) {a}", f"B) {b}", f"C) {c}", f"D) {d}"], correct.upper(), explanation)
+
+def _build_answer(match):
+    return _answer_item(*match.groups(""))
+
+def _build_card(match):
+    question, answer = match.groups()
+    return {'question': question, 'answer': answer}
+
+BUILDERS = {
+    'mcq_questions': _build_mcq,
+    'fill_blanks': _build_answer,
+    'true_false': _build_answer,
+    'qa_questions': _build_answer,
+    'flashcards': _build_card,
+}
+
+class _Assembler:
+    """State machine turning tokenized lines into items of one kind"""
+
+    def __init__(self, kind, line_number=0):
+        if kind not in KINDS:
+            raise ValueError(f"unknown artifact kind: {kind}")
+        self.kind = kind
+        self.make_item = _card_item if kind == 'flashcards' else _answer_item
+        self.items = []
+        self.errors = []
+        self.block = None
+        self.field = None
+        self.line_number = line_number
+
+    def feed(self, text, start=0, end=None):
+        """Tokenize text[start:end], which must begin at the start of a line"""
+        line = self.line
+        for match in LINE_PATTERN.finditer(text, start, len(text) if end is None else end):
+            line(match)
+
+    def line(self, match):
+        self.line_number += 1
+        kind = match.lastgroup
+        if kind == 'question':
+            self.close_block()
+            self.block = {'line': self.line_number, 'question': match['question'], 'options': [],
+                          'answer': "", 'correct': "", 'explanation': ""}
+            self.field = 'question'
+        elif kind == 'blank':
+            self.field = None
+        elif kind == 'separator':
+            self.close_block()
+        elif self.block is None:
+            pass  # preamble such as "Here are your questions:"
+        elif kind == 'option':
+            self.block['options'].append(f"{match['letter']}) {match['option'].strip()}")
+            self.field = 'option'
+        elif kind == 'text':
+            if self.field == 'option':
+                self.block['options'][-1] += " " + match['text'].strip()
+            elif self.field is not None:
+                self.block[self.field] += " " + match['text'].strip()
+        else:
+            self.block[kind] = match[kind]
+            self.field = kind
+
+    def close_block(self):
+        block = self.block
+        if block is None:
+            return
+        self.block = None
+        self.field = None
+        question = block['question'].strip()
+        if not question:
+            error = "empty question"
+        elif self.kind == 'mcq_questions':
+            letter = CORRECT_LETTER.match(block['correct'].strip().upper())
+            if len(block['options']) != 4:
+                error = f"expected 4 options, found {len(block['options'])}"
+            elif not letter:
+                error = "missing or invalid 'Correct:' letter"
+            else:
+                self.items.append(_mcq_item(question, block['options'], letter.group(),
+                                            block['explanation'].strip()))
+                return
+        elif not block['answer'].strip():
+            error = "missing 'A:' answer"
+        else:
+            self.items.append(self.make_item(question, block['answer'].strip(), block['explanation'].strip()))
+            return
+        self.errors.append(ParseError(block['line'], question[:80], error))
+
+def parse(kind, text):
+    """
+    Parse a complete artifact text; returns (items, errors).
+
+    items are dicts in the shapes the quiz and flashcard systems use, errors
+    a list of ParseError for the blocks that had to be skipped.
+    """
+    if kind not in BLOCK_PATTERNS:
+        raise ValueError(f"unknown artifact kind: {kind}")
+    match_block = BLOCK_PATTERNS[kind].match
+    build = BUILDERS[kind]
+    items = []
+    errors = []
+    position = 0
+    counted = 0
+    line_number = 0
+    last_start = None
+    while True:
+        # Well-formed blocks follow each other directly; only irregular text needs a search
+        match = match_block(text, position)
+        if match is None:
+            start = position
+            if last_start is not None and not BLOCK_END.match(text, position):
+                # The last block goes on past what its pattern covered: reparse it line by line
+                items.pop()
+                start = last_start
+            match = _next_block(match_block, text, position)
+            end = match.start() if match else len(text)
+            if not _EMPTY_GAP.fullmatch(text, start, end):
+                line_number += text.count("\n", counted, start)
+                counted = start
+                _parse_gap(kind, text, start, end, line_number, items, errors)
+            if match is None:
+                return items, errors
+        items.append(build(match))
+        last_start = match.start()
+        position = match.end()
+
+def _next_block(match_block, text, position):
+    """First well-formed block after position, or None"""
+    while True:
+        line = _QUESTION_LINE.search(text, position)
+        if line is None:
+            return None
+        match = match_block(text, line.start())
+        if match is not None:
+            return match
+        position = line.end()
+
+def _parse_gap(kind, text, start, end, line_number, items, errors):
+    """Tokenize irregular text between two well-formed blocks line by line"""
+    if start and text[start - 1] != "\n":
+        # A gap starts at the end of the previous block's last line
+        start = text.find("\n", start, end) + 1 or end
+        line_number += 1
+    assembler = _Assembler(kind, line_number)
+    assembler.feed(text, start, end)
+    assembler.close_block()
+    items.extend(assembler.items)
+    errors.extend(assembler.errors)
+
+def parse_items(kind, text):
+    """Items only, for callers that do not report errors"""
+    return parse(kind, text)[0]
+
+class LineParser:
+    """
+    Push parser over the line tokenizer: feed() streamed text, get back completed items.
+
+    An item is complete when the next block starts, so the last one is only
+    returned by close(). errors collects the blocks that could not be parsed.
+    """
+
+    def __init__(self, kind):
+        self.assembler = _Assembler(kind)
+        self.partial = ""
+
+    @property
+    def errors(self):
+        return self.assembler.errors
+
+    def feed(self, text):
+        data = self.partial + text
+        end = data.rfind("\n")
+        if end < 0:
+            self.partial = data
+            return []
+        self.partial = data[end + 1:]
+        self.assembler.feed(data, 0, end)
+        return self._take()
+
+    def close(self):
+        if self.partial:
+            self.assembler.feed(self.partial)
+            self.partial = ""
+        self.assembler.close_block()
+        return self._take()
+
+    def _take(self):
+        items = self.assembler.items
+        self.assembler.items = []
+        return items
+
+def validate(kind, items):
+    """
+    Split parsed items into usable ones and rejects.
+
+    Returns (good, rejected) where rejected is a list of (item, reason):
+    repeated questions, multiple choice questions with empty or repeated
+    options, true/false answers that are neither, and fill-in-the-blank
+    questions without a blank.
+    """
+    good = []
+    rejected = []
+    seen = set()
+    for item in items:
+        question = " ".join(item['question'].lower().split())
+        reason = None
+        if question in seen:
+            reason = "repeated question"
+        elif kind == 'mcq_questions':
+            texts = [option[2:].strip().lower() for option in item['options']]
+            if not all(texts):
+                reason = "empty option"
+            elif len(set(texts)) < len(texts):
+                reason = "repeated option"
+        elif kind == 'true_false':
+            if not item['answer'].lower().startswith(('true', 'false')):
+                reason = "answer is not True or False"
+        elif kind == 'fill_blanks':
+            if "__" not in item['question']:
+                reason = "no blank in the question"
+        if reason:
+            rejected.append((item, reason))
+        else:
+            seen.add(question)
+            good.append(item)
+    return good, rejected
+
+def format_items(kind, items):
+    """Write items back out in the text format of their artifact; parse() reads it back unchanged"""
+    if kind == 'flashcards':
+        return "\n---\n".join(f"Q: {item['question']}\nA: {item['answer']}" for item in items)
+    blocks = []
+    for number, item in enumerate(items, 1):
+        if kind == 'mcq_questions':
+            lines = [f"Q{number}: {item['question']}"] + item['options'] + [f"Correct: {item['correct']}"]
+        else:
+            lines = [f"Q: {item['question']}", f"A: {item['answer']}"]
+        if item.get('explanation'):
+            lines.append(f"Explanation: {item['explanation']}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
@@ -0,0 +1,418 @@
+"""
+Bulk ingest of a PDF library through the Message Batches API
+
+Every generation request for every PDF is collected and submitted as one
+Message Batch (split if it is very large), which costs half as much as
+interactive requests and needs no rate-limit pacing. Results are written
+to the response cache and the generators are run again: anything that
+still needs a request (the combine step of long documents, or requests that
+errored) goes into the next batch, until every artifact of every PDF is
+written to output/<topic>/.
+
+Job state is checkpointed after every step, so an interrupted run picks up
+where it stopped, including polling a batch that was already submitted.
+
+Usage:
+    python batch_ingest.py start <pdf or directory>... [--no-wait]
+    python batch_ingest.py resume [--no-wait]
+    python batch_ingest.py status
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import ai_utils
+import chunker
+from generation_engine import write_atomic
+from study_store import save_artifact
+from pdf_utils import extract_pages, join_pages
+
+OUTPUT_DIR = Path("output")
+STATE_PATH = Path(os.getenv("SHRINX_CACHE_DIR", ".shrinx_cache")) / "batch_state.json"
+STATE_VERSION = 1
+
+POLL_SECONDS = int(os.getenv("SHRINX_BATCH_POLL_SECONDS", "60"))
+MAX_BATCH_REQUESTS = 10000
+# Times a request may error or expire in a batch before its artifact is given up
+MAX_ATTEMPTS = 3
+
+# Same artifacts and file names as the GUI
+ARTIFACTS = [
+    ("summary", ai_utils.generate_summary),
+    ("notes", ai_utils.generate_notes),
+    ("flashcards", ai_utils.generate_flashcards),
+    ("mcq_questions", ai_utils.generate_mcq_questions),
+    ("fill_blanks", ai_utils.generate_fill_blanks),
+    ("true_false", ai_utils.generate_true_false),
+    ("qa_questions", ai_utils.generate_qa_questions),
+]
+
+class BatchStateError(Exception):
+    """The checkpoint is missing, unreadable or belongs to another job"""
+
+def find_pdfs(paths):
+    """PDF files named directly or found (recursively) in the given directories"""
+    pdfs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf"))
+        elif path.suffix.lower() == ".pdf":
+            pdfs.append(path)
+    return pdfs
+
+def topic_name(pdf_path):
+    return Path(pdf_path).stem.strip().replace(" ", "_")
+
+def new_state(pdf_paths):
+    topics = set()
+    documents = []
+    for pdf in pdf_paths:
+        topic = topic_name(pdf)
+        while topic in topics:
+            topic += "_"
+        topics.add(topic)
+        documents.append({'pdf': str(Path(pdf).resolve()), 'topic': topic,
+                          'prepared': False, 'completed': [], 'failed': []})
+    return {'version': STATE_VERSION, 'documents': documents, 'batches': [], 'attempts': {}, 'given_up': [], 'round': 0}
+
+def load_state(path=STATE_PATH):
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise BatchStateError(f"could not read {path}: {e}")
+    if state.get('version') != STATE_VERSION:
+        raise BatchStateError(f"{path} was written by another version of batch_ingest")
+    return state
+
+def save_state(state, path=STATE_PATH):
+    write_atomic(Path(path), json.dumps(state, indent=2))
+
+def is_finished(state):
+    return not state['batches'] and all(_remaining(doc) == [] for doc in state['documents'])
+
+def _remaining(doc):
+    done = set(doc['completed']) | set(doc['failed'])
+    return [(name, func) for name, func in ARTIFACTS if name not in done]
+
+def make_batch_client():
+    """SDK client for the batch endpoints, with the SDK's own retries for submit and polling"""
+    import anthropic
+    return anthropic.Anthropic(api_key=ai_utils.API_KEY)
+
+def run_round(state, output_dir, log=print):
+    """
+    Run every unfinished generator against the response cache.
+
+    Artifacts whose requests are all answered are written out; the
+    requests still needed are returned as {cache_key: {'label', 'params'}}.
+    """
+    pending = {}
+    given_up = set(state['given_up'])
+    for doc in state['documents']:
+        remaining = _remaining(doc)
+        if not remaining:
+            continue
+        topic_dir = Path(output_dir) / doc['topic']
+        # Extraction is cached by content hash, so re-reading the PDF every round is cheap
+        pages = extract_pages(doc['pdf'])
+        text = join_pages(pages)
+        chunks = chunker.chunk_pdf(doc['pdf'], pages=pages)
+        if not doc['prepared']:
+            write_atomic(topic_dir / "raw.txt", text)
+            chunker.save_chunk_index(topic_dir / "sections.json", chunks)
+            doc['prepared'] = True
+
+        for name, func in remaining:
+            ai_utils.start_collecting()
+            try:
+                content = func(text, chunks=chunks)
+            except ai_utils.DeferredRequest:
+                content = None
+            except Exception as e:
+                ai_utils.stop_collecting()
+                doc['failed'].append(name)
+                log(f"❌ {doc['topic']}: {name} failed: {e}")
+                continue
+            needed = ai_utils.stop_collecting()
+
+            if content is not None:
+                write_atomic(topic_dir / f"{name}.txt", content)
+                save_artifact(topic_dir, name, content)
+                doc['completed'].append(name)
+            elif given_up & set(needed):
+                # Never write a partial artifact; the topic just lacks this file
+                doc['failed'].append(name)
+                log(f"❌ {doc['topic']}: {name} failed after {MAX_ATTEMPTS} batch attempts")
+            else:
+                pending.update(needed)
+    return pending
+
+def submit(client, state, pending, log=print):
+    """Submit the pending requests as one or more batches and record them in the state"""
+    keys = sorted(pending)
+    for start in range(0, len(keys), MAX_BATCH_REQUESTS):
+        part = keys[start:start + MAX_BATCH_REQUESTS]
+        batch = client.messages.batches.create(
+            requests=[{'custom_id': key, 'params': pending[key]['params']} for key in part]
+        )
+        state['batches'].append({'id': batch.id, 'requests': {key: pending[key]['label'] for key in part}})
+        log(f"📤 Submitted batch {batch.id} with {len(part)} request(s)")
+
+def collect(client, state, wait=True, poll_interval=POLL_SECONDS, state_path=STATE_PATH, log=print):
+    """
+    Store the results of every submitted batch in the response cache.
+
+    Returns False if a batch is still processing and wait is False.
+    """
+    while state['batches']:
+        entry = state['batches'][0]
+        batch = client.messages.batches.retrieve(entry['id'])
+        if batch.processing_status != "ended":
+            if not wait:
+                return False
+            counts = batch.request_counts
+            log(f"⏳ Batch {entry['id']}: {counts.succeeded + counts.errored} done, {counts.processing} processing")
+            time.sleep(poll_interval)
+            continue
+
+        succeeded = 0
+        for result in client.messages.batches.results(entry['id']):
+            label = entry['requests'].get(result.custom_id)
+            if label is None:
+                continue
+            if result.result.type == "succeeded" and ai_utils.store_batch_result(result.custom_id, label, result.result.message):
+                succeeded += 1
+                continue
+            attempts = state['attempts'].get(result.custom_id, 0) + 1
+            state['attempts'][result.custom_id] = attempts
+            if attempts >= MAX_ATTEMPTS and result.custom_id not in state['given_up']:
+                state['given_up'].append(result.custom_id)
+        log(f"📥 Batch {entry['id']}: {succeeded} of {len(entry['requests'])} request(s) succeeded")
+        state['batches'].pop(0)
+        save_state(state, state_path)
+    return True
+
+def ingest(state, client=None, output_dir=OUTPUT_DIR, state_path=STATE_PATH, wait=True,
+           poll_interval=POLL_SECONDS, log=print):
+    """
+    Drive a batch job until every artifact is written.
+
+    Returns True when the job is finished, False when it stopped early
+    (wait=False and a batch is still processing); run it again to resume.
+    """
+    client = client or make_batch_client()
+    while True:
+        if not collect(client, state, wait, poll_interval, state_path, log):
+            save_state(state, state_path)
+            return False
+
+        state['round'] += 1
+        pending = run_round(state, output_dir, log)
+        save_state(state, state_path)
+        if not pending:
+            break
+        log(f"🔄 Round {state['round']}: {len(pending)} request(s) needed")
+        submit(client, state, pending, log)
+        save_state(state, state_path)
+
+    for doc in state['documents']:
+        status = f"{len(doc['failed'])} failed: {', '.join(doc['failed'])}" if doc['failed'] else "complete"
+        log(f"✅ {doc['topic']}: {len(doc['completed'])} artifact(s), {status}")
+    return True
+
+def print_status(state):
+    if state is None:
+        print("No batch job in progress")
+        return
+    print(f"Batch job, round {state['round']}: {len(state['documents'])} PDF(s)")
+    for doc in state['documents']:
+        print(f"  {doc['topic']}: {len(doc['completed'])}/{len(ARTIFACTS)} done"
+              + (f", failed: {', '.join(doc['failed'])}" if doc['failed'] else ""))
+    for entry in state['batches']:
+        print(f"  waiting on batch {entry['id']} ({len(entry['requests'])} request(s))")
+
+def _run_mock_self_check():
+    """Ingest two PDFs against a local mock of the batches endpoints, interrupting and resuming once"""
+    import tempfile
+    import threading
+    import uuid
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import anthropic
+    import llm_backend
+    import response_cache
+    from flashcard_system import FlashcardSystem
+    from pdf_utils import make_synthetic_pdf
+    from study_store import load_cards, load_questions
+
+
+    batches = {}
+    created = []
+    lock = threading.Lock()
+    writer = llm_backend.FakeClient(latency=0)
+
+    def message_dict(params):
+        message = writer.create(**params)
+        return {'id': message.id, 'type': 'message', 'role': 'assistant', 'model': message.model,
+                'content': [vars(block) for block in message.content], 'stop_reason': message.stop_reason,
+                'stop_sequence': None, 'usage': vars(message.usage)}
+
+    class MockHandler(BaseHTTPRequestHandler):
+        def batch_json(self, batch_id):
+            batch = batches[batch_id]
+            ended = batch['polls'] >= 2
+            total = len(batch['requests'])
+            host = f"http://127.0.0.1:{self.server.server_port}"
+            return {
+                'id': batch_id, 'type': 'message_batch',
+                'processing_status': 'ended' if ended else 'in_progress',
+                'request_counts': {'processing': 0 if ended else total, 'succeeded': total if ended else 0,
+                                   'errored': 0, 'canceled': 0, 'expired': 0},
+                'created_at': '2024-01-01T00:00:00Z', 'expires_at': '2024-01-02T00:00:00Z',
+                'ended_at': '2024-01-01T01:00:00Z' if ended else None,
+                'results_url': f"{host}/v1/messages/batches/{batch_id}/results" if ended else None,
+            }
+
+        def reply(self, body, content_type='application/json'):
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            batch_id = f"msgbatch_{uuid.uuid4().hex[:12]}"
+            with lock:
+                batches[batch_id] = {'requests': body['requests'], 'polls': 0}
+                created.append(batch_id)
+            self.reply(json.dumps(self.batch_json(batch_id)))
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            batch_id = parts[3]
+            if parts[-1] == "results":
+                lines = []
+                for i, request in enumerate(batches[batch_id]['requests']):
+                    # The first request of the first batch errors, to exercise resubmission
+                    if batch_id == created[0] and i == 0:
+                        result = {'type': 'errored', 'error': {'type': 'error',
+                                  'error': {'type': 'api_error', 'message': 'mock failure'}}}
+                    else:
+                        result = {'type': 'succeeded', 'message': message_dict(request['params'])}
+                    lines.append(json.dumps({'custom_id': request['custom_id'], 'result': result}))
+                self.reply("\n".join(lines) + "\n", 'application/binary')
+                return
+            with lock:
+                batches[batch_id]['polls'] += 1
+            self.reply(json.dumps(self.batch_json(batch_id)))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = anthropic.Anthropic(api_key="mock-key", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0)
+
+    problems = []
+    quiet = lambda message: None
+    chunk_tokens = chunker.CHUNK_TOKENS
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        response_cache._default_cache = response_cache.ResponseCache(tmp / "responses.sqlite3")
+        # Small chunks so each PDF needs a combine round after the per-chunk requests
+        chunker.CHUNK_TOKENS = 1500
+        pdfs = []
+        for name in ("Cell Biology", "Genetics"):
+            pdf = tmp / "library" / f"{name}.pdf"
+            pdf.parent.mkdir(exist_ok=True)
+            make_synthetic_pdf(pdf, 6)
+            pdfs.append(pdf)
+        state_path = tmp / "batch_state.json"
+        output_dir = tmp / "output"
+        try:
+            save_state(new_state(find_pdfs([tmp / "library"])), state_path)
+
+            # First run submits the first batch and stops while it is processing
+            finished = ingest(load_state(state_path), client, output_dir, state_path, wait=False, log=quiet)
+            if finished or len(created) != 1 or not load_state(state_path)['batches']:
+                problems.append("first run should stop after submitting one batch")
+
+            # Second run resumes from the checkpoint, polls the same batch and finishes the job
+            finished = ingest(load_state(state_path), client, output_dir, state_path, poll_interval=0, log=quiet)
+            state = load_state(state_path)
+            if not finished or not is_finished(state):
+                problems.append("resumed run did not finish the job")
+            if len(created) < 2:
+                problems.append("expected a second batch for the combine step and the errored request")
+            if batches[created[0]]['polls'] < 3:
+                problems.append("resumed run did not poll the batch submitted before the interruption")
+            first_errored = batches[created[0]]['requests'][0]['custom_id']
+            if not any(r['custom_id'] == first_errored for batch_id in created[1:] for r in batches[batch_id]['requests']):
+                problems.append("the errored request was not resubmitted")
+            for doc in state['documents']:
+                topic_dir = output_dir / doc['topic']
+                missing = [name for name, _ in ARTIFACTS if not (topic_dir / f"{name}.txt").exists()]
+                if missing or doc['failed']:
+                    problems.append(f"{doc['topic']} is missing {missing or doc['failed']}")
+                    continue
+                cards = load_cards(topic_dir)
+                mcqs = load_questions(topic_dir, 'mcq_questions')
+                if len(cards) != 10 or len(mcqs) != 5 or cards != FlashcardSystem().parse_flashcards(
+                        (topic_dir / "flashcards.txt").read_text(encoding="utf-8")):
+                    problems.append(f"{doc['topic']}: parsed {len(cards)} flashcards and {len(mcqs)} MCQs")
+        finally:
+            chunker.CHUNK_TOKENS = chunk_tokens
+            response_cache._default_cache.close()
+            response_cache._default_cache = None
+            server.shutdown()
+
+    if problems:
+        print("❌ Batch ingest check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ {len(pdfs)} PDFs ingested through {len(created)} batches, resumed after an interruption")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    wait = "--no-wait" not in sys.argv
+    command = args[0] if args else None
+
+    if "--self-check" in sys.argv:
+        sys.exit(0 if _run_mock_self_check() else 1)
+    if command == "status":
+        print_status(load_state())
+    elif command == "start" and len(args) > 1:
+        existing = load_state()
+        if existing and not is_finished(existing):
+            print("❌ A batch job is already in progress. Run 'python batch_ingest.py resume' to continue it.")
+            sys.exit(1)
+        pdfs = find_pdfs(args[1:])
+        if not pdfs:
+            print("❌ No PDF files found.")
+            sys.exit(1)
+        state = new_state(pdfs)
+        save_state(state)
+        print(f"📚 Ingesting {len(pdfs)} PDF(s) into {OUTPUT_DIR}/")
+        if not ingest(state, wait=wait):
+            print("⏳ Batch submitted; run 'python batch_ingest.py resume' to collect the results")
+    elif command == "resume":
+        state = load_state()
+        if state is None:
+            print("No batch job to resume")
+            sys.exit(1)
+        if not ingest(state, wait=wait):
+            print("⏳ Batch still processing; run 'python batch_ingest.py resume' again later")
+    else:
+        print("Usage: python batch_ingest.py start <pdf or directory>... [--no-wait]")
+        print("       python batch_ingest.py resume [--no-wait]")
+        print("       python batch_ingest.py status")
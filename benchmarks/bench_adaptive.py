@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark adaptive quizzes against asking questions in generation order
+
+Simulated learners of known ability take quizzes over a bank of items with
+known difficulty and discrimination. Every run uses the same ability
+estimate and stopping rule from adaptive_quiz; they differ only in how the
+next question is picked:
+
+  in order      the next question in generation order
+  adaptive      the most informative question, looked up in the z tables
+  direct        the most informative question, computing each item's
+                information with exp() at every pick (no lookup tables)
+
+A full quiz of every question is the baseline for accuracy. Prints the
+questions asked, how often the mastery verdict matches the learner's true
+ability, the error of the ability estimate and the time per answer.
+
+Usage: python benchmarks/bench_adaptive.py [learners] [bank_size]
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_quiz import (GUESSING, MASTERY_ABILITY, AdaptiveQuizSession, information, simulate_bank,
+                           simulated_answer)
+from deck import Deck
+from study_session import run_quiz
+
+KIND = 'mcq_questions'
+
+class InOrderSession(AdaptiveQuizSession):
+    def _choose(self):
+        for index in range(len(self._asked)):
+            if not self._asked[index]:
+                return index
+        return None
+
+class DirectSession(AdaptiveQuizSession):
+    def _choose(self):
+        guessing = GUESSING[self.kind]
+        best = None
+        best_information = -1.0
+        for index, (difficulty, discrimination) in enumerate(zip(self._difficulty, self._discrimination)):
+            if not self._asked[index]:
+                value = information(self.ability, difficulty, discrimination, guessing)
+                if value > best_information:
+                    best, best_information = index, value
+        return best
+
+class FullSession(InOrderSession):
+    def _done(self):
+        return len(self.results) >= self.limit
+
+def run(session_class, questions, stats, abilities, seed):
+    rng = random.Random(seed)
+    asked = 0
+    agreed = 0
+    squared_error = 0.0
+    started = time.perf_counter()
+    for ability in abilities:
+        session = session_class(KIND, questions, stats)
+        summary = run_quiz(session, simulated_answer(KIND, ability, stats, rng))
+        asked += summary['answered']
+        agreed += (summary['mastery'] >= 0.5) == (ability >= MASTERY_ABILITY)
+        squared_error += (summary['ability'] - ability) ** 2
+    seconds = time.perf_counter() - started
+    count = len(abilities)
+    return asked / count, agreed / count, math.sqrt(squared_error / count), seconds / asked * 1e6
+
+def main():
+    learners = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    bank_size = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rng = random.Random(0)
+    questions, stats = simulate_bank(KIND, bank_size, rng)
+    questions = Deck(KIND, questions)
+    abilities = [rng.gauss(0.0, 1.2) for _ in range(learners)]
+
+    print(f"📊 {learners} simulated learners, {bank_size} multiple choice questions, mastery at ability "
+          f"{MASTERY_ABILITY}")
+    print(f"\n{'selection':<14}{'questions':>10}{'verdict right':>15}{'ability RMSE':>14}{'µs/answer':>11}")
+    for name, session_class in (("full quiz", FullSession), ("in order", InOrderSession),
+                                ("adaptive", AdaptiveQuizSession), ("direct", DirectSession)):
+        asked, agreed, error, per_answer = run(session_class, questions, stats, abilities, seed=1)
+        print(f"{name:<14}{asked:>10.1f}{agreed:>14.0%}{error:>14.2f}{per_answer:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark Deck (columnar, interned strings) against lists of item dicts
+
+Generates a large library per format with the fake backend's writer, loads
+it the way study_store does (JSON into dicts) and measures the memory each
+representation keeps alive with tracemalloc. Then times what study sessions
+do with the items: reading every field, shuffling, random picks and
+stepping through a shuffled order.
+
+Usage: python benchmarks/bench_decks.py [items]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import artifact_parser
+from bench_parsers import make_text
+from deck import Deck
+
+KINDS = ('flashcards', 'mcq_questions', 'true_false')
+
+def library(kind, count):
+    """
+    JSON of count items, as study_store saves them.
+
+    The fake writer draws on a few sentences only, so every free-text field
+    gets the item's number to make it as distinct as in a real library;
+    true/false answers and correct letters repeat as they really do.
+    """
+    templates = artifact_parser.parse(kind, make_text(kind, 1))[0]
+    items = []
+    for number in range(count):
+        item = dict(templates[number % len(templates)])
+        item['question'] = f"{item['question']} #{number}"
+        if kind == 'mcq_questions':
+            item['options'] = [f"{option} #{number}" for option in item['options']]
+        elif kind != 'true_false':
+            item['answer'] = f"{item['answer']} #{number}"
+        if item.get('explanation'):
+            item['explanation'] = f"{item['explanation']} #{number}"
+        items.append(item)
+    return json.dumps(items)
+
+def retained(build):
+    """Object built and the bytes it keeps allocated once temporaries are freed"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def best_time(func, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def read_all_dicts(items, fields):
+    for item in items:
+        for field in fields:
+            item[field]
+
+def read_all_views(deck, fields):
+    for item in deck:
+        for field in fields:
+            item[field]
+
+def read_columns(deck, fields):
+    for values in zip(*(deck.column(field) for field in fields)):
+        pass
+
+def step_dicts(items):
+    for item in items:
+        item['question']
+
+def step_order(deck, order):
+    get = deck.get
+    for index in order:
+        get(index, 'question')
+
+def pick_dicts(items, picks, rng):
+    for _ in range(picks):
+        items[rng.randrange(len(items))]['question']
+
+def pick_order(deck, order, picks, rng):
+    for _ in range(picks):
+        deck.get(order[rng.randrange(len(order))], 'question')
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(0)
+
+    print(f"📊 Memory kept alive by {count} items per format")
+    print(f"{'format':<15}{'dicts':>10}{'deck':>10}{'saved':>8}")
+    loaded = {}
+    for kind in KINDS:
+        data = library(kind, count)
+        items, dict_bytes = retained(lambda: json.loads(data))
+        deck, deck_bytes = retained(lambda: Deck(kind, json.loads(data)))
+        if deck.to_dicts() != items:
+            print(f"❌ {kind}: the deck does not hold the same items")
+            sys.exit(1)
+        loaded[kind] = items, deck
+        print(f"{kind:<15}{dict_bytes / 2 ** 20:>8.1f}MB{deck_bytes / 2 ** 20:>8.1f}MB"
+              f"{(1 - deck_bytes / dict_bytes) * 100:>7.0f}%")
+
+    items, deck = loaded['flashcards']
+    fields = ('question', 'answer')
+    picks = len(items)
+    order = deck.order()
+    rng.shuffle(order)
+    print(f"\n📊 Study operations on {len(items)} flashcards (best of 3)")
+    print(f"{'operation':<34}{'dicts':>9}{'deck':>9}")
+    rows = [
+        ("read every field (views)", lambda: read_all_dicts(items, fields), lambda: read_all_views(deck, fields)),
+        ("read every field (columns)", lambda: read_all_dicts(items, fields), lambda: read_columns(deck, fields)),
+        ("shuffle", lambda: rng.shuffle(items), lambda: rng.shuffle(order)),
+        (f"{picks} random picks", lambda: pick_dicts(items, picks, rng),
+         lambda: pick_order(deck, order, picks, rng)),
+        ("step through shuffled order", lambda: step_dicts(items), lambda: step_order(deck, order)),
+    ]
+    for name, with_dicts, with_deck in rows:
+        print(f"{name:<34}{best_time(with_dicts) * 1000:>7.1f}ms{best_time(with_deck) * 1000:>7.1f}ms")
+
+if __name__ == "__main__":
+    main()
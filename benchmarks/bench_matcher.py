@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark regrading a quiz history with answer_matcher
+
+Builds a history of fill-in-the-blank attempts from the fake backend's
+questions, with responses typed the ways learners type them (exact, other
+case and punctuation, singular for plural, one typo, extra words, wrong),
+then regrades it with the old word-overlap check and with the matcher, once
+with a cold answer-key cache and once warm. Prints the time per answer and
+how each grader scored every kind of response.
+
+Usage: python benchmarks/bench_matcher.py [attempts]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import answer_matcher
+import artifact_parser
+from answer_matcher import SCORES, grade_answer
+from bench_parsers import make_text
+
+PLURALS = (('ia', 'ion'), ('ion', 'ia'), ('um', 'a'), ('a', 'um'), ('es', ''), ('s', ''), ('', 's'))
+
+def old_score(response, answer):
+    """Scoring before answer_matcher: exact lowercase match, else 60% word overlap for half a point"""
+    response, answer = response.lower(), answer.lower()
+    if response == answer:
+        return 1
+    words = set(answer.split())
+    if words and len(set(response.split()) & words) / len(words) >= 0.6:
+        return 0.5
+    return 0
+
+def typed(answer, style, rng):
+    if style == 'exact':
+        return answer
+    if style == 'case and punctuation':
+        return answer.upper() + rng.choice(".!?")
+    if style == 'plural':
+        for ending, other in PLURALS:
+            if answer.endswith(ending):
+                return answer[:len(answer) - len(ending)] + other
+    if style == 'one typo' and len(answer) >= 5:
+        position = rng.randrange(1, len(answer) - 1)
+        return answer[:position] + answer[position + 1] + answer[position] + answer[position + 2:]
+    if style == 'extra words':
+        return f"the {answer} in plants"
+    return rng.choice(("oxygen", "nucleus", "carbon", "ribosome"))
+
+STYLES = ('exact', 'case and punctuation', 'plural', 'one typo', 'extra words', 'wrong')
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(0)
+    questions = artifact_parser.parse('fill_blanks', make_text('fill_blanks', 0.05))[0]
+    history = []
+    for _ in range(count):
+        answer = rng.choice(questions)['answer']
+        style = rng.choice(STYLES)
+        history.append((style, typed(answer, style, rng), answer))
+    print(f"📊 Regrading {count} answers to {len({answer for _, _, answer in history})} distinct answers")
+
+    started = time.perf_counter()
+    old = [old_score(response, answer) for _, response, answer in history]
+    old_seconds = time.perf_counter() - started
+    answer_matcher.answer_key.cache_clear()
+    started = time.perf_counter()
+    new = [SCORES[grade_answer(response, answer)] for _, response, answer in history]
+    cold_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    [grade_answer(response, answer) for _, response, answer in history]
+    warm_seconds = time.perf_counter() - started
+
+    print(f"\n{'grader':<28}{'total':>9}{'per answer':>13}")
+    for name, seconds in (("word overlap (old)", old_seconds), ("matcher, cold cache", cold_seconds),
+                          ("matcher, warm cache", warm_seconds)):
+        print(f"{name:<28}{seconds:>8.2f}s{seconds / count * 1e6:>11.1f}µs")
+
+    print(f"\n{'response typed':<24}{'old mean score':>15}{'matcher':>10}")
+    for style in STYLES:
+        rows = [i for i, (kind, _, _) in enumerate(history) if kind == style]
+        print(f"{style:<24}{sum(old[i] for i in rows) / len(rows):>15.2f}"
+              f"{sum(new[i] for i in rows) / len(rows):>10.2f}")
+
+if __name__ == "__main__":
+    main()
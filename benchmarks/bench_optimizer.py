@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized memory-model fit against a per-event Python loop
+
+Simulates learners reviewing cards for two years until the log holds the
+requested number of reviews, then fits the model with review_optimizer
+(NumPy arrays, all events per pass) and times the same feature building and
+Fisher scoring step written as plain loops over the events. The loop is too
+slow to run to convergence on large logs, so its fit time is its step time
+multiplied by the steps the vectorized fit needed.
+
+Usage: python benchmarks/bench_optimizer.py [million_reviews]
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import review_optimizer
+from review_optimizer import BASELINE, DECAY, FACTOR, PRIOR_STRENGTH, features
+from spaced_repetition import DAY, GRADES
+
+TRUE_WEIGHTS = (-0.3, 0.9, 0.4, -0.2, -0.35, 0.3)
+# Reviews per simulated card over two years, measured once to size the simulation
+REVIEWS_PER_CARD = 25
+
+# --- Baseline: the same computation, one event at a time ---
+
+def loop_events(history):
+    grades = list(GRADES)
+    cards = history['card'].tolist()
+    codes = history['grade'].tolist()
+    reviewed = history['reviewed'].tolist()
+    intervals = history['interval'].tolist()
+    eases = history['ease'].tolist()
+    events = []
+    lapses = 0
+    for i in range(len(cards)):
+        if i == 0 or cards[i] != cards[i - 1]:
+            lapses = 0
+        grade = grades[codes[i]]
+        if grade == 'again':
+            lapses += 1
+            continue
+        if i + 1 < len(cards) and cards[i + 1] == cards[i]:
+            elapsed = (reviewed[i + 1] - reviewed[i]) / DAY
+            if elapsed > 0:
+                events.append((features(intervals[i], eases[i], lapses, grade), elapsed,
+                               0.0 if grades[codes[i + 1]] == 'again' else 1.0))
+    return events
+
+def loop_step(weights, events, prior=PRIOR_STRENGTH):
+    size = len(weights)
+    grad = [prior * (w - b) for w, b in zip(weights, BASELINE)]
+    fisher = [[prior if i == j else 0.0 for j in range(size)] for i in range(size)]
+    for x, t, y in events:
+        z = sum(w * v for w, v in zip(weights, x))
+        u = FACTOR * t * math.exp(-min(z, 50.0))
+        r = min(max((1 + u) ** DECAY, 1e-9), 1 - 1e-9)
+        slope = -DECAY * u * r / (1 + u)
+        spread = r * (1 - r)
+        first = (r - y) / spread * slope
+        second = slope * slope / spread
+        for i in range(size):
+            grad[i] += first * x[i]
+            row = fisher[i]
+            for j in range(size):
+                row[j] += second * x[i] * x[j]
+    return np.array(grad), np.array(fisher)
+
+def main():
+    millions = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    cards = int(millions * 1e6 / REVIEWS_PER_CARD)
+
+    print(f"📊 Simulating {cards} cards over two years...")
+    started = time.perf_counter()
+    history = review_optimizer.simulate_history(cards, TRUE_WEIGHTS, seed=0)
+    print(f"   {len(history['card'])} reviews in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    X, elapsed, recalled = review_optimizer.training_events(history)
+    vector_events = time.perf_counter() - started
+    started = time.perf_counter()
+    weights, steps = review_optimizer.fit(X, elapsed, recalled)
+    vector_fit = time.perf_counter() - started
+    started = time.perf_counter()
+    grad, fisher = review_optimizer.gradient(weights, X, elapsed, recalled)
+    vector_step = time.perf_counter() - started
+
+    started = time.perf_counter()
+    events = loop_events(history)
+    loop_events_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    loop_grad, loop_fisher = loop_step(list(weights), events)
+    loop_step_seconds = time.perf_counter() - started
+
+    if len(events) != len(X) or not np.allclose(grad, loop_grad, rtol=1e-6, atol=1e-6) \
+            or not np.allclose(fisher, loop_fisher, rtol=1e-9):
+        print("❌ The loop and the vectorized fit disagree")
+        sys.exit(1)
+
+    loss = review_optimizer.log_loss(weights, X, elapsed, recalled)
+    baseline = review_optimizer.log_loss(BASELINE, X, elapsed, recalled)
+    print(f"\n📊 {len(X)} review pairs; fit took {steps} Fisher scoring steps")
+    print(f"   weights {np.round(weights, 3).tolist()} (true {list(TRUE_WEIGHTS)})")
+    print(f"   log loss {loss:.4f}, plain SM-2 {baseline:.4f}")
+    print(f"\n{'stage':<22}{'loop':>10}{'vectorized':>12}{'speedup':>9}")
+    print(f"{'build events':<22}{loop_events_seconds:>9.2f}s{vector_events:>11.3f}s"
+          f"{loop_events_seconds / vector_events:>8.0f}x")
+    print(f"{'one gradient step':<22}{loop_step_seconds:>9.2f}s{vector_step:>11.3f}s"
+          f"{loop_step_seconds / vector_step:>8.0f}x")
+    loop_fit = loop_events_seconds + loop_step_seconds * steps
+    print(f"{'whole fit':<22}{loop_fit:>9.1f}s{vector_events + vector_fit:>11.3f}s"
+          f"{loop_fit / (vector_events + vector_fit):>8.0f}x  (loop extrapolated)")
+
+if __name__ == "__main__":
+    main()
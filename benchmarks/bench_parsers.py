@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass artifact parser against the previous block parsers
+
+Builds multi-megabyte synthetic texts in every question and flashcard
+format with the fake backend's writer, checks that both parsers return the
+same items, then times each one. The previous parsers split the text into
+blocks and scan every line of a block with several startswith/split calls;
+they are copied here unchanged as the baseline.
+
+Usage: python benchmarks/bench_parsers.py [megabytes] [repeats]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import artifact_parser
+from llm_backend import _ArtifactWriter
+
+# --- Baseline: the block parsers this engine replaced ---
+
+def legacy_mcq_block(block):
+    if 'Q' not in block or 'A)' not in block:
+        return None
+    lines = block.strip().split('\n')
+    question = ""
+    options = []
+    correct = ""
+    explanation = ""
+    for line in lines:
+        if line.startswith('Q'):
+            question = line.split(':', 1)[1].strip() if ':' in line else line
+        elif line.startswith(('A)', 'B)', 'C)', 'D)')):
+            options.append(line.strip())
+        elif line.startswith('Correct:'):
+            correct = line.split(':', 1)[1].strip()
+        elif line.startswith('Explanation:'):
+            explanation = line.split(':', 1)[1].strip()
+    if question and len(options) == 4 and correct:
+        return {'question': question, 'options': options, 'correct': correct.upper(), 'explanation': explanation}
+    return None
+
+def legacy_answer_block(block):
+    lines = block.strip().split('\n')
+    question = ""
+    answer = ""
+    explanation = ""
+    for line in lines:
+        if line.startswith('Q:'):
+            question = line.split(':', 1)[1].strip()
+        elif line.startswith('A:'):
+            answer = line.split(':', 1)[1].strip()
+        elif line.startswith('Explanation:'):
+            explanation = line.split(':', 1)[1].strip()
+    if question and answer:
+        return {'question': question, 'answer': answer, 'explanation': explanation}
+    return None
+
+def legacy_flashcard_block(block):
+    lines = block.strip().split('\n')
+    question = ""
+    answer = ""
+    for line in lines:
+        if line.startswith('Q:'):
+            question = line.split(':', 1)[1].strip()
+        elif line.startswith('A:'):
+            answer = line.split(':', 1)[1].strip()
+    if question and answer:
+        return {'question': question, 'answer': answer}
+    return None
+
+LEGACY = {
+    'flashcards': ('---', legacy_flashcard_block),
+    'mcq_questions': ('\n\n', legacy_mcq_block),
+    'fill_blanks': ('\n\n', legacy_answer_block),
+    'true_false': ('\n\n', legacy_answer_block),
+    'qa_questions': ('\n\n', legacy_answer_block),
+}
+
+def legacy_parse(kind, text):
+    separator, parse_block = LEGACY[kind]
+    items = []
+    for block in text.split(separator):
+        item = parse_block(block)
+        if item:
+            items.append(item)
+    return items
+
+# --- Synthetic input ---
+
+DOCUMENT = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose molecules. "
+    "The Calvin cycle fixes carbon dioxide using ATP and NADPH produced by the light reactions. "
+    "Chlorophyll absorbs mostly blue and red light and reflects green wavelengths. "
+    "Stomata regulate gas exchange and water loss through the surface of the leaf. "
+    "Cellular respiration releases the energy stored in glucose to produce ATP in mitochondria. "
+)
+
+def make_text(kind, megabytes, seed=0, irregular=0.0):
+    """Synthetic artifact text; a share of `irregular` blocks get a blank line inside and a wrapped last line"""
+    rng = random.Random(seed)
+    writer = _ArtifactWriter(DOCUMENT * 4, random.Random(seed))
+    make_item = {
+        'flashcards': lambda i: writer.flashcard(),
+        'mcq_questions': writer.mcq,
+        'fill_blanks': lambda i: writer.fill_blank(),
+        'true_false': lambda i: writer.true_false(),
+        'qa_questions': lambda i: writer.qa(),
+    }[kind]
+    separator = "\n---\n" if kind == 'flashcards' else "\n\n"
+    blocks = []
+    size = 0
+    target = int(megabytes * 1024 * 1024)
+    while size < target:
+        block = make_item(len(blocks) + 1)
+        if irregular and rng.random() < irregular:
+            first, rest = block.split("\n", 1)
+            block = f"{first}\n\n{rest}\n(continued on the next line)"
+        blocks.append(block)
+        size += len(block) + len(separator)
+    return separator.join(blocks)
+
+def best_time(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print(f"📊 Parsing {megabytes:g} MB per format, best of {repeats}")
+    print(f"{'format':<15}{'items':>9}{'previous':>11}{'single-pass':>13}{'speedup':>9}")
+    for kind in artifact_parser.KINDS:
+        text = make_text(kind, megabytes)
+        expected = legacy_parse(kind, text)
+        items, errors = artifact_parser.parse(kind, text)
+        if items != expected or errors:
+            print(f"❌ {kind}: parsers disagree ({len(items)} items, {len(errors)} errors vs {len(expected)} items)")
+            sys.exit(1)
+        legacy_seconds = best_time(lambda: legacy_parse(kind, text), repeats)
+        new_seconds = best_time(lambda: artifact_parser.parse(kind, text), repeats)
+        print(f"{kind:<15}{len(items):>9}{legacy_seconds:>10.3f}s{new_seconds:>12.3f}s"
+              f"{legacy_seconds / new_seconds:>8.2f}x")
+
+    print("\n📊 Same sizes with 5% of blocks split by a blank line and wrapped (items recovered)")
+    print(f"{'format':<15}{'previous':>10}{'single-pass':>13}{'errors':>8}{'previous':>11}{'single-pass':>13}")
+    for kind in artifact_parser.KINDS:
+        text = make_text(kind, megabytes, irregular=0.05)
+        expected = len(legacy_parse(kind, text))
+        items, errors = artifact_parser.parse(kind, text)
+        legacy_seconds = best_time(lambda: legacy_parse(kind, text), repeats)
+        new_seconds = best_time(lambda: artifact_parser.parse(kind, text), repeats)
+        print(f"{kind:<15}{expected:>10}{len(items):>13}{len(errors):>8}{legacy_seconds:>10.3f}s{new_seconds:>12.3f}s")
+
+if __name__ == "__main__":
+    main()
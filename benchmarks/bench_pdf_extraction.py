@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial vs parallel PDF text extraction on a synthetic textbook
+
+Usage: python benchmarks/bench_pdf_extraction.py [pages] [workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_utils
+from pdf_utils import make_synthetic_pdf
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    print(f"📄 Building synthetic PDF with {pages} pages...")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, pages)
+        print(f"   Backend: {pdf_utils.get_backend()}, workers: {workers}")
+
+        # Bypass the extraction cache, or the second run would just read the first one's result
+        serial_text, serial_time = timed(pdf_utils.extract_text_from_pdf, pdf_path, workers=1, use_cache=False)
+        parallel_text, parallel_time = timed(pdf_utils.extract_text_from_pdf, pdf_path, workers=workers,
+                                             use_cache=False)
+
+    print(f"   Serial:   {serial_time:8.2f}s ({pages / serial_time:7.1f} pages/s)")
+    print(f"   Parallel: {parallel_time:8.2f}s ({pages / parallel_time:7.1f} pages/s)")
+    print(f"   Speedup:  {serial_time / parallel_time:8.2f}x")
+    print(f"   Output identical: {'✓' if serial_text == parallel_text else '✗'}")
+
+if __name__ == "__main__":
+    main()
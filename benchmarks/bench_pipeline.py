@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the whole PDF -> study materials pipeline offline with the fake LLM backend
+
+Extracts and chunks a synthetic textbook, generates all seven artifacts
+through the request scheduler at several concurrency levels, then parses
+the results with the quiz and flashcard parsers. No network or API key is
+needed. Latency and error injection come from SHRINX_FAKE_LATENCY and
+SHRINX_FAKE_ERROR_RATE.
+
+Usage: python benchmarks/bench_pipeline.py [pages] [latency_seconds] [error_rate]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SHRINX_BACKEND"] = "fake"
+
+import ai_utils
+import chunker
+import llm_backend
+import pdf_utils
+import request_scheduler
+import response_cache
+from flashcard_system import FlashcardSystem
+from generation_engine import iter_generated
+from pdf_utils import make_synthetic_pdf
+from quiz_system import QuizSystem
+
+GENERATORS = [
+    ("summary", ai_utils.generate_summary),
+    ("notes", ai_utils.generate_notes),
+    ("flashcards", ai_utils.generate_flashcards),
+    ("mcq_questions", ai_utils.generate_mcq_questions),
+    ("fill_blanks", ai_utils.generate_fill_blanks),
+    ("true_false", ai_utils.generate_true_false),
+    ("qa_questions", ai_utils.generate_qa_questions),
+]
+
+def run_pipeline(text, chunks, concurrency, latency, error_rate, cache_dir):
+    """Generate every artifact once with a cold response cache; returns (results, failures, seconds, client)"""
+    client = llm_backend.FakeClient(latency=latency, error_rate=error_rate)
+    ai_utils.client = client
+    response_cache._default_cache = response_cache.ResponseCache(Path(cache_dir) / f"responses-{concurrency}.sqlite3")
+    request_scheduler._default_scheduler = request_scheduler.RequestScheduler(
+        rpm=100000, input_tpm=10 ** 9, output_tpm=10 ** 9, max_concurrency=concurrency * len(chunks))
+    request_scheduler.BACKOFF_BASE_SECONDS = latency / 4
+
+    results = {}
+    failures = {}
+    start = time.perf_counter()
+    ai_utils.prime_document_cache(text, chunks)
+    generators = [(name, partial(func, chunks=chunks)) for name, func in GENERATORS]
+    for name, content, error in iter_generated(text, generators, max_concurrency=concurrency):
+        if error is not None:
+            failures[name] = error
+        else:
+            results[name] = content
+    elapsed = time.perf_counter() - start
+    response_cache._default_cache.close()
+    return results, failures, elapsed, client
+
+def parse_all(results):
+    quiz = QuizSystem()
+    flashcards = FlashcardSystem()
+    parsers = {
+        'flashcards': flashcards.parse_flashcards,
+        'mcq_questions': quiz.parse_mcq_questions,
+        'fill_blanks': quiz.parse_fill_blanks,
+        'true_false': quiz.parse_true_false,
+    }
+    return {name: len(parse(results[name])) for name, parse in parsers.items() if name in results}
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else llm_backend.FAKE_LATENCY
+    error_rate = float(sys.argv[3]) if len(sys.argv) > 3 else llm_backend.FAKE_ERROR_RATE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, pages)
+
+        start = time.perf_counter()
+        page_texts = pdf_utils.extract_pages(pdf_path, use_cache=False)
+        text = pdf_utils.join_pages(page_texts)
+        chunks = chunker.chunk_pdf(pdf_path, pages=page_texts)
+        prepare_time = time.perf_counter() - start
+        print(f"📄 {pages} pages, {len(text)} characters, {len(chunks)} chunk(s) "
+              f"(extract + chunk {prepare_time:.2f}s)")
+        print(f"   Fake backend: {latency:.2f}s latency, {error_rate:.0%} injected errors")
+
+        baseline = None
+        for concurrency in (1, 3, 7):
+            results, failures, elapsed, client = run_pipeline(text, chunks, concurrency, latency, error_rate, tmp)
+            baseline = baseline or elapsed
+            start = time.perf_counter()
+            parsed = parse_all(results)
+            parse_time = time.perf_counter() - start
+            print(f"   Concurrency {concurrency}: {elapsed:6.2f}s ({baseline / elapsed:4.1f}x), "
+                  f"{client.calls} requests, {client.errors} injected errors, {len(failures)} failed artifact(s)")
+            print(f"      Parsed {sum(parsed.values())} items in {parse_time * 1000:.1f} ms: "
+                  + ", ".join(f"{name} {count}" for name, count in parsed.items()))
+
+if __name__ == "__main__":
+    main()
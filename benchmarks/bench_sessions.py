@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Replay simulated study sessions through study_session
+
+Simulated learners take quizzes of every kind and study flashcards through
+the same QuizSession and FlashcardSession the terminal and the GUI drive,
+with no input() or screen in the way. Quiz answers are right with the
+learner's ability as probability, and typed fill-in-the-blank answers get
+the slips people make (case, plurals, typos). Flashcard learners study a
+deck every day for a month on a simulated clock, recalling a card with a
+probability that falls the later it is reviewed. Prints sessions and
+answers per second for each kind of session; with --store every answer and
+review is also saved to a temporary review store.
+
+Usage: python benchmarks/bench_sessions.py [sessions] [--store]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import artifact_parser
+from bench_matcher import STYLES, typed
+from bench_parsers import make_text
+from deck import OPTION_LETTERS, Deck
+from review_store import ReviewStore
+from spaced_repetition import DAY
+from study_session import QUIZ_KINDS, FlashcardSession, QuizSession, run_flashcards, run_quiz
+
+QUESTIONS_PER_QUIZ = 20
+CARDS_PER_DECK = 30
+STUDY_DAYS = 30
+
+def decks(kind, count, size):
+    """count decks of size items each, cut from one generated library"""
+    items = artifact_parser.parse(kind, make_text(kind, 0.1))[0]
+    return [Deck(kind, [items[(start + i) % len(items)] for i in range(size)]) for start in range(count)]
+
+def quiz_answer(kind, ability, rng):
+    def answer(prompt, item):
+        right = rng.random() < ability
+        if kind == 'mcq_questions':
+            return item['correct'] if right else rng.choice([letter for letter in OPTION_LETTERS
+                                                            if letter != item['correct']])
+        if kind == 'true_false':
+            truth = item['answer'].lower().startswith('true')
+            return "t" if truth == right else "f"
+        return typed(item['answer'], rng.choice(STYLES[:-1]) if right else 'wrong', rng)
+    return answer
+
+def card_grader(clock, rng):
+    def grade(card, state):
+        # Each review takes the learner ten seconds
+        clock[0] += 10
+        if state.last_review is None:
+            return 'good' if rng.random() < 0.7 else 'again'
+        overdue = (clock[0] - state.last_review) / max(state.interval * DAY, 60.0)
+        if rng.random() > 0.9 ** overdue:
+            return 'again'
+        return rng.choice(('hard', 'good', 'good', 'easy'))
+    return grade
+
+def study_month(cards, on_review, rng):
+    """One learner studying a deck daily on a simulated clock; returns cards reviewed"""
+    clock = [1.7e9]
+    grade = card_grader(clock, rng)
+    states = ()
+    reviewed = 0
+    for _ in range(STUDY_DAYS):
+        session = FlashcardSession(cards, states, on_review=on_review, clock=lambda: clock[0], rng=rng)
+        reviewed += run_flashcards(session, grade, limit=10 * len(cards))['reviewed']
+        states = session.scheduler.states.values()
+        clock[0] += DAY
+    return reviewed
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 2000
+    use_store = "--store" in sys.argv
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReviewStore(os.path.join(tmp, "reviews.sqlite3")) if use_store else None
+        print(f"📊 {count} simulated sessions per quiz kind, {count // 20} learners studying flashcards "
+              f"for {STUDY_DAYS} days" + (" (saving to a review store)" if store else ""))
+        print(f"\n{'session':<16}{'sessions/s':>12}{'answers/s':>12}{'µs/answer':>11}{'mean score':>12}")
+
+        for kind in QUIZ_KINDS:
+            pool = decks(kind, 50, QUESTIONS_PER_QUIZ)
+            on_answer = None
+            if store:
+                on_answer = lambda kind, item, answer, points: store.record_attempt(
+                    0.0, "simulated", kind, item['question'], answer, points)
+            started = time.perf_counter()
+            answers = 0
+            score = 0.0
+            for number in range(count):
+                session = QuizSession(kind, pool[number % len(pool)], on_answer=on_answer)
+                summary = run_quiz(session, quiz_answer(kind, rng.uniform(0.3, 0.95), rng))
+                answers += summary['answered']
+                score += summary['percentage']
+            if store:
+                store.flush()
+            seconds = time.perf_counter() - started
+            print(f"{kind:<16}{count / seconds:>12.0f}{answers / seconds:>12.0f}{seconds / answers * 1e6:>11.1f}"
+                  f"{score / count:>11.0f}%")
+
+        pool = decks('flashcards', 10, CARDS_PER_DECK)
+        on_review = None
+        if store:
+            on_review = lambda state, grade: store.record_review("simulated", state, grade)
+        learners = max(1, count // 20)
+        started = time.perf_counter()
+        reviews = sum(study_month(pool[number % len(pool)], on_review, rng) for number in range(learners))
+        if store:
+            store.flush()
+        seconds = time.perf_counter() - started
+        sessions = learners * STUDY_DAYS
+        print(f"{'flashcards':<16}{sessions / seconds:>12.0f}{reviews / seconds:>12.0f}"
+              f"{seconds / reviews * 1e6:>11.1f}{reviews / sessions:>9.1f}/day")
+        if store:
+            store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Structure-aware chunking of extracted PDF text
+
+Section boundaries come from the PDF outline (bookmarks) when the file has
+one, otherwise from heading heuristics on the page text. Whole sections are
+packed into chunks that fit a token budget; a section is only cut when it is
+larger than the budget on its own, and then at page, paragraph or line
+boundaries. Every chunk records the pages it came from and the sections it
+contains, so a single section can be found and regenerated later.
+"""
+
+import json
+import os
+import re
+
+# Token budget for the document text sent in a single request
+CHUNK_TOKENS = int(os.getenv("SHRINX_CHUNK_TOKENS", "6000"))
+
+# Rough average for English prose; good enough for budgeting requests
+CHARS_PER_TOKEN = 4
+
+# "Chapter 3", "SECTION II: Cells", "Part 2 - Genetics", "Appendix A"
+NAMED_HEADING = re.compile(r"^(chapter|section|part|unit|lesson|module|appendix)\s+([0-9]+|[ivxlc]+|[a-z])\b",
+                           re.IGNORECASE)
+# "2.3 Cell Membranes", "4. Photosynthesis"
+NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\.?\s+[A-Z]")
+MAX_HEADING_WORDS = 10
+
+class Chunk:
+    def __init__(self, text, start_page=None, end_page=None, titles=None):
+        self.text = text
+        self.start_page = start_page
+        self.end_page = end_page
+        self.titles = titles or []
+
+    @property
+    def title(self):
+        """Title of the first section in the chunk"""
+        return self.titles[0] if self.titles else None
+
+    def to_dict(self):
+        return {
+            'titles': self.titles,
+            'start_page': self.start_page,
+            'end_page': self.end_page,
+            'tokens': estimate_tokens(self.text),
+        }
+
+    def __repr__(self):
+        return f"Chunk(pages={self.start_page}-{self.end_page}, titles={self.titles!r}, tokens={estimate_tokens(self.text)})"
+
+def estimate_tokens(text):
+    """Approximate token count of a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def is_heading(line):
+    """Heuristic check for a section heading line in extracted PDF text"""
+    line = line.strip()
+    if len(line) < 3 or len(line) > 80 or line[-1] in ".,;:":
+        return False
+    if len(line.split()) > MAX_HEADING_WORDS:
+        return False
+    if NAMED_HEADING.match(line) or NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters)
+
+def read_outline(pdf_path):
+    """
+    Flattened PDF outline as a list of (title, page_number) in page order.
+
+    Returns an empty list when the PDF has no bookmarks or PyPDF2 is missing.
+    """
+    try:
+        import PyPDF2
+    except ImportError:
+        return []
+
+    entries = []
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            try:
+                page_index = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            if page_index is not None and page_index >= 0:
+                entries.append((str(item.title).strip(), page_index + 1))
+
+    try:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            walk(reader.outline)
+    except Exception:
+        return []
+    return sorted(entries, key=lambda entry: entry[1])
+
+def _normalize(text):
+    return re.sub(r"\W+", " ", text).strip().lower()
+
+def find_sections(pages, outline=None):
+    """
+    Split pages into sections.
+
+    Returns a list of (title, segments) where segments is a list of
+    (page_number, text) pieces in document order. Text before the first
+    heading forms a section with title None.
+    """
+    outline = outline or []
+    starts_by_page = {}
+    for title, page_number in outline:
+        starts_by_page.setdefault(page_number, []).append(title)
+
+    sections = []
+    title = None
+    segments = []
+
+    def start_section(new_title):
+        nonlocal title, segments
+        if segments or title is not None:
+            sections.append((title, segments))
+        title = new_title
+        segments = []
+
+    for page_number, text in pages:
+        lines = text.splitlines()
+        breaks = {}
+        if outline:
+            # Cut at the line matching each bookmark title, or at the top of its page
+            for outline_title in starts_by_page.get(page_number, []):
+                wanted = _normalize(outline_title)
+                index = next((i for i, line in enumerate(lines)
+                              if wanted and _normalize(line).startswith(wanted)), 0)
+                while index in breaks and index < len(lines):
+                    index += 1
+                breaks[index] = outline_title
+        else:
+            for i, line in enumerate(lines):
+                if is_heading(line):
+                    breaks[i] = line.strip()
+
+        current = []
+        for i, line in enumerate(lines + [None]):
+            if i in breaks:
+                if current:
+                    segments.append((page_number, "\n".join(current)))
+                    current = []
+                start_section(breaks[i])
+            if line is not None:
+                current.append(line)
+        if current:
+            segments.append((page_number, "\n".join(current)))
+
+    start_section(None)
+    return [(title, segs) for title, segs in sections if segs]
+
+def chunk_pages(pages, outline=None, max_tokens=None):
+    """Section-aligned chunks with page metadata from (page_number, text) pairs"""
+    budget = max_tokens or CHUNK_TOKENS
+    chunks = []
+    small = []
+    for title, segments in find_sections(pages, outline):
+        pieces = _split_section(title, segments, budget)
+        if len(pieces) == 1:
+            small.extend(pieces)
+            continue
+        # An oversized section gets chunks of its own rather than sharing with its neighbours
+        chunks.extend(_pack(small, budget))
+        chunks.extend(_pack(pieces, budget))
+        small = []
+    chunks.extend(_pack(small, budget))
+    return chunks
+
+def chunk_pdf(pdf_path, max_tokens=None, pages=None, backend=None):
+    """Section-aligned chunks for a PDF, using its outline when it has one"""
+    if pages is None:
+        from pdf_utils import extract_pages
+        pages = extract_pages(pdf_path, backend=backend)
+    return chunk_pages(pages, read_outline(pdf_path), max_tokens)
+
+def save_chunk_index(path, chunks):
+    """Write the section titles and page ranges of each chunk as JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([chunk.to_dict() for chunk in chunks], f, indent=2)
+
+def chunk_text(text, max_tokens=None):
+    """Section-aligned chunks for plain text with no page information"""
+    return chunk_pages([(None, text)], max_tokens=max_tokens)
+
+def _split_section(title, segments, budget):
+    """Break one section into pieces (title, start_page, end_page, text) within the budget"""
+    text = "\n".join(segment for _, segment in segments).strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= budget:
+        return [(title, segments[0][0], segments[-1][0], text)]
+
+    # Too big for one chunk: cut at page boundaries, then paragraphs and lines
+    pieces = []
+    for page_number, segment in segments:
+        for part in split_by_size(segment, budget):
+            pieces.append((title, page_number, page_number, part))
+    return pieces
+
+def _pack(pieces, budget):
+    """Greedily pack consecutive pieces into chunks that fit the budget"""
+    max_chars = budget * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    length = 0
+    for piece in pieces:
+        if current and length + len(piece[3]) + 1 > max_chars:
+            chunks.append(_make_chunk(current))
+            current = []
+            length = 0
+        current.append(piece)
+        length += len(piece[3]) + 1
+    if current:
+        chunks.append(_make_chunk(current))
+    return chunks
+
+def _make_chunk(pieces):
+    titles = []
+    for title, _, _, _ in pieces:
+        if title and title not in titles:
+            titles.append(title)
+    pages = [page for _, start, end, _ in pieces for page in (start, end) if page is not None]
+    return Chunk(
+        "\n".join(piece[3] for piece in pieces).strip(),
+        min(pages) if pages else None,
+        max(pages) if pages else None,
+        titles
+    )
+
+def split_by_size(text, max_tokens):
+    """
+    Split text into pieces of at most max_tokens (estimated).
+
+    Breaks fall on paragraph boundaries where possible, then on line
+    boundaries, and only cut through a line when a single line is too long.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    parts = []
+    current = []
+    current_len = 0
+    for unit in _split_units(text, max_chars):
+        if current and current_len + len(unit) > max_chars:
+            parts.append("".join(current).strip())
+            current = []
+            current_len = 0
+        current.append(unit)
+        current_len += len(unit)
+    if current:
+        parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+def _split_units(text, max_chars):
+    """Yield pieces of text no longer than max_chars, preferring natural boundaries"""
+    for paragraph in re.split(r"(?<=\n)(?=\s*\n)", text):
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for line in paragraph.splitlines(keepends=True):
+            for start in range(0, len(line), max_chars):
+                yield line[start:start + max_chars]
+
+def find_chunk(chunks, title):
+    """First chunk containing a section whose title matches, for regenerating one section"""
+    wanted = _normalize(title)
+    for chunk in chunks:
+        if any(_normalize(t) == wanted for t in chunk.titles):
+            return chunk
+    return None
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        budget = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        for i, chunk in enumerate(chunk_pdf(sys.argv[1], budget), 1):
+            print(f"{i:3}. pages {chunk.start_page}-{chunk.end_page} "
+                  f"(~{estimate_tokens(chunk.text)} tokens): {', '.join(chunk.titles) or '(untitled)'}")
+    else:
+        print("Usage: python chunker.py <path_to_pdf> [max_tokens]")
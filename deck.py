@@ -0,0 +1,220 @@
+"""
+Compact storage for large sets of flashcards and questions
+
+A Deck keeps the items of one kind column by column instead of as a list
+of dicts: every field is an array of 4-byte ids into one string table, and
+a text that occurs many times (answers like "True", letters, repeated
+explanations) is stored once. The table is a single UTF-8 buffer with an
+array of offsets, so a text costs its bytes plus 4 instead of a str object
+with its header and a pointer to it. Items are read through ItemView, a
+two-slot view that answers item['question'] like the dicts did, so code
+that only reads items works unchanged. Study sessions order, shuffle and
+pick cards through arrays of item indices and never move the items
+themselves.
+
+Usage: python deck.py --self-check
+"""
+
+from array import array
+
+from artifact_parser import KINDS
+
+OPTION_LETTERS = "ABCD"
+# Stored columns per kind; multiple choice options are four columns
+FIELDS = {
+    'flashcards': ('question', 'answer'),
+    'mcq_questions': ('question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct', 'explanation'),
+    'fill_blanks': ('question', 'answer', 'explanation'),
+    'true_false': ('question', 'answer', 'explanation'),
+    'qa_questions': ('question', 'answer', 'explanation'),
+}
+# Keys of the dicts each kind used to be, which ItemView answers to
+ITEM_KEYS = {
+    'flashcards': ('question', 'answer'),
+    'mcq_questions': ('question', 'options', 'correct', 'explanation'),
+    'fill_blanks': ('question', 'answer', 'explanation'),
+    'true_false': ('question', 'answer', 'explanation'),
+    'qa_questions': ('question', 'answer', 'explanation'),
+}
+_OPTION_FIELDS = FIELDS['mcq_questions'][1:5]
+
+class ItemView:
+    """Read-only, dict-like view of one item in a Deck"""
+    __slots__ = ('deck', 'index')
+
+    def __init__(self, deck, index):
+        self.deck = deck
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.deck.get(self.index, key)
+
+    def get(self, key, default=None):
+        if key not in ITEM_KEYS[self.deck.kind]:
+            return default
+        return self.deck.get(self.index, key)
+
+    def keys(self):
+        return ITEM_KEYS[self.deck.kind]
+
+    def __contains__(self, key):
+        return key in ITEM_KEYS[self.deck.kind]
+
+    def to_dict(self):
+        return {key: self.deck.get(self.index, key) for key in ITEM_KEYS[self.deck.kind]}
+
+    def __eq__(self, other):
+        if isinstance(other, ItemView):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"ItemView({self.to_dict()})"
+
+class Deck:
+    """Items of one kind stored as id columns over a shared string table"""
+
+    def __init__(self, kind, items=()):
+        if kind not in KINDS:
+            raise ValueError(f"unknown artifact kind: {kind}")
+        self.kind = kind
+        # Text number n is _text[_offsets[n]:_offsets[n + 1]]; number 0 is ""
+        self._text = bytearray()
+        self._offsets = array('I', [0, 0])
+        # text -> number while items are being added; dropped by compact() to save memory
+        self._ids = {"": 0}
+        self.columns = {field: array('I') for field in FIELDS[kind]}
+        self.extend(items)
+
+    def __len__(self):
+        return len(self.columns['question'])
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("deck index out of range")
+        return ItemView(self, index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ItemView(self, index)
+
+    @property
+    def unique_strings(self):
+        return len(self._offsets) - 1
+
+    def string(self, number):
+        offsets = self._offsets
+        return self._text[offsets[number]:offsets[number + 1]].decode("utf-8")
+
+    def _id(self, text):
+        ids = self._ids
+        if ids is None:
+            self._text = bytearray(self._text)
+            ids = self._ids = {self.string(number): number for number in range(self.unique_strings)}
+        number = ids.get(text)
+        if number is None:
+            number = ids[text] = self.unique_strings
+            self._text += text.encode("utf-8")
+            self._offsets.append(len(self._text))
+        return number
+
+    def append(self, item):
+        columns = self.columns
+        add = self._id
+        if self.kind == 'mcq_questions':
+            options = list(item['options'])
+            if len(options) != 4:
+                raise ValueError(f"expected 4 options, found {len(options)}")
+            for field, option in zip(_OPTION_FIELDS, options):
+                columns[field].append(add(option))
+            columns['question'].append(add(item['question']))
+            columns['correct'].append(add(item['correct']))
+            columns['explanation'].append(add(item.get('explanation', "")))
+        else:
+            for field in FIELDS[self.kind]:
+                columns[field].append(add(item.get(field, "")))
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+        self.compact()
+
+    def compact(self):
+        """Drop the lookup table used while adding items; it is rebuilt if more are added"""
+        self._ids = None
+        self._text = bytes(self._text)
+
+    def get(self, index, key):
+        """One field of an item, by the key its dict used"""
+        if key == 'options':
+            columns = self.columns
+            return [self.string(columns[field][index]) for field in _OPTION_FIELDS]
+        return self.string(self.columns[key][index])
+
+    def column(self, key):
+        """Every item's value of one field, in order"""
+        text = self._text
+        offsets = self._offsets
+        return [text[offsets[number]:offsets[number + 1]].decode("utf-8") for number in self.columns[key]]
+
+    def to_dicts(self):
+        return [view.to_dict() for view in self]
+
+    def order(self):
+        """Index array over the items, to shuffle or reorder without moving them"""
+        return array('I', range(len(self)))
+
+def as_deck(kind, items):
+    """items as a Deck, without copying if it already is one"""
+    if isinstance(items, Deck):
+        return items
+    return Deck(kind, items)
+
+def _run_self_check():
+    """Round-trip every kind through a Deck and check its views behave like the dicts"""
+    import random
+    import sys
+
+    problems = []
+    rng = random.Random(0)
+    samples = {
+        'flashcards': [{'question': f"Q{i}?", 'answer': rng.choice(["yes", "no", f"A{i}"])} for i in range(200)],
+        'mcq_questions': [{'question': f"Q{i}?", 'options': [f"{letter}) option {rng.randrange(5)}"
+                                                             for letter in OPTION_LETTERS],
+                           'correct': rng.choice(OPTION_LETTERS), 'explanation': rng.choice(["", "Because."])}
+                          for i in range(200)],
+        'true_false': [{'question': f"S{i}.", 'answer': rng.choice(["True", "False"]), 'explanation': ""}
+                       for i in range(200)],
+    }
+    for kind, items in samples.items():
+        deck = Deck(kind, items)
+        if deck.to_dicts() != items or list(deck) != items:
+            problems.append(f"{kind}: items do not round-trip")
+        if deck[-1] != items[-1] or deck[5]['question'] != items[5]['question']:
+            problems.append(f"{kind}: views do not read like the dicts")
+        deck.append(items[0])
+        if len(deck) != len(items) + 1 or deck[len(items)] != items[0]:
+            problems.append(f"{kind}: appending after compact() fails")
+        if deck.unique_strings >= sum(len(item) for item in items):
+            problems.append(f"{kind}: repeated texts are not stored once")
+    deck = Deck('true_false', samples['true_false'])
+    order = deck.order()
+    rng.shuffle(order)
+    if sorted(deck[i]['question'] for i in order) != sorted(item['question'] for item in samples['true_false']):
+        problems.append("shuffling the index array loses items")
+    if sys.getsizeof(deck.columns['answer']) > 8 * len(deck) or deck._ids is not None:
+        problems.append("columns are not compact")
+
+    if problems:
+        print("❌ Deck check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ Decks round-trip {', '.join(samples)} and read like the original dicts")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    print("Usage: python deck.py --self-check")
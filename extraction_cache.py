@@ -0,0 +1,105 @@
+"""
+On-disk cache for extracted PDF text, keyed by the content hash of the PDF
+
+Entries live in sharded files under .shrinx_cache/extracted and are evicted
+least-recently-used first once the cache grows past its size cap.
+
+Usage: python extraction_cache.py [stats|purge]
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("SHRINX_CACHE_DIR", ".shrinx_cache")) / "extracted"
+MAX_CACHE_BYTES = int(os.getenv("SHRINX_EXTRACT_CACHE_MB", "256")) * 1024 * 1024
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(pdf_path, extractor):
+    """Cache key for a PDF and the extractor (backend + version) used to read it"""
+    return hashlib.sha256(f"{file_sha256(pdf_path)}:{extractor}".encode("utf-8")).hexdigest()
+
+def _entry_path(key):
+    return CACHE_DIR / key[:2] / f"{key}.txt"
+
+def get(key):
+    """Return cached text for key, or None on a miss"""
+    path = _entry_path(key)
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    # Bump the modification time so eviction treats this entry as recently used
+    os.utime(path)
+    return text
+
+def put(key, text):
+    """Store text under key, then evict old entries if the cache is over its cap"""
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    evict()
+
+def _entries():
+    if not CACHE_DIR.exists():
+        return []
+    entries = []
+    for path in CACHE_DIR.glob("*/*.txt"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+def stats():
+    """Summary of the cache contents"""
+    entries = _entries()
+    return {
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': MAX_CACHE_BYTES,
+        'path': str(CACHE_DIR),
+    }
+
+def purge():
+    """Delete every cached entry and return how many were removed"""
+    return evict(max_bytes=0)
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "stats":
+        info = stats()
+        print(f"Extraction cache: {info['path']}")
+        print(f"  Entries: {info['entries']}")
+        print(f"  Size: {info['bytes'] / 1024 / 1024:.1f} MB of {info['max_bytes'] / 1024 / 1024:.0f} MB")
+    elif command == "purge":
+        print(f"Removed {purge()} cached extraction(s)")
+    else:
+        print("Usage: python extraction_cache.py [stats|purge]")
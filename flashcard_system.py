@@ -1,67 +1,66 @@
-import random
+import time
+
+from artifact_parser import parse_items
+from spaced_repetition import GRADES, format_interval
+from study_session import FINISHED, FlashcardSession, ReviewSession, review_message
+
+# Keys for grading a card after its answer is shown
+GRADE_KEYS = {'a': 'again', 'h': 'hard', 'g': 'good', 'e': 'easy'}
 
 class FlashcardSystem:
     def __init__(self):
-        self.current_card = 0
-        self.cards = []
+        # FlashcardSession of the study session in progress
+        self.session = None
+        self.scheduler = None
     
     def parse_flashcards(self, flashcard_text):
         """Parse flashcards from AI-generated text"""
-        cards = []
-        card_blocks = flashcard_text.split('---')
-        
-        for block in card_blocks:
-            lines = block.strip().split('\n')
-            question = ""
-            answer = ""
-            
-            for line in lines:
-                if line.startswith('Q:'):
-                    question = line.split(':', 1)[1].strip()
-                elif line.startswith('A:'):
-                    answer = line.split(':', 1)[1].strip()
-            
-            if question and answer:
-                cards.append({
-                    'question': question,
-                    'answer': answer
-                })
-        
-        return cards
+        return parse_items('flashcards', flashcard_text)
     
-    def study_flashcards(self, cards):
-        """Interactive flashcard study session"""
+    def study_flashcards(self, cards, states=(), on_review=None):
+        """
+        Interactive flashcard study session.
+        
+        Cards are shown in order of when they are due and grading a card
+        reschedules it. Pass the CardStates of an earlier session to continue
+        its schedule; the updated states are in self.scheduler afterwards.
+        on_review(state, grade) is called after every graded card, e.g. to
+        save it. The FlashcardSession decides what comes next; this loop only
+        shows cards and reads commands.
+        """
         if not cards:
             print("No flashcards available!")
             return
         
-        self.cards = cards
+        session = self.session = FlashcardSession(cards, states, on_review=on_review)
+        self.scheduler = session.scheduler
+        
         print(f"\n🃏 Starting Flashcard Study Session!")
-        print(f"Total cards: {len(cards)}")
+        print(f"Total cards: {len(session)}, due now: {self.scheduler.due_count()}")
         print("Commands: 'n' = next, 'p' = previous, 'r' = random, 's' = shuffle, 'q' = quit")
         print("=" * 60)
         
-        self.current_card = 0
-        shuffled = False
+        if session.start() is None:
+            self.show_nothing_due()
+            return
         
         while True:
-            self.show_flashcard(self.current_card)
+            self.show_flashcard()
             
             command = input("\nPress Enter to reveal answer, or enter command: ").strip().lower()
             
             if command == '':
                 # Show answer
-                print(f"\n💡 Answer: {self.cards[self.current_card]['answer']}")
+                print(f"\n💡 Answer: {session.reveal()}")
                 
                 while True:
-                    next_action = input("\nHow did you do? (e)asy, (h)ard, (n)ext, (p)rev, (q)uit: ").lower()
-                    if next_action in ['e', 'easy']:
-                        print("Great! 🌟")
-                        self.next_card()
-                        break
-                    elif next_action in ['h', 'hard']:
-                        print("No worries, keep practicing! 💪")
-                        self.next_card()
+                    next_action = input("\nHow did you do? (a)gain, (h)ard, (g)ood, (e)asy, (n)ext, (p)rev, (q)uit: ").lower()
+                    grade = GRADE_KEYS.get(next_action, next_action)
+                    if grade in GRADES:
+                        self.show_grade(grade, session.grade(grade))
+                        if session.state == FINISHED:
+                            self.show_nothing_due()
+                            return
                         break
                     elif next_action in ['n', 'next']:
                         self.next_card()
@@ -72,19 +71,17 @@ class FlashcardSystem:
                     elif next_action in ['q', 'quit']:
                         return
                     else:
-                        print("Please enter e, h, n, p, or q")
+                        print("Please enter a, h, g, e, n, p, or q")
             
             elif command in ['n', 'next']:
                 self.next_card()
             elif command in ['p', 'prev', 'previous']:
                 self.prev_card()
             elif command in ['r', 'random']:
-                self.current_card = random.randint(0, len(self.cards) - 1)
+                session.jump_random()
             elif command in ['s', 'shuffle']:
-                random.shuffle(self.cards)
-                self.current_card = 0
+                session.shuffle()
                 print("🔀 Cards shuffled!")
-                shuffled = True
             elif command in ['q', 'quit']:
                 break
             else:
@@ -92,18 +89,72 @@ class FlashcardSystem:
         
         print("\n📚 Study session completed! Great work!")
     
-    def show_flashcard(self, index):
+    def review_due(self, queue):
+        """Review the due cards of every topic from a ReviewQueue"""
+        print(f"\n🔁 Reviewing everything due today")
+        print("Commands: Enter = reveal answer, 's' = skip, 'q' = quit")
+        print("=" * 60)
+        
+        session = self.session = ReviewSession(queue)
+        card = session.start()
+        while card is not None:
+            print("\n" + "=" * 60)
+            print(f"📚 {session.topic.replace('_', ' ')}")
+            print("=" * 60)
+            print(f"❓ Question: {card['question']}")
+            print("=" * 60)
+            
+            command = input("\nPress Enter to reveal answer, or enter command: ").strip().lower()
+            if command in ['q', 'quit']:
+                break
+            if command in ['s', 'skip']:
+                card = session.skip()
+                continue
+            print(f"\n💡 Answer: {session.reveal()}")
+            
+            while True:
+                next_action = input("\nHow did you do? (a)gain, (h)ard, (g)ood, (e)asy, (q)uit: ").strip().lower()
+                grade = GRADE_KEYS.get(next_action, next_action)
+                if grade in GRADES:
+                    self.show_grade(grade, session.grade(grade))
+                    break
+                elif next_action in ['q', 'quit']:
+                    print(f"\n📚 Review session completed! {session.reviewed} card(s) reviewed.")
+                    return
+                else:
+                    print("Please enter a, h, g, e, or q")
+            card = session.card()
+        
+        if session.state == FINISHED:
+            print(f"\n{review_message(session.summary())}")
+        print(f"\n📚 Review session completed! {session.reviewed} card(s) reviewed.")
+    
+    def show_grade(self, grade, state):
+        """Tell the user when a graded card comes back"""
+        if grade == 'again':
+            print("No worries, it will come back shortly! 💪")
+        else:
+            print(f"{'Great! 🌟' if grade == 'easy' else 'Nice! 👍'} Next review in {format_interval(state.due - time.time())}")
+    
+    def show_nothing_due(self):
+        print(f"\n🎉 No cards due right now. Next review in {format_interval(self.session.next_review())}")
+    
+    def current(self):
+        """The card at the current position"""
+        return self.session.card()
+    
+    def show_flashcard(self):
         """Display current flashcard"""
         print("\n" + "=" * 60)
-        print(f"Card {index + 1} of {len(self.cards)}")
+        print(f"Card {self.session.position + 1} of {len(self.session)}")
         print("=" * 60)
-        print(f"❓ Question: {self.cards[index]['question']}")
+        print(f"❓ Question: {self.current()['question']}")
         print("=" * 60)
     
     def next_card(self):
         """Move to next card"""
-        self.current_card = (self.current_card + 1) % len(self.cards)
+        self.session.move(1)
     
     def prev_card(self):
         """Move to previous card"""
-        self.current_card = (self.current_card - 1) % len(self.cards)
\ No newline at end of file
+        self.session.move(-1)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Concurrent generation engine for running the study material generators in parallel
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Maximum number of generator calls allowed in flight at once
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("SHRINX_MAX_CONCURRENCY", "7"))
+
+# Minimum seconds between streaming progress updates sent to a UI
+STREAM_UPDATE_INTERVAL = 0.15
+
+def iter_generated(text, generators, max_concurrency=None, on_start=None):
+    """
+    Run every generator on the same text concurrently and yield results as they finish.
+
+    generators is a list of (name, func) pairs. Yields (name, content, error)
+    tuples in completion order; error is None on success, otherwise the
+    exception raised by that generator (content is then None).
+    """
+    if not generators:
+        return
+
+    workers = max_concurrency or DEFAULT_MAX_CONCURRENCY
+    workers = max(1, min(workers, len(generators)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shrinx-gen") as executor:
+        futures = {}
+        for name, func in generators:
+            if on_start:
+                on_start(name)
+            futures[executor.submit(func, text)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                yield name, None, e
+
+def generate_all(text, generators, max_concurrency=None, on_start=None):
+    """Run every generator concurrently and return a dict of name -> content, raising on the first failure"""
+    results = {}
+    for name, content, error in iter_generated(text, generators, max_concurrency, on_start):
+        if error is not None:
+            raise error
+        results[name] = content
+    return results
+
+def map_concurrent(func, items, max_concurrency=None):
+    """Apply func to every item concurrently and return the results in input order"""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+
+    workers = max(1, min(max_concurrency or DEFAULT_MAX_CONCURRENCY, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shrinx-map") as executor:
+        return list(executor.map(func, items))
+
+class StreamProgress:
+    """
+    Collects streamed text per label and reports it at most every `interval` seconds.
+
+    Use an instance as a stream listener. on_update(texts) receives a dict of
+    label -> text received so far; it is called from whichever thread the
+    text arrives on, so UI code must hand it over to its own event loop. The
+    first text is reported immediately so output appears as soon as possible.
+    """
+
+    def __init__(self, on_update, interval=STREAM_UPDATE_INTERVAL):
+        self.on_update = on_update
+        self.interval = interval
+        self.texts = {}
+        self._last_update = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, label, text, request_id=None):
+        with self._lock:
+            if text is None:
+                self.texts.pop(label, None)
+                return
+            if not text:
+                return
+            self.texts[label] = self.texts.get(label, "") + text
+            now = time.monotonic()
+            if now - self._last_update < self.interval:
+                return
+            self._last_update = now
+            snapshot = dict(self.texts)
+        self.on_update(snapshot)
+
+    def finish(self, label):
+        """Forget an artifact that is complete (including its "<label> (combine)" requests) and report the rest"""
+        with self._lock:
+            for key in [key for key in self.texts if key == label or key.startswith(label + " ")]:
+                del self.texts[key]
+            snapshot = dict(self.texts)
+        self.on_update(snapshot)
+
+def write_atomic(path, text):
+    """Write text so that readers see either the old file or the complete new one"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
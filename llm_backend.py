@@ -0,0 +1,354 @@
+"""
+Pluggable LLM backend used by the generators
+
+The generators talk to a client object with the same shape as
+anthropic.Anthropic (client.messages.with_raw_response.create(...)).
+make_client() returns the real SDK client, or with SHRINX_BACKEND=fake an
+offline FakeClient that answers every artifact prompt with correctly
+formatted, deterministic content of realistic size. The fake supports
+configurable latency and error injection, so the whole pipeline (scheduler,
+caches, generators, parsers) can be benchmarked with no network or API key.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+BACKEND = os.getenv("SHRINX_BACKEND", "anthropic").lower()
+
+# Fake backend settings
+FAKE_LATENCY = float(os.getenv("SHRINX_FAKE_LATENCY", "0.5"))           # seconds per request
+FAKE_TOKENS_PER_SECOND = float(os.getenv("SHRINX_FAKE_TOKENS_PER_SECOND", "0"))  # 0 = no output-time cost
+FAKE_ERROR_RATE = float(os.getenv("SHRINX_FAKE_ERROR_RATE", "0"))       # fraction of attempts that fail
+FAKE_SEED = int(os.getenv("SHRINX_FAKE_SEED", "0"))
+
+# Status codes injected by the fake, matching the transient errors seen from the real API
+FAKE_ERROR_STATUSES = (429, 529, 500)
+
+CHARS_PER_TOKEN = 4
+
+def make_client(api_key=None):
+    """Client for the configured backend; retries are left to the request scheduler"""
+    if BACKEND == "fake":
+        return FakeClient()
+    import anthropic
+    return anthropic.Anthropic(api_key=api_key, max_retries=0)
+
+def is_fake():
+    return BACKEND == "fake"
+
+class FakeAPIError(Exception):
+    """Injected failure carrying a status code like anthropic.APIStatusError"""
+
+    def __init__(self, status_code):
+        super().__init__(f"injected error {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={})
+
+class FakeClient:
+    """
+    Offline stand-in for anthropic.Anthropic.
+
+    Responses depend only on the request and the seed, so repeated runs
+    produce identical artifacts. With error_rate > 0 some attempts raise a
+    FakeAPIError; which attempts fail is also deterministic per request.
+    """
+
+    def __init__(self, latency=FAKE_LATENCY, tokens_per_second=FAKE_TOKENS_PER_SECOND,
+                 error_rate=FAKE_ERROR_RATE, seed=FAKE_SEED):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls = 0
+        self.errors = 0
+        self._attempts = {}
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+        self.messages = _FakeMessages(self)
+
+    def create(self, **kwargs):
+        message, delay = self._respond(**kwargs)
+        time.sleep(delay)
+        return message
+
+    def stream(self, **kwargs):
+        return _FakeStream(*self._respond(**kwargs))
+
+    def _respond(self, model, messages, max_tokens, system=None, tools=None, tool_choice=None, **kwargs):
+        """The message for a request and the seconds it should take to generate"""
+        request = json.dumps([model, system, messages, max_tokens, tools], sort_keys=True)
+        digest = hashlib.sha256(f"{self.seed}:{request}".encode("utf-8")).hexdigest()
+        with self._lock:
+            self.calls += 1
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+
+        failure = random.Random(f"{digest}:{attempt}")
+        if self.error_rate and failure.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            time.sleep(self.latency * failure.uniform(0.1, 0.5))
+            raise FakeAPIError(failure.choice(FAKE_ERROR_STATUSES))
+
+        document, instruction = _split_prompt(messages)
+        writer = _ArtifactWriter(document or instruction, random.Random(digest))
+        stop_reason = "end_turn"
+        if tools:
+            tool_input = writer.tool_input(tools[0], instruction)
+            content = [SimpleNamespace(type="tool_use", id=f"toolu_{digest[:16]}", name=tools[0]["name"],
+                                       input=tool_input)]
+            output_tokens = _tokens(len(json.dumps(tool_input)))
+        else:
+            text = writer.respond(instruction, max_tokens)
+            if _tokens(len(text)) > max_tokens:
+                text = text[:max_tokens * CHARS_PER_TOKEN]
+                stop_reason = "max_tokens"
+            content = [SimpleNamespace(type="text", text=text)]
+            output_tokens = _tokens(len(text))
+
+        delay = self.latency * writer.rng.uniform(0.8, 1.2)
+        if self.tokens_per_second:
+            delay += output_tokens / self.tokens_per_second
+
+        message = SimpleNamespace(
+            id=f"msg_fake_{digest[:16]}", type="message", role="assistant", model=model,
+            content=content, stop_reason=stop_reason, stop_sequence=None,
+            usage=self._usage(system, messages, output_tokens)
+        )
+        return message, delay
+
+    def _usage(self, system, messages, output_tokens):
+        """Token usage including simulated prompt caching of cache_control blocks"""
+        cached_prefix = None
+        rest = (system or "")
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                rest += content
+                continue
+            for block in content:
+                if block.get("cache_control") and cached_prefix is None:
+                    cached_prefix = (system or "") + block.get("text", "")
+                else:
+                    rest += block.get("text", "")
+        usage = SimpleNamespace(input_tokens=_tokens(len(rest)), output_tokens=output_tokens,
+                                cache_creation_input_tokens=0, cache_read_input_tokens=0)
+        if cached_prefix is not None:
+            with self._lock:
+                hit = cached_prefix in self._cached_prefixes
+                self._cached_prefixes.add(cached_prefix)
+            if hit:
+                usage.cache_read_input_tokens = _tokens(len(cached_prefix))
+            else:
+                usage.cache_creation_input_tokens = _tokens(len(cached_prefix))
+        return usage
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+        self.with_raw_response = _FakeRawMessages(client)
+
+    def create(self, **kwargs):
+        return self._client.create(**kwargs)
+
+    def stream(self, **kwargs):
+        return self._client.stream(**kwargs)
+
+# Share of the latency spent before the first streamed text, like a real time-to-first-token
+FIRST_TOKEN_SHARE = 0.3
+STREAM_PIECE_CHARS = 16
+
+class _FakeStream:
+    """Context manager with the parts of anthropic's MessageStream the scheduler uses"""
+
+    def __init__(self, message, delay):
+        self._message = message
+        self._delay = delay
+        self.response = SimpleNamespace(headers={})
+        self.text_stream = self._text_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _text_stream(self):
+        text = "".join(block.text for block in self._message.content if block.type == "text")
+        pieces = [text[i:i + STREAM_PIECE_CHARS] for i in range(0, len(text), STREAM_PIECE_CHARS)]
+        time.sleep(self._delay * FIRST_TOKEN_SHARE)
+        pause = self._delay * (1 - FIRST_TOKEN_SHARE) / max(1, len(pieces))
+        for piece in pieces:
+            yield piece
+            time.sleep(pause)
+
+    def get_final_message(self):
+        for _ in self.text_stream:
+            pass
+        return self._message
+
+class _FakeRawMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        message = self._client.create(**kwargs)
+        return SimpleNamespace(headers={}, parse=lambda: message)
+
+def _tokens(chars):
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _split_prompt(messages):
+    """(document, instruction) from the last user turn"""
+    content = messages[-1]["content"]
+    if isinstance(content, str):
+        return None, content
+    texts = [block.get("text", "") for block in content if block.get("type") == "text"]
+    document = None
+    if texts and texts[0].startswith("<document>"):
+        document = texts.pop(0)[len("<document>"):].rsplit("</document>", 1)[0]
+    return document, "\n".join(texts)
+
+STOPWORDS = {"the", "and", "that", "with", "from", "this", "which", "their", "there", "these", "those",
+             "about", "into", "other", "such", "also", "have", "been", "were", "will", "than"}
+
+class _ArtifactWriter:
+    """Builds artifacts in the text formats the prompts ask for, from the document's own sentences"""
+
+    def __init__(self, text, rng):
+        self.rng = rng
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n{2,}", text) if len(s.strip()) > 30]
+        self.sentences = list(dict.fromkeys(s.replace("\n", " ") for s in sentences)) or [
+            "The document introduces the main concepts of the topic and explains how they relate."]
+        words = [w for w in re.findall(r"[A-Za-z][A-Za-z-]{4,}", text) if w.lower() not in STOPWORDS]
+        self.terms = list(dict.fromkeys(words)) or ["concept", "process", "structure", "function"]
+
+    def sentence(self):
+        return self.rng.choice(self.sentences)
+
+    def term(self):
+        return self.rng.choice(self.terms)
+
+    def respond(self, instruction, max_tokens):
+        # Classify on the request line only; inline prompts carry the document after a blank line
+        lowered = instruction.split("\n\n", 1)[0].lower()
+        match = re.search(r"create (\d+)", lowered)
+        count = int(match.group(1)) if match else 5
+        if "reply with ok" in lowered:
+            return "OK"
+        # Like a model, avoid repeating a question or the ones the prompt lists as already existing
+        existing = {line[2:].strip() for line in instruction.split("\n") if line.startswith("- ")}
+        if "flashcard" in lowered:
+            return "\n---\n".join(self.distinct(lambda i: self.flashcard(), count, existing))
+        if "multiple choice" in lowered:
+            return "\n\n".join(self.distinct(self.mcq, count, existing))
+        if "fill-in-the-blank" in lowered:
+            return "\n\n".join(self.distinct(lambda i: self.fill_blank(), count, existing))
+        if "true/false" in lowered:
+            return "\n\n".join(self.distinct(lambda i: self.true_false(), count, existing))
+        if "question-answer" in lowered:
+            return "\n\n".join(self.distinct(lambda i: self.qa(), count, existing))
+        if "notes" in lowered:
+            return self.notes(max_tokens)
+        return self.summary(max_tokens)
+
+    def opening(self, sentence, words=7):
+        """The first few words of a sentence, to tie a question to the passage it is about"""
+        return " ".join(sentence.split()[:words])
+
+    def distinct(self, make_item, count, existing):
+        """Up to count items made by make_item(number) whose questions all differ"""
+        items = []
+        seen = set(existing)
+        for _ in range(count * 10):
+            if len(items) == count:
+                break
+            item = make_item(len(items) + 1)
+            question = item.split("\n", 1)[0].split(":", 1)[1].strip()
+            if question[:120] not in seen:
+                seen.add(question[:120])
+                items.append(item)
+        return items
+
+    def summary(self, max_tokens):
+        budget = int(max_tokens * 0.7) * CHARS_PER_TOKEN
+        paragraphs = []
+        length = 0
+        while length < budget:
+            paragraph = " ".join(self.sentence() for _ in range(4))
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return "\n\n".join(paragraphs)[:budget].rsplit(" ", 1)[0]
+
+    def notes(self, max_tokens):
+        budget = int(max_tokens * 0.7) * CHARS_PER_TOKEN
+        lines = []
+        length = 0
+        while length < budget:
+            section = [f"## {self.term().title()}"] + [f"- {self.sentence()}" for _ in range(3)] + [""]
+            lines.extend(section)
+            length += sum(len(line) + 1 for line in section)
+        return "\n".join(lines).strip()
+
+    def flashcard(self):
+        sentence = self.sentence()
+        return f"Q: What does the document say about {self.term()} in \"{self.opening(sentence)}...\"?\nA: {sentence}"
+
+    def mcq(self, number):
+        options = self.rng.sample(self.sentences, 4) if len(self.sentences) >= 4 else [self.sentence() for _ in range(4)]
+        correct = self.rng.randrange(4)
+        return (f"Q{number}: Which statement about {self.term()} starting \"{self.opening(options[correct])}\" "
+                f"is supported by the document?\n"
+                + "\n".join(f"{letter}) {option}" for letter, option in zip("ABCD", options))
+                + f"\nCorrect: {'ABCD'[correct]}\nExplanation: {options[correct]}")
+
+    def fill_blank(self):
+        sentence = self.sentence()
+        words = [w for w in re.findall(r"[A-Za-z][A-Za-z-]{4,}", sentence) if w.lower() not in STOPWORDS]
+        answer = self.rng.choice(words) if words else self.term()
+        question = re.sub(rf"\b{re.escape(answer)}\b", "___", sentence, count=1)
+        if "___" not in question:
+            question = f"{sentence} The key term here is ___."
+        return f"Q: {question}\nA: {answer}\nExplanation: {sentence}"
+
+    def true_false(self):
+        sentence = self.sentence()
+        if self.rng.random() < 0.5:
+            return f"Q: {sentence}\nA: True\nExplanation: The document states this directly."
+        return f"Q: It is not the case that {sentence[0].lower()}{sentence[1:]}\nA: False\nExplanation: {sentence}"
+
+    def qa(self):
+        return f"Q: Explain the role of {self.term()} in the document.\nA: {self.sentence()} {self.sentence()}"
+
+    def tool_input(self, tool, instruction):
+        """Structured input for a tool call, following the tool's JSON schema"""
+        lowered = instruction.lower()
+        result = {}
+        for name, schema in tool["input_schema"].get("properties", {}).items():
+            if schema.get("type") == "string":
+                result[name] = self.notes(600) if "notes" in name else self.summary(500)
+                continue
+            match = re.search(rf"(\d+) {name.replace('_', ' ')}", lowered)
+            count = int(match.group(1)) if match else 5
+            result[name] = [self._item(name) for _ in range(count)]
+        return result
+
+    def _item(self, name):
+        sentence = self.sentence()
+        if name == "mcq_questions":
+            options = self.rng.sample(self.sentences, 4) if len(self.sentences) >= 4 else [self.sentence() for _ in range(4)]
+            correct = self.rng.randrange(4)
+            return {'question': f"Which statement about {self.term()} is supported by the document?",
+                    'options': options, 'correct': "ABCD"[correct], 'explanation': options[correct]}
+        if name == "true_false":
+            return {'question': sentence, 'answer': True, 'explanation': "The document states this directly."}
+        if name == "fill_blanks":
+            block = self.fill_blank().split("\n")
+            return {'question': block[0][3:], 'answer': block[1][3:], 'explanation': sentence}
+        return {'question': f"What does the document say about {self.term()}?", 'answer': sentence}
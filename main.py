@@ -3,18 +3,38 @@
 Shrinx Terminal Version - Minimal Working Version
 """
 
+import importlib.util
 import os
+import shutil
+import sys
+import threading
+from functools import partial
 from pathlib import Path
 
+import chunker
+import extraction_cache
+from generation_engine import iter_generated, StreamProgress, write_atomic
+from map_reduce import map_reduce, generate_balanced, join_parts
+from pdf_utils import join_pages
+from request_scheduler import add_stream_listener, remove_stream_listener
+from flashcard_system import FlashcardSystem
+from review_optimizer import use_fitted_model
+from review_queue import ReviewQueue, sync_topics
+from review_store import get_store
+from spaced_repetition import card_id
+from study_store import save_artifact, load_cards
+
 # Try to import AI modules, create dummies if not available
 try:
     from dotenv import load_dotenv
-    import anthropic
+    from llm_backend import make_client, is_fake
+    from response_cache import cached_message
     load_dotenv()
     
     API_KEY = os.getenv("ANTHROPIC_API_KEY")
-    if API_KEY:
-        client = anthropic.Anthropic(api_key=API_KEY)
+    if API_KEY or is_fake():
+        # SHRINX_BACKEND=fake runs offline; the request scheduler paces and retries requests itself
+        client = make_client(API_KEY)
         AI_AVAILABLE = True
     else:
         AI_AVAILABLE = False
@@ -26,75 +46,132 @@ except ImportError:
 
 # Try to import PDF modules
 try:
-    import PyPDF2
+    # Extraction below always uses the PyPDF2 backend, so only check that it is installed
+    if importlib.util.find_spec("PyPDF2") is None:
+        raise ImportError("PyPDF2 is not installed")
+    import pdf_utils
     PDF_AVAILABLE = True
     def extract_text_from_pdf(pdf_path):
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text.strip()
+        return pdf_utils.extract_text_from_pdf(pdf_path, backend="pypdf2")
+    def extract_pages_to_file(pdf_path, output_path):
+        return pdf_utils.extract_pages_to_file(pdf_path, output_path, backend="pypdf2")
+    def chunk_pdf_sections(pdf_path, pages=None):
+        return chunker.chunk_pdf(pdf_path, pages=pages, backend="pypdf2")
 except ImportError:
     PDF_AVAILABLE = False
     def extract_text_from_pdf(pdf_path):
         return "Sample text from PDF (PyPDF2 not installed for real extraction)"
+    def extract_pages_to_file(pdf_path, output_path):
+        text = extract_text_from_pdf(pdf_path)
+        Path(output_path).write_text(text, encoding="utf-8")
+        return [(1, text)]
+    def chunk_pdf_sections(pdf_path, pages=None):
+        return None
 
 # AI generation functions
-def generate_summary(text):
+MODEL = "claude-3-5-sonnet-20241022"
+
+def generate_summary(text, chunks=None):
     if not AI_AVAILABLE:
         return "Sample summary: This is a brief overview of the content. (AI not available)"
     
-    try:
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            system="You are a helpful assistant that creates concise summaries.",
-            messages=[
-                {"role": "user", "content": f"Create a brief summary of this text:\n\n{text[:2000]}"}
-            ],
-            max_tokens=500
-        )
-        return response.content[0].text.strip()
-    except Exception as e:
-        return f"Error generating summary: {e}"
+    return map_reduce(text, _summarize_chunk, _combine_summaries, chunks=chunks)
 
-def generate_notes(text):
+def generate_notes(text, chunks=None):
     if not AI_AVAILABLE:
         return "Sample notes:\n• Key point 1\n• Key point 2\n• Key point 3\n(AI not available)"
     
-    try:
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            system="You are a helpful assistant that creates detailed study notes.",
-            messages=[
-                {"role": "user", "content": f"Create detailed study notes from this text:\n\n{text[:2000]}"}
-            ],
-            max_tokens=800
-        )
-        return response.content[0].text.strip()
-    except Exception as e:
-        return f"Error generating notes: {e}"
+    return map_reduce(text, _notes_for_chunk, _combine_notes, chunks=chunks)
 
-def generate_questions(text):
+def generate_questions(text, chunks=None):
     if not AI_AVAILABLE:
         return "Sample Questions:\n\nQ1: What is the main topic?\nA) Option A\nB) Option B\nC) Option C\nD) Option D\nCorrect: A\n(AI not available)"
     
-    try:
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            system="You are a helpful assistant that creates multiple choice questions.",
-            messages=[
-                {"role": "user", "content": f"Create 3 multiple choice questions from this text:\n\n{text[:2000]}"}
-            ],
-            max_tokens=600
-        )
-        return response.content[0].text.strip()
-    except Exception as e:
-        return f"Error generating questions: {e}"
+    return generate_balanced(text, 3, _questions_for_chunk, chunks=chunks)
+
+# Per-chunk requests used by the map-reduce pipeline for long documents
+def _summarize_chunk(text):
+    return cached_message(
+        client,
+        model=MODEL,
+        system="You are a helpful assistant that creates concise summaries.",
+        template="Create a brief summary of this text:\n\n{text}",
+        text=text,
+        max_tokens=500,
+        label="summary"
+    )
+
+def _combine_summaries(parts):
+    return cached_message(
+        client,
+        model=MODEL,
+        system="You are a helpful assistant that creates concise summaries.",
+        template="Combine these summaries of consecutive sections of one document into a brief summary of the whole document:\n\n{text}",
+        text=join_parts(parts),
+        max_tokens=500,
+        label="summary (combine)"
+    )
+
+def _notes_for_chunk(text):
+    return cached_message(
+        client,
+        model=MODEL,
+        system="You are a helpful assistant that creates detailed study notes.",
+        template="Create detailed study notes from this text:\n\n{text}",
+        text=text,
+        max_tokens=800,
+        label="notes"
+    )
+
+def _combine_notes(parts):
+    return cached_message(
+        client,
+        model=MODEL,
+        system="You are a helpful assistant that creates detailed study notes.",
+        template="Merge these study notes for consecutive sections of one document into one set of detailed study notes, removing repetition:\n\n{text}",
+        text=join_parts(parts),
+        max_tokens=800,
+        label="notes (combine)"
+    )
+
+def _questions_for_chunk(text, count):
+    return cached_message(
+        client,
+        model=MODEL,
+        system="You are a helpful assistant that creates multiple choice questions.",
+        template=f"Create {count} multiple choice questions from this text:\n\n{{text}}",
+        text=text,
+        max_tokens=600,
+        label="questions"
+    )
 
 # Main application
 OUTPUT_DIR = Path("output")
 
+class TerminalStream:
+    """One status line showing the latest streamed text of each artifact, redrawn in place"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shown = False
+        self.progress = StreamProgress(self.show)
+
+    def show(self, texts):
+        width = shutil.get_terminal_size().columns - 1
+        line = " | ".join(f"{label}: {' '.join(text.split())[-40:]}" for label, text in sorted(texts.items()))
+        with self.lock:
+            sys.stdout.write("\r\033[K" + (f"✍️  {line}"[:width] if line else ""))
+            sys.stdout.flush()
+            self.shown = bool(line)
+
+    def clear(self):
+        """Erase the status line so a regular message can be printed"""
+        with self.lock:
+            if self.shown:
+                sys.stdout.write("\r\033[K")
+                sys.stdout.flush()
+                self.shown = False
+
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
@@ -135,10 +212,11 @@ def view_topic(topic_name):
         print("\n1. 📄 View Summary")
         print("2. 📝 View Notes") 
         print("3. ❓ View Questions")
-        print("4. 📁 View All Files")
-        print("5. ⬅️  Back to Main Menu")
+        print("4. 🃏 Study Flashcards")
+        print("5. 📁 View All Files")
+        print("6. ⬅️  Back to Main Menu")
         
-        choice = input("\nChoose option (1-5): ").strip()
+        choice = input("\nChoose option (1-6): ").strip()
         
         if choice == "1":
             show_file_content(topic_dir / "summary.txt", "Summary")
@@ -147,13 +225,35 @@ def view_topic(topic_name):
         elif choice == "3":
             show_file_content(topic_dir / "questions.txt", "Questions")
         elif choice == "4":
-            show_all_files(topic_dir)
+            study_topic_flashcards(topic_dir)
         elif choice == "5":
+            show_all_files(topic_dir)
+        elif choice == "6":
             break
         else:
             print("Invalid choice. Try again.")
             input("Press Enter to continue...")
 
+def study_topic_flashcards(topic_dir):
+    """Study a topic's flashcards in order of when they are due"""
+    clear_screen()
+    print_header()
+    topic = topic_dir.name
+    cards = load_cards(topic_dir)
+    store = get_store()
+    store.sync_cards(topic, (card_id(card) for card in cards))
+    FlashcardSystem().study_flashcards(cards, store.load_states(topic),
+                                       on_review=lambda state, grade: store.record_review(topic, state, grade))
+    input("\nPress Enter to continue...")
+
+def review_all_due():
+    """Review the due flashcards of every topic in one session"""
+    clear_screen()
+    print_header()
+    sync_topics(OUTPUT_DIR)
+    FlashcardSystem().review_due(ReviewQueue(output_dir=OUTPUT_DIR))
+    input("\nPress Enter to continue...")
+
 def show_file_content(file_path, title):
     """Show content of a file"""
     clear_screen()
@@ -217,34 +317,55 @@ def add_new_pdf():
     print(f"\n🔄 Processing PDF...")
     
     try:
-        # Extract text
+        # Extract text, saving raw text page by page as it is parsed
         print("1. Extracting text from PDF...")
-        text = extract_text_from_pdf(pdf_path)
-        
-        # Save raw text
-        raw_text_path = topic_dir / "raw.txt"
-        raw_text_path.write_text(text, encoding="utf-8")
+        pages = extract_pages_to_file(pdf_path, topic_dir / "raw.txt")
+        text = join_pages(pages)
         print(f"✅ Text extracted ({len(text)} characters)")
         
-        # Generate summary
-        print("2. Generating summary...")
-        summary = generate_summary(text)
-        (topic_dir / "summary.txt").write_text(summary, encoding="utf-8")
-        print("✅ Summary generated")
-        
-        # Generate notes
-        print("3. Generating notes...")
-        notes = generate_notes(text)
-        (topic_dir / "notes.txt").write_text(notes, encoding="utf-8")
-        print("✅ Notes generated")
+        # Split along the PDF's sections so long documents are processed chunk by chunk,
+        # reusing the pages just extracted instead of reading the PDF again
+        chunks = chunk_pdf_sections(pdf_path, pages)
+        if chunks:
+            chunker.save_chunk_index(topic_dir / "sections.json", chunks)
+            print(f"✅ Split into {len(chunks)} section chunk(s)")
         
-        # Generate questions
-        print("4. Generating questions...")
-        questions = generate_questions(text)
-        (topic_dir / "questions.txt").write_text(questions, encoding="utf-8")
-        print("✅ Questions generated")
+        # Generate summary, notes and questions concurrently
+        print("2. Generating summary, notes and questions...")
+        generators = [
+            ("summary", partial(generate_summary, chunks=chunks)),
+            ("notes", partial(generate_notes, chunks=chunks)),
+            ("questions", partial(generate_questions, chunks=chunks)),
+        ]
+        failed = []
+        # Show text as it streams in when attached to a terminal
+        stream = TerminalStream() if sys.stdout.isatty() else None
+        if stream:
+            add_stream_listener(stream.progress)
+        try:
+            for name, content, error in iter_generated(text, generators):
+                if stream:
+                    stream.progress.finish(name)
+                    stream.clear()
+                # A failed artifact is reported but never written, so no error text ends up in the topic
+                if error is not None:
+                    failed.append(name)
+                    print(f"❌ {name.title()} failed: {error}")
+                    continue
+                write_atomic(topic_dir / f"{name}.txt", content)
+                # Questions are parsed once here and loaded from questions.json when studying
+                save_artifact(topic_dir, name, content)
+                print(f"✅ {name.title()} generated")
+        finally:
+            if stream:
+                remove_stream_listener(stream.progress)
+                stream.clear()
         
-        print(f"\n🎉 Successfully processed '{topic}'!")
+        if failed:
+            print(f"\n⚠️  Processed '{topic}' with {len(failed)} failed artifact(s): {', '.join(failed)}")
+            print("   Run 'Add New PDF' again later to retry; cached responses are reused.")
+        else:
+            print(f"\n🎉 Successfully processed '{topic}'!")
         print(f"📁 Files saved in: {topic_dir}")
         
     except Exception as e:
@@ -254,6 +375,8 @@ def add_new_pdf():
 
 def main():
     """Main application loop"""
+    # Schedule flashcards with the model fitted by 'python review_optimizer.py fit', if there is one
+    use_fitted_model()
     while True:
         clear_screen()
         print_header()
@@ -266,11 +389,12 @@ def main():
         print(f"\n📋 Main Menu:")
         print("1. 📁 List Topics")
         print("2. 📖 View Topic")
-        print("3. 📄 Add New PDF")
-        print("4. ⚙️  Setup Info")
-        print("5. 🚪 Exit")
+        print("3. 🔁 Review All Due Flashcards")
+        print("4. 📄 Add New PDF")
+        print("5. ⚙️  Setup Info")
+        print("6. 🚪 Exit")
         
-        choice = input("\nChoose option (1-5): ").strip()
+        choice = input("\nChoose option (1-6): ").strip()
         
         if choice == "1":
             clear_screen()
@@ -297,12 +421,15 @@ def main():
                 input("Press Enter to continue...")
                 
         elif choice == "3":
-            add_new_pdf()
+            review_all_due()
             
         elif choice == "4":
-            show_setup_info()
+            add_new_pdf()
             
         elif choice == "5":
+            show_setup_info()
+            
+        elif choice == "6":
             print("\n👋 Thanks for using Shrinx! Happy studying!")
             break
             
@@ -340,6 +467,13 @@ def show_setup_info():
         status = "✅ Found" if exists else "❌ Missing"
         print(f"   {filename:15} - {description:25} [{status}]")
     
+    cache_info = extraction_cache.stats()
+    print(f"\n💾 Extraction Cache:")
+    print(f"   {cache_info['entries']} PDF(s), {cache_info['bytes'] / 1024 / 1024:.1f} MB "
+          f"of {cache_info['max_bytes'] / 1024 / 1024:.0f} MB in {cache_info['path']}")
+    print("   Purge with: python extraction_cache.py purge")
+    print("   Cached AI responses: python response_cache.py stats")
+    
     print(f"\n🔧 Installation Commands:")
     print("   pip install anthropic python-dotenv PyPDF2")
     print("   echo 'ANTHROPIC_API_KEY=your_key_here' > .env")
@@ -0,0 +1,96 @@
+"""
+Map-reduce generation for documents too long for a single request
+
+The text is split into chunks that fit a token budget, each chunk is
+processed concurrently, and the partial results are merged by a reduce
+pass (itself done in rounds if the partials are still too long). Question
+style artifacts skip the reduce step and instead spread the requested
+number of items evenly over the chunks.
+"""
+
+import itertools
+import re
+
+import chunker
+from chunker import CHUNK_TOKENS, estimate_tokens
+from generation_engine import map_concurrent
+
+def chunk_text(text, max_tokens=None):
+    """Split text into section-aligned chunks of at most max_tokens (estimated)"""
+    text = text.strip()
+    if estimate_tokens(text) <= (max_tokens or CHUNK_TOKENS):
+        return [text] if text else []
+    return [chunk.text for chunk in chunker.chunk_text(text, max_tokens)]
+
+def _chunk_texts(text, chunks, max_tokens):
+    if chunks is None:
+        return chunk_text(text, max_tokens)
+    return [chunk.text if isinstance(chunk, chunker.Chunk) else chunk for chunk in chunks]
+
+def join_parts(parts):
+    """Combine partial results into one reduce-pass input, labelled by section"""
+    return "\n\n".join(f"Section {i}:\n{part}" for i, part in enumerate(parts, 1))
+
+def map_reduce(text, map_func, reduce_func, max_tokens=None, max_concurrency=None, chunks=None):
+    """
+    Run map_func over each chunk of text concurrently and merge the results with reduce_func.
+
+    Text that fits in one chunk is passed straight to map_func, so short
+    documents make exactly the same single request as before.
+    reduce_func receives a list of partial results. Pass chunks (strings or
+    chunker.Chunk objects) to reuse chunks built from the PDF structure.
+    """
+    budget = max_tokens or CHUNK_TOKENS
+    chunks = _chunk_texts(text, chunks, budget)
+    if len(chunks) <= 1:
+        return map_func(chunks[0] if chunks else text)
+
+    parts = map_concurrent(map_func, chunks, max_concurrency)
+
+    # Reduce in rounds until the combined partials fit in one request
+    while len(parts) > 1 and estimate_tokens(join_parts(parts)) > budget:
+        groups = _group_parts(parts, budget)
+        parts = map_concurrent(lambda group: reduce_func(group) if len(group) > 1 else group[0],
+                               groups, max_concurrency)
+    return reduce_func(parts) if len(parts) > 1 else parts[0]
+
+def _group_parts(parts, budget):
+    """Pack consecutive partials into groups that fit the budget (at least two per group)"""
+    groups = []
+    current = []
+    for part in parts:
+        if len(current) >= 2 and estimate_tokens(join_parts(current + [part])) > budget:
+            groups.append(current)
+            current = []
+        current.append(part)
+    if current:
+        groups.append(current)
+    return groups
+
+def allocate(total, chunk_count):
+    """Spread total items over chunk_count chunks as evenly as possible"""
+    counts = [0] * chunk_count
+    for i in range(total):
+        counts[i * chunk_count // total] += 1
+    return counts
+
+def generate_balanced(text, total, func, separator="\n\n", max_tokens=None, max_concurrency=None, chunks=None):
+    """
+    Generate `total` items spread evenly across the chunks of text.
+
+    func(chunk, count) returns the formatted items for one chunk; the
+    per-chunk outputs are joined with separator and "Q<n>:" labels are
+    renumbered so the combined artifact reads as one list.
+    """
+    chunks = _chunk_texts(text, chunks, max_tokens)
+    if len(chunks) <= 1:
+        return func(chunks[0] if chunks else text, total)
+
+    jobs = [(chunk, count) for chunk, count in zip(chunks, allocate(total, len(chunks))) if count]
+    outputs = map_concurrent(lambda job: func(*job), jobs, max_concurrency)
+    return renumber_questions(separator.join(output.strip() for output in outputs))
+
+def renumber_questions(text):
+    """Renumber 'Q<n>:' labels sequentially"""
+    counter = itertools.count(1)
+    return re.sub(r"(?m)^Q\d+:", lambda m: f"Q{next(counter)}:", text)
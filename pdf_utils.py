@@ -2,6 +2,11 @@
 PDF utilities for extracting text from PDF files
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import extraction_cache
+
 try:
     import PyPDF2
     HAS_PYPDF2 = True
@@ -15,58 +20,259 @@ try:
 except ImportError:
     HAS_PDFPLUMBER = False
 
-def extract_text_from_pdf(pdf_path):
+# Pages handed to each worker at a time in parallel mode. Several shards per
+# worker keeps the pool busy when some pages are much slower than others.
+SHARDS_PER_WORKER = 4
+
+# Bump when the extracted text format changes so cached extractions are not reused
+EXTRACTOR_VERSION = 2
+
+# Cached extractions keep one form feed between pages so page numbers survive a cache hit
+PAGE_SEPARATOR = "\f"
+
+def extract_text_from_pdf(pdf_path, workers=1, backend=None, use_cache=True):
     """
     Extract text from a PDF file using available libraries
+
+    With workers > 1 (or workers=None for one per CPU) page ranges are
+    extracted in parallel worker processes. Results are cached by the
+    content hash of the PDF, so re-extracting the same file is instant.
+    """
+    return join_pages(extract_pages(pdf_path, workers, backend, use_cache))
+
+def extract_text_to_file(pdf_path, output_path, workers=1, backend=None, use_cache=True):
+    """Extract text from a PDF, writing it to output_path page by page as it is parsed"""
+    return join_pages(extract_pages_to_file(pdf_path, output_path, workers, backend, use_cache))
+
+def extract_pages(pdf_path, workers=1, backend=None, use_cache=True):
+    """List of (page_number, text) for every page of a PDF, using the extraction cache"""
+    return _extract_pages_cached(pdf_path, workers, backend, use_cache)
+
+def extract_pages_to_file(pdf_path, output_path, workers=1, backend=None, use_cache=True):
+    """
+    Like extract_pages, also writing the text to output_path page by page.
+
+    Pass the returned pages to chunker.chunk_pdf(pages=...) so the PDF is
+    only read once.
+    """
+    return _extract_pages_cached(pdf_path, workers, backend, use_cache, output_path)
+
+def _extract_pages_cached(pdf_path, workers, backend, use_cache, output_path=None):
+    backend = backend or get_backend()
+    key = _cache_key(pdf_path, backend) if use_cache else None
+    if key:
+        cached = extraction_cache.get(key)
+        if cached is not None:
+            pages = list(enumerate(cached.split(PAGE_SEPARATOR), 1))
+            if output_path:
+                list(write_pages(pages, output_path))
+            return pages
+
+    pages = iter_pages(pdf_path, workers, backend)
+    if output_path:
+        pages = write_pages(pages, output_path)
+    pages = list(pages)
+    if key:
+        extraction_cache.put(key, PAGE_SEPARATOR.join(text.replace(PAGE_SEPARATOR, "\n") for _, text in pages))
+    return pages
+
+def extractor_id(backend):
+    """Identifies the backend, its library version and our text format for cache keys"""
+    if backend == "pdfplumber":
+        import pdfplumber
+        library_version = getattr(pdfplumber, "__version__", "unknown")
+    else:
+        import PyPDF2
+        library_version = getattr(PyPDF2, "__version__", "unknown")
+    return f"{backend}-{library_version}-v{EXTRACTOR_VERSION}"
+
+def _cache_key(pdf_path, backend):
+    return extraction_cache.cache_key(pdf_path, extractor_id(backend))
+
+def iter_pages(pdf_path, workers=1, backend=None):
+    """
+    Yield (page_number, text) for every page of a PDF, in page order.
+
+    Page numbers start at 1 and pages without text yield an empty string.
+    Pages are yielded one at a time as they are parsed; write_pages() uses
+    this to save raw.txt while the rest of the PDF is still being read.
+    Chunking and generation start once extraction is done, since every
+    artifact prompt shares the whole document.
     """
+    backend = backend or get_backend()
+    if workers is None or workers > 1:
+        yield from iter_pages_parallel(pdf_path, workers, backend)
+    elif backend == "pdfplumber":
+        yield from iter_pages_pdfplumber(pdf_path)
+    else:
+        yield from iter_pages_pypdf2(pdf_path)
+
+def join_pages(pages):
+    """Join (page_number, text) pairs into a single document string"""
+    return "\n".join(text for _, text in pages if text).strip()
+
+def write_pages(pages, output_path):
+    """
+    Write pages to a text file as they arrive and pass them through.
+
+    Wrap an iter_pages() stream with this to save raw.txt incrementally
+    while the caller keeps consuming the same pages.
+    """
+    with open(output_path, "w", encoding="utf-8") as f:
+        first = True
+        for page_number, text in pages:
+            if text:
+                if not first:
+                    f.write("\n")
+                f.write(text)
+                f.flush()
+                first = False
+            yield page_number, text
+
+def get_backend():
+    """Name of the extraction library that will be used"""
     if HAS_PDFPLUMBER:
-        return extract_with_pdfplumber(pdf_path)
+        return "pdfplumber"
     elif HAS_PYPDF2:
-        return extract_with_pypdf2(pdf_path)
+        return "pypdf2"
     else:
         raise ImportError("No PDF library available. Install PyPDF2 or pdfplumber: pip install PyPDF2 pdfplumber")
 
-def extract_with_pdfplumber(pdf_path):
-    """Extract text using pdfplumber (recommended)"""
-    import pdfplumber
-    
-    text = ""
+def count_pages(pdf_path):
+    """Number of pages in a PDF file"""
+    if HAS_PYPDF2:
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
     with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def split_page_ranges(page_count, shards):
+    """Split page indexes into at most `shards` contiguous (start, end) ranges"""
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def _extract_page_range(args):
+    """Worker entry point: open the PDF and extract pages [start, end)"""
+    backend, pdf_path, start, end = args
+    if backend == "pdfplumber":
+        return list(iter_pages_pdfplumber(pdf_path, start, end))
+    return list(iter_pages_pypdf2(pdf_path, start, end))
+
+def iter_pages_parallel(pdf_path, workers=None, backend=None):
+    """Extract pages by sharding page ranges across a process pool, keeping page order"""
+    backend = backend or get_backend()
+    workers = workers or os.cpu_count() or 1
+    page_count = count_pages(pdf_path)
+    if page_count == 0:
+        return
+
+    ranges = split_page_ranges(page_count, workers * SHARDS_PER_WORKER)
+    jobs = [(backend, pdf_path, start, end) for start, end in ranges]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        # map() yields shard results in submission order, so pages stay in order
+        for shard in executor.map(_extract_page_range, jobs):
+            yield from shard
+
+def extract_parallel(pdf_path, workers=None, backend=None):
+    """Extract text using a process pool"""
+    return join_pages(iter_pages_parallel(pdf_path, workers, backend))
+
+def iter_pages_pdfplumber(pdf_path, start=0, end=None):
+    """Yield (page_number, text) using pdfplumber, optionally for pages [start, end) only"""
+    import pdfplumber
+
+    # pdfplumber only builds the requested pages when given 1-based page numbers
+    pages = list(range(start + 1, end + 1)) if end is not None else None
+    with pdfplumber.open(pdf_path, pages=pages) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    
-    return text.strip()
+            if page.page_number > start:
+                yield page.page_number, page.extract_text() or ""
 
-def extract_with_pypdf2(pdf_path):
-    """Extract text using PyPDF2"""
+def iter_pages_pypdf2(pdf_path, start=0, end=None):
+    """Yield (page_number, text) using PyPDF2, optionally for pages [start, end) only"""
     import PyPDF2
-    
-    text = ""
+
     with open(pdf_path, 'rb') as file:
         pdf_reader = PyPDF2.PdfReader(file)
-        
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() + "\n"
-    
-    return text.strip()
+        end = len(pdf_reader.pages) if end is None else end
+        for page_num in range(start, end):
+            yield page_num + 1, pdf_reader.pages[page_num].extract_text() or ""
+
+def extract_with_pdfplumber(pdf_path):
+    """Extract text using pdfplumber (recommended)"""
+    return join_pages(iter_pages_pdfplumber(pdf_path))
+
+def extract_with_pypdf2(pdf_path):
+    """Extract text using PyPDF2"""
+    return join_pages(iter_pages_pypdf2(pdf_path))
+
+def make_synthetic_pdf(path, pages, lines_per_page=45):
+    """Write a plain-text PDF with the given number of pages for benchmarks and self-checks"""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for p in range(pages):
+        lines = [b"BT /F1 10 Tf 14 TL 50 800 Td"]
+        for n in range(lines_per_page):
+            line = f"Chapter {p // 20 + 1} page {p + 1} line {n + 1}: the mitochondria is the powerhouse of the cell."
+            lines.append(b"(" + line.encode("latin-1") + b") '")
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
 
 # Test function
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
         pdf_path = sys.argv[1]
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
         try:
-            text = extract_text_from_pdf(pdf_path)
+            text = extract_text_from_pdf(pdf_path, workers=workers)
             print(f"Extracted {len(text)} characters from {pdf_path}")
             print("First 500 characters:")
             print(text[:500])
         except Exception as e:
             print(f"Error extracting text: {e}")
     else:
-        print("Usage: python pdf_utils.py <path_to_pdf>")
+        print("Usage: python pdf_utils.py <path_to_pdf> [workers]")
         print("Available libraries:")
         print(f"  PyPDF2: {'✓' if HAS_PYPDF2 else '✗'}")
         print(f"  pdfplumber: {'✓' if HAS_PDFPLUMBER else '✗'}")
\ No newline at end of file
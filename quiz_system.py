@@ -1,220 +1,123 @@
 import re
 import random
+import time
+
+from adaptive_quiz import AdaptiveQuizSession, format_mastery, load_estimates
+from answer_matcher import CORRECT, PARTIAL, WRONG, grade_answer
+from artifact_parser import parse_items
+from review_store import get_store
+from study_session import QuizSession, expected_answer, score_message
+
+# Per kind: message when there are no questions, quiz title and answer prompt
+QUIZ_TEXT = {
+    'mcq_questions': ("No MCQ questions available!", "🎯 Starting MCQ Quiz!", "\nYour answer (A/B/C/D): "),
+    'fill_blanks': ("No fill-in-the-blank questions available!", "📝 Starting Fill-in-the-Blanks Quiz!",
+                    "Your answer: "),
+    'true_false': ("No true/false questions available!", "✓❌ Starting True/False Quiz!",
+                   "Your answer (True/False or T/F): "),
+}
 
 class QuizSystem:
-    def __init__(self):
+    def __init__(self, topic=None, adaptive=False):
         self.score = 0
         self.total_questions = 0
+        # Answers are saved to the review store when the quiz belongs to a topic
+        self.topic = topic
+        # Adaptive quizzes pick questions by what they tell about the learner and stop once mastery is clear
+        self.adaptive = adaptive
+        self.session = None
+        # QuizSession of the quiz being played
+        self.quiz = None
     
     def parse_mcq_questions(self, mcq_text):
         """Parse MCQ questions from AI-generated text"""
-        questions = []
-        question_blocks = mcq_text.split('\n\n')
-        
-        for block in question_blocks:
-            if 'Q' in block and 'A)' in block:
-                lines = block.strip().split('\n')
-                question = ""
-                options = []
-                correct = ""
-                explanation = ""
-                
-                for line in lines:
-                    if line.startswith('Q'):
-                        question = line.split(':', 1)[1].strip() if ':' in line else line
-                    elif line.startswith(('A)', 'B)', 'C)', 'D)')):
-                        options.append(line.strip())
-                    elif line.startswith('Correct:'):
-                        correct = line.split(':', 1)[1].strip()
-                    elif line.startswith('Explanation:'):
-                        explanation = line.split(':', 1)[1].strip()
-                
-                if question and len(options) == 4 and correct:
-                    questions.append({
-                        'question': question,
-                        'options': options,
-                        'correct': correct.upper(),
-                        'explanation': explanation
-                    })
-        
-        return questions
+        return parse_items('mcq_questions', mcq_text)
     
     def parse_fill_blanks(self, fb_text):
         """Parse fill-in-the-blank questions"""
-        questions = []
-        question_blocks = fb_text.split('\n\n')
-        
-        for block in question_blocks:
-            lines = block.strip().split('\n')
-            question = ""
-            answer = ""
-            explanation = ""
-            
-            for line in lines:
-                if line.startswith('Q:'):
-                    question = line.split(':', 1)[1].strip()
-                elif line.startswith('A:'):
-                    answer = line.split(':', 1)[1].strip()
-                elif line.startswith('Explanation:'):
-                    explanation = line.split(':', 1)[1].strip()
-            
-            if question and answer:
-                questions.append({
-                    'question': question,
-                    'answer': answer,
-                    'explanation': explanation
-                })
-        
-        return questions
+        return parse_items('fill_blanks', fb_text)
     
     def parse_true_false(self, tf_text):
         """Parse true/false questions"""
-        questions = []
-        question_blocks = tf_text.split('\n\n')
-        
-        for block in question_blocks:
-            lines = block.strip().split('\n')
-            question = ""
-            answer = ""
-            explanation = ""
-            
-            for line in lines:
-                if line.startswith('Q:'):
-                    question = line.split(':', 1)[1].strip()
-                elif line.startswith('A:'):
-                    answer = line.split(':', 1)[1].strip()
-                elif line.startswith('Explanation:'):
-                    explanation = line.split(':', 1)[1].strip()
-            
-            if question and answer:
-                questions.append({
-                    'question': question,
-                    'answer': answer,
-                    'explanation': explanation
-                })
-        
-        return questions
+        return parse_items('true_false', tf_text)
     
     def play_mcq_quiz(self, questions):
         """Play MCQ quiz"""
-        if not questions:
-            print("No MCQ questions available!")
-            return
-        
-        print(f"\n🎯 Starting MCQ Quiz! ({len(questions)} questions)")
-        print("=" * 50)
-        
-        self.score = 0
-        self.total_questions = len(questions)
-        
-        for i, q in enumerate(questions, 1):
-            print(f"\nQuestion {i}: {q['question']}")
-            for option in q['options']:
-                print(f"  {option}")
-            
-            while True:
-                answer = input("\nYour answer (A/B/C/D): ").upper().strip()
-                if answer in ['A', 'B', 'C', 'D']:
-                    break
-                print("Please enter A, B, C, or D")
-            
-            if answer == q['correct']:
-                print("✅ Correct! Good going!")
-                self.score += 1
-            else:
-                print(f"❌ Wrong! The correct answer is {q['correct']}")
-            
-            if q['explanation']:
-                print(f"💡 Explanation: {q['explanation']}")
-            
-            input("\nPress Enter to continue...")
-        
-        self.show_final_score()
+        self.play_quiz('mcq_questions', questions)
     
     def play_fill_blanks_quiz(self, questions):
         """Play fill-in-the-blanks quiz"""
-        if not questions:
-            print("No fill-in-the-blank questions available!")
-            return
-        
-        print(f"\n📝 Starting Fill-in-the-Blanks Quiz! ({len(questions)} questions)")
-        print("=" * 50)
-        
-        self.score = 0
-        self.total_questions = len(questions)
-        
-        for i, q in enumerate(questions, 1):
-            print(f"\nQuestion {i}: {q['question']}")
-            user_answer = input("Your answer: ").strip()
-            
-            # Simple answer checking (case-insensitive)
-            if user_answer.lower() == q['answer'].lower():
-                print("✅ Correct! Good going!")
-                self.score += 1
-            elif self.check_partial_match(user_answer.lower(), q['answer'].lower()):
-                print("🟡 Nearly there! Close enough!")
-                self.score += 0.5
-            else:
-                print(f"❌ Wrong! The correct answer is: {q['answer']}")
-            
-            if q['explanation']:
-                print(f"💡 Explanation: {q['explanation']}")
-            
-            input("\nPress Enter to continue...")
-        
-        self.show_final_score()
+        self.play_quiz('fill_blanks', questions)
     
     def play_true_false_quiz(self, questions):
         """Play true/false quiz"""
+        self.play_quiz('true_false', questions)
+    
+    def play_quiz(self, kind, questions):
+        """Play a quiz of one kind in the terminal; the QuizSession does the asking and grading"""
+        empty, title, prompt_text = QUIZ_TEXT[kind]
         if not questions:
-            print("No true/false questions available!")
+            print(empty)
             return
         
-        print(f"\n✓❌ Starting True/False Quiz! ({len(questions)} questions)")
-        print("=" * 50)
+        self.session = None
+        if self.adaptive:
+            item_stats, ability = load_estimates(kind, self.topic)
+            quiz = AdaptiveQuizSession(kind, questions, item_stats, ability, on_answer=self.record_answer)
+        else:
+            quiz = QuizSession(kind, questions, on_answer=self.record_answer)
+        self.quiz = quiz
+        prompt = quiz.start()
         
-        self.score = 0
-        self.total_questions = len(questions)
+        print(f"\n{title} ({len(quiz)} questions)")
+        print("=" * 50)
         
-        for i, q in enumerate(questions, 1):
-            print(f"\nQuestion {i}: {q['question']}")
+        while prompt is not None:
+            print(f"\nQuestion {prompt['number']}: {prompt['question']}")
+            for option in prompt.get('options', ()):
+                print(f"  {option}")
             
             while True:
-                answer = input("Your answer (True/False or T/F): ").strip().lower()
-                if answer in ['true', 't', 'false', 'f']:
+                try:
+                    result = quiz.submit(input(prompt_text))
                     break
-                print("Please enter True/False or T/F")
-            
-            # Normalize answers
-            user_answer = 'true' if answer in ['true', 't'] else 'false'
-            correct_answer = q['answer'].lower()
+                except ValueError as e:
+                    print(e)
             
-            if user_answer == correct_answer:
+            if result['verdict'] == CORRECT:
                 print("✅ Correct! Good going!")
-                self.score += 1
+                if kind == 'fill_blanks' and result['answer'].lower() != result['expected'].lower():
+                    print(f"   (Expected: {result['expected']})")
+            elif result['verdict'] == PARTIAL:
+                print("🟡 Nearly there! Close enough!")
             else:
-                print(f"❌ Wrong! The correct answer is: {q['answer']}")
+                print(f"❌ Wrong! The correct answer is: {result['expected']}")
             
-            if q['explanation']:
-                print(f"💡 Explanation: {q['explanation']}")
+            if result['explanation']:
+                print(f"💡 Explanation: {result['explanation']}")
             
             input("\nPress Enter to continue...")
+            prompt = quiz.next()
         
+        summary = quiz.summary()
+        self.score = summary['score']
+        self.total_questions = summary['total']
         self.show_final_score()
+        if 'mastery' in summary:
+            print(format_mastery(summary))
+    
+    def record_answer(self, kind, question, answer, points):
+        """Save one answer of a topic's quiz; all answers of a quiz share its start time as session"""
+        if self.topic is None:
+            return
+        if self.session is None:
+            self.session = time.time()
+        get_store().record_attempt(self.session, self.topic, kind, question['question'], answer, points,
+                                   expected=expected_answer(kind, question))
     
     def check_partial_match(self, user_answer, correct_answer):
-        """Check if user answer is partially correct"""
-        # Simple similarity check
-        words_user = set(user_answer.split())
-        words_correct = set(correct_answer.split())
-        
-        if len(words_correct) == 0:
-            return False
-        
-        overlap = len(words_user.intersection(words_correct))
-        similarity = overlap / len(words_correct)
-        
-        return similarity >= 0.6  # 60% similarity threshold
+        """Check if user answer is at least partially correct"""
+        return grade_answer(user_answer, correct_answer) != WRONG
     
     def show_final_score(self):
         """Show final quiz score"""
@@ -224,16 +127,5 @@ class QuizSystem:
         print("🏆 QUIZ COMPLETED!")
         print("=" * 50)
         print(f"Your Score: {self.score}/{self.total_questions} ({percentage:.1f}%)")
-        
-        if percentage >= 90:
-            print("🌟 Excellent! You're a star!")
-        elif percentage >= 80:
-            print("🎉 Great job! Well done!")
-        elif percentage >= 70:
-            print("👏 Good work! Keep it up!")
-        elif percentage >= 60:
-            print("📚 Not bad! Try reviewing the material again.")
-        else:
-            print("💪 Keep studying! You'll get there!")
-        
+        print(score_message(percentage))
         print("=" * 50)
\ No newline at end of file
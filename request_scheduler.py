@@ -0,0 +1,303 @@
+"""
+Shared scheduler for every LLM request made by the generators
+
+Requests wait for a concurrency slot and for room in token buckets that
+track requests, input tokens and output tokens per minute. The concurrency
+limit adapts to the rate-limit headers returned by the API: it grows while
+there is headroom and is halved on 429/529 responses. Transient failures
+are retried with jittered exponential backoff, and requests that still
+fail raise a GenerationError so callers never mistake an error for content.
+While a stream listener is registered, requests use the streaming API and
+text is passed to the listeners as it is generated.
+"""
+
+import itertools
+import os
+import random
+import threading
+import time
+
+from generation_engine import DEFAULT_MAX_CONCURRENCY
+
+try:
+    import anthropic
+    HAS_ANTHROPIC = True
+except ImportError:
+    HAS_ANTHROPIC = False
+
+# Defaults match a low API tier; raise them to match your account limits.
+# Limits reported in response headers replace these once known.
+DEFAULT_RPM = int(os.getenv("SHRINX_RPM", "50"))
+DEFAULT_INPUT_TPM = int(os.getenv("SHRINX_INPUT_TPM", "40000"))
+DEFAULT_OUTPUT_TPM = int(os.getenv("SHRINX_OUTPUT_TPM", "8000"))
+MAX_RETRIES = int(os.getenv("SHRINX_MAX_RETRIES", "6"))
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class GenerationError(Exception):
+    """A generation request failed and produced no usable content"""
+
+    def __init__(self, message, label=None, attempts=0, status_code=None):
+        super().__init__(message)
+        self.label = label
+        self.attempts = attempts
+        self.status_code = status_code
+
+class RateLimitedError(GenerationError):
+    """Still rate limited (429) after every retry"""
+
+class OverloadedError(GenerationError):
+    """The API stayed overloaded (529) or unavailable after every retry"""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def acquire(self, amount):
+        """Block until `amount` units are available, then take them"""
+        amount = min(float(amount), self.capacity)
+        with self.condition:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) * 60.0 / self.capacity
+                self.condition.wait(timeout=wait)
+
+    def refund(self, amount):
+        """Give back units that were reserved but not used"""
+        if amount <= 0:
+            return
+        with self.condition:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+            self.condition.notify_all()
+
+    def sync(self, limit=None, remaining=None):
+        """Adopt the limit and remaining budget reported by the server"""
+        with self.condition:
+            self._refill()
+            if limit:
+                self.capacity = float(limit)
+            if remaining is not None:
+                self.level = min(self.level, float(remaining))
+            self.level = min(self.level, self.capacity)
+            self.condition.notify_all()
+
+    def drain(self):
+        """Empty the bucket, e.g. after a 429, so new requests wait for a refill"""
+        with self.condition:
+            self.level = 0.0
+            self.updated = time.monotonic()
+
+class AdaptiveLimiter:
+    """Concurrency limit that grows additively on headroom and halves on throttling"""
+
+    def __init__(self, initial, maximum):
+        self.limit = max(1, initial)
+        self.maximum = max(1, maximum)
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def increase(self):
+        with self.condition:
+            if self.limit < self.maximum:
+                self.limit += 1
+                self.condition.notify_all()
+
+    def decrease(self):
+        with self.condition:
+            self.limit = max(1, self.limit // 2)
+
+def _header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after(headers):
+    if headers is None:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def _status_code(error):
+    return getattr(error, "status_code", None)
+
+def _is_retryable(error):
+    if HAS_ANTHROPIC and isinstance(error, anthropic.APIConnectionError):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+class RequestScheduler:
+    def __init__(self, rpm=DEFAULT_RPM, input_tpm=DEFAULT_INPUT_TPM, output_tpm=DEFAULT_OUTPUT_TPM,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.input_tokens = TokenBucket(input_tpm)
+        self.output_tokens = TokenBucket(output_tpm)
+        self.concurrency = AdaptiveLimiter(max(1, max_concurrency // 2), max_concurrency)
+        self.max_retries = max_retries
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def create_message(self, client, label=None, estimated_input_tokens=0, **kwargs):
+        """
+        Call client.messages.create(**kwargs) under the rate limits, retrying transient errors.
+
+        While stream listeners are registered the request is streamed and
+        every text delta is passed to them as it arrives. Returns the final
+        message. Raises RateLimitedError, OverloadedError or GenerationError
+        when the request cannot be completed.
+        """
+        max_tokens = kwargs.get("max_tokens", 0)
+        request_id = next(_request_ids)
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            self.input_tokens.acquire(estimated_input_tokens)
+            self.output_tokens.acquire(max_tokens)
+            try:
+                with self.concurrency:
+                    self._count('requests')
+                    if _stream_listeners:
+                        message, headers = self._stream(client, label, request_id, attempt, kwargs)
+                    else:
+                        raw = client.messages.with_raw_response.create(**kwargs)
+                        message, headers = raw.parse(), raw.headers
+            except Exception as error:
+                self.output_tokens.refund(max_tokens)
+                final = not _is_retryable(error) or attempt == self.max_retries
+                if final and _stream_listeners:
+                    # Listeners discard the text of a request that will not complete
+                    _notify_stream(label, None, request_id)
+                if not _is_retryable(error):
+                    self._count('failed')
+                    raise GenerationError(f"{label or 'request'} failed: {error}", label, attempt + 1,
+                                          _status_code(error)) from error
+                self._on_retryable_error(error)
+                if attempt == self.max_retries:
+                    self._count('failed')
+                    raise self._final_error(error, label, attempt + 1) from error
+                self._count('retries')
+                self._backoff(attempt, _retry_after(getattr(getattr(error, "response", None), "headers", None)))
+                continue
+
+            self._observe(headers)
+            usage = getattr(message, "usage", None)
+            used_output = getattr(usage, "output_tokens", None)
+            if used_output is not None:
+                self.output_tokens.refund(max_tokens - used_output)
+            return message
+
+    def _stream(self, client, label, request_id, attempt, kwargs):
+        """Stream one attempt to the listeners; a retried attempt first tells them to discard its text"""
+        if attempt:
+            _notify_stream(label, None, request_id)
+        with client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                if text:
+                    _notify_stream(label, text, request_id)
+            message = stream.get_final_message()
+            headers = stream.response.headers
+        _notify_stream(label, "", request_id)
+        return message, headers
+
+    def _observe(self, headers):
+        """Track the server's view of our limits and open up concurrency while there is headroom"""
+        for bucket, kind in ((self.requests, "requests"), (self.input_tokens, "input-tokens"),
+                             (self.output_tokens, "output-tokens")):
+            limit = _header_int(headers, f"anthropic-ratelimit-{kind}-limit")
+            remaining = _header_int(headers, f"anthropic-ratelimit-{kind}-remaining")
+            if limit or remaining is not None:
+                bucket.sync(limit, remaining)
+
+        limit = _header_int(headers, "anthropic-ratelimit-requests-limit")
+        remaining = _header_int(headers, "anthropic-ratelimit-requests-remaining")
+        if limit is None or remaining is None or remaining > limit * 0.2:
+            self.concurrency.increase()
+
+    def _on_retryable_error(self, error):
+        status = _status_code(error)
+        if status in (429, 529):
+            self._count('throttled')
+            self.concurrency.decrease()
+        if status == 429:
+            self.requests.drain()
+
+    def _final_error(self, error, label, attempts):
+        status = _status_code(error)
+        message = f"{label or 'request'} failed after {attempts} attempts: {error}"
+        if status == 429:
+            return RateLimitedError(message, label, attempts, status)
+        if status is not None and status >= 500:
+            return OverloadedError(message, label, attempts, status)
+        return GenerationError(message, label, attempts, status)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Sleep with full-jitter exponential backoff, never less than the server's retry-after"""
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        time.sleep(delay)
+
+# Streaming: listener(label, text, request_id) is called with each text delta
+# of every request while registered. request_id tells apart concurrent
+# requests with the same label (one per chunk of a long document). An empty
+# text marks the end of a request's stream, and text None means the request
+# is being retried or has failed and the text received so far for it should
+# be discarded.
+_stream_listeners = []
+_request_ids = itertools.count(1)
+
+def add_stream_listener(listener):
+    """Register listener(label, text, request_id) and stream every request while it is registered"""
+    _stream_listeners.append(listener)
+
+def remove_stream_listener(listener):
+    if listener in _stream_listeners:
+        _stream_listeners.remove(listener)
+
+def _notify_stream(label, text, request_id):
+    for listener in list(_stream_listeners):
+        listener(label, text, request_id)
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_scheduler():
+    """Scheduler shared by every generator in the process"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
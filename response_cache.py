@@ -0,0 +1,227 @@
+"""
+Persistent cache for LLM responses
+
+Responses are stored in a local SQLite database keyed by model, system
+prompt, user prompt template, max_tokens and a hash of the input text, so
+regenerating a topic or re-uploading the same chapter costs nothing.
+Entries expire after a TTL and the least recently used entries are evicted
+once the stored responses exceed a size cap. Lookups only read: hit and
+miss counts are saved with the next write or at exit, and a hit refreshes
+its access time at most once an hour.
+
+Usage: python response_cache.py [stats|purge]
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from chunker import estimate_tokens
+from llm_backend import BACKEND
+from request_scheduler import get_scheduler, GenerationError
+
+DB_PATH = Path(os.getenv("SHRINX_CACHE_DIR", ".shrinx_cache")) / "responses.sqlite3"
+DEFAULT_TTL_SECONDS = int(os.getenv("SHRINX_RESPONSE_CACHE_TTL_DAYS", "30")) * 24 * 3600
+DEFAULT_MAX_BYTES = int(os.getenv("SHRINX_RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+# A hit records its access time only when the stored one is older than this
+ACCESS_RESOLUTION_SECONDS = 3600
+
+def make_key(model, system, template, max_tokens, text):
+    """Cache key for one generation request"""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    material = [model, system, template, max_tokens, text_hash]
+    # Keep responses from the offline fake backend apart from real ones
+    if BACKEND != "anthropic":
+        material.append(BACKEND)
+    material = json.dumps(material)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path=DB_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # Counters for this process; lifetime totals are kept in the database
+        self.hits = 0
+        self.misses = 0
+        # Counts not yet added to the lifetime totals; saved with the next write or by flush()
+        self._unsaved = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created, accessed FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                self._unsaved['misses'] += 1
+                return None
+
+            self.hits += 1
+            self._unsaved['hits'] += 1
+            # Eviction only needs a rough recency, so most hits write nothing
+            if now - row[2] > ACCESS_RESOLUTION_SECONDS:
+                with self._conn:
+                    self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key, response):
+        """Store a response and evict old entries if the cache is over its size cap"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now)
+            )
+            self._evict(now)
+            self._save_counters()
+
+    def flush(self):
+        """Write the hit and miss counts not yet saved to the database"""
+        with self._lock:
+            if self._closed:
+                return
+            with self._conn:
+                self._save_counters()
+
+    def close(self):
+        """Save the counters and close the database"""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+    def _save_counters(self):
+        for name, count in self._unsaved.items():
+            if count:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, count)
+                )
+                self._unsaved[name] = 0
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        """Entry count, size and hit/miss counters (this process and lifetime)"""
+        with self._lock, self._conn:
+            self._save_counters()
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': counters.get('hits', 0),
+            'total_misses': counters.get('misses', 0),
+            'path': str(self.path),
+        }
+
+    def purge(self):
+        """Delete every cached response and return how many were removed"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM responses").rowcount
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """Shared cache instance, created on first use"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+            atexit.register(_default_cache.flush)
+        return _default_cache
+
+def cached_message(client, model, system, template, text, max_tokens, cache=None, label=None):
+    """
+    Send template (with {text} filled in) to the messages API, reusing a cached response when possible
+
+    The request goes through the shared request scheduler, so it is rate
+    limited and retried; a request that still fails raises GenerationError.
+    """
+    cache = cache or get_cache()
+    key = make_key(model, system, template, max_tokens, text)
+    response_text = cache.get(key)
+    if response_text is not None:
+        return response_text
+
+    messages = [
+        {"role": "user", "content": template.format(text=text)}
+    ]
+    response = get_scheduler().create_message(
+        client,
+        label=label,
+        estimated_input_tokens=estimate_tokens(system + json.dumps(messages)),
+        model=model,
+        system=system,
+        messages=messages,
+        max_tokens=max_tokens
+    )
+    response_text = response.content[0].text.strip() if response.content else ""
+    if not response_text:
+        raise GenerationError(f"{label or 'request'} returned an empty response", label)
+    if response.stop_reason != "max_tokens":
+        cache.put(key, response_text)
+    return response_text
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "stats":
+        info = get_cache().stats()
+        lookups = info['total_hits'] + info['total_misses']
+        hit_rate = (info['total_hits'] / lookups * 100) if lookups else 0
+        print(f"Response cache: {info['path']}")
+        print(f"  Entries: {info['entries']}")
+        print(f"  Size: {info['bytes'] / 1024 / 1024:.1f} MB of {info['max_bytes'] / 1024 / 1024:.0f} MB")
+        print(f"  Hits: {info['total_hits']}, misses: {info['total_misses']} ({hit_rate:.1f}% hit rate)")
+    elif command == "purge":
+        print(f"Removed {get_cache().purge()} cached response(s)")
+    else:
+        print("Usage: python response_cache.py [stats|purge]")
@@ -0,0 +1,398 @@
+"""
+Fit the flashcard scheduler to the user's own review history
+
+SM-2 uses the same hard-coded intervals for everyone. This module fits a
+memory model to the review log instead: the chance of remembering a card
+after t days follows the FSRS forgetting curve R = (1 + 19/81 * t / S)^-0.5,
+where the stability S (the number of days after which R drops to 90%) is a
+log-linear function of the card's SM-2 state after its last review:
+
+    log S = w . [1, log interval, log ease, log(1 + lapses), hard, easy]
+
+The weights [0, 1, 0, 0, 0, 0] give S = SM-2 interval, i.e. plain SM-2, so
+that is the starting point and the prior the fit is pulled towards when
+there is little history. Remembered cards are then scheduled for the day
+their predicted recall falls to the target retention.
+
+The whole log is loaded into NumPy arrays once. Features, lapse counts and
+the review pairs (a review and the one after it) are built with array
+operations, and every step of the fit - a Fisher scoring step, i.e. a
+gradient step preconditioned by the 6x6 Fisher information - is a handful
+of vectorized passes over all events at once. A million reviews fit in
+about a second; benchmarks/bench_optimizer.py compares it with the same
+computation done in a per-event Python loop.
+
+NumPy is only needed for fitting; applying a saved model is plain Python.
+
+Usage: python review_optimizer.py [fit|--self-check]
+"""
+
+import json
+import math
+import os
+import time
+
+from generation_engine import write_atomic
+from review_store import DB_PATH
+from spaced_repetition import DAY, GRADES, CardState, review, set_memory_model
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+MODEL_PATH = DB_PATH.with_name("memory_model.json")
+MODEL_VERSION = 1
+FEATURES = ('bias', 'log_interval', 'log_ease', 'log_lapses', 'hard', 'easy')
+# Weights that reproduce plain SM-2: stability equals the SM-2 interval
+BASELINE = (0.0, 1.0, 0.0, 0.0, 0.0, 0.0)
+TARGET_RETENTION = float(os.getenv("SHRINX_TARGET_RETENTION", "0.9"))
+# FSRS forgetting curve: R(t) = (1 + FACTOR * t / S) ** DECAY, so R(S) = 0.9
+DECAY = -0.5
+FACTOR = 19 / 81
+# How strongly the fit is pulled towards BASELINE, in reviews' worth of evidence
+PRIOR_STRENGTH = 20.0
+MIN_EVENTS = 500
+MAX_INTERVAL_DAYS = 36500.0
+
+# Grade codes in the arrays follow the order of GRADES: again, hard, good, easy
+_GRADE_CODES = {grade: code for code, grade in enumerate(GRADES)}
+_AGAIN, _HARD, _EASY = _GRADE_CODES['again'], _GRADE_CODES['hard'], _GRADE_CODES['easy']
+
+def features(interval, ease, lapses, grade):
+    """Feature vector of a card's state after a review, in the order of FEATURES"""
+    return (1.0, math.log(max(interval, 1e-3)), math.log(ease), math.log1p(lapses),
+            1.0 if grade == 'hard' else 0.0, 1.0 if grade == 'easy' else 0.0)
+
+def recall_probability(elapsed_days, stability):
+    return (1 + FACTOR * elapsed_days / stability) ** DECAY
+
+class MemoryModel:
+    """Fitted weights, applied with plain Python when scheduling"""
+
+    def __init__(self, weights=BASELINE, retention=TARGET_RETENTION, events=0, log_loss=None,
+                 baseline_log_loss=None):
+        self.weights = [float(w) for w in weights]
+        self.retention = retention
+        self.events = events
+        self.log_loss = log_loss
+        self.baseline_log_loss = baseline_log_loss
+
+    def stability(self, interval, ease, lapses, grade):
+        """Days until recall drops to 90%"""
+        z = sum(w * x for w, x in zip(self.weights, features(interval, ease, lapses, grade)))
+        return math.exp(min(z, 50.0))
+
+    def interval(self, state, grade):
+        """Days until the card's predicted recall falls to the target retention"""
+        stability = self.stability(state.interval, state.ease, state.lapses, grade)
+        days = stability / FACTOR * (self.retention ** (1 / DECAY) - 1)
+        return min(max(days, 1.0), MAX_INTERVAL_DAYS)
+
+    def to_dict(self):
+        return {'version': MODEL_VERSION, 'features': list(FEATURES), 'weights': self.weights,
+                'retention': self.retention, 'events': self.events, 'log_loss': self.log_loss,
+                'baseline_log_loss': self.baseline_log_loss}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != MODEL_VERSION or data.get('features') != list(FEATURES):
+            raise ValueError("memory model was saved by a different version")
+        return cls(data['weights'], TARGET_RETENTION, data.get('events', 0), data.get('log_loss'),
+                   data.get('baseline_log_loss'))
+
+def save_model(model, path=MODEL_PATH):
+    write_atomic(path, json.dumps(model.to_dict(), indent=1))
+
+def load_model(path=MODEL_PATH):
+    """The saved model, or None when there is none or it cannot be read"""
+    try:
+        return MemoryModel.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Ignoring saved memory model: {e}")
+        return None
+
+def use_fitted_model(path=MODEL_PATH):
+    """Schedule with the saved model if there is one; returns it"""
+    model = load_model(path)
+    if model is not None:
+        set_memory_model(model)
+    return model
+
+# --- Fitting (NumPy) ---
+
+def _require_numpy():
+    if not HAS_NUMPY:
+        raise RuntimeError("fitting the memory model needs NumPy: pip install numpy")
+
+def load_history(store=None):
+    """The review log as NumPy arrays: card (int id), grade (code), reviewed (s), interval (days) and ease"""
+    _require_numpy()
+    if store is None:
+        from review_store import get_store
+        store = get_store()
+    rows = store.review_history()
+    if not rows:
+        return {name: np.zeros(0) for name in ('card', 'grade', 'reviewed', 'interval', 'ease')}
+    topics, card_ids, grades, reviewed, intervals, eases = zip(*rows)
+    topics = np.array(topics)
+    card_ids = np.array(card_ids)
+    new_card = np.ones(len(rows), dtype=bool)
+    new_card[1:] = (topics[1:] != topics[:-1]) | (card_ids[1:] != card_ids[:-1])
+    grades = np.array(grades)
+    codes = np.full(len(rows), _GRADE_CODES['good'])
+    for grade, code in _GRADE_CODES.items():
+        codes[grades == grade] = code
+    return {
+        'card': np.cumsum(new_card) - 1,
+        'grade': codes,
+        'reviewed': np.array(reviewed, dtype=float),
+        'interval': np.array(intervals, dtype=float),
+        'ease': np.array(eases, dtype=float),
+    }
+
+def training_events(history):
+    """
+    Pair every review of a remembered card with the card's next review.
+
+    Returns (X, elapsed_days, recalled): the features of the state after the
+    first review, the days until the second and whether the card was
+    remembered then. Arrays must be ordered card by card, oldest first.
+    """
+    _require_numpy()
+    card, grade = history['card'], history['grade']
+    count = len(card)
+    if count < 2:
+        return np.zeros((0, len(FEATURES))), np.zeros(0), np.zeros(0)
+    new_card = np.ones(count, dtype=bool)
+    new_card[1:] = card[1:] != card[:-1]
+    again = grade == _AGAIN
+    # Lapses so far for each review: a running count of 'again' restarted at every card
+    lapses_so_far = np.cumsum(again)
+    first = np.maximum.accumulate(np.where(new_card, np.arange(count), 0))
+    lapses = lapses_so_far - lapses_so_far[first] + again[first]
+    source = np.flatnonzero(~new_card[1:] & ~again[:-1])
+    elapsed = (history['reviewed'][source + 1] - history['reviewed'][source]) / DAY
+    source = source[elapsed > 0]
+    elapsed = elapsed[elapsed > 0]
+    X = np.column_stack([
+        np.ones(len(source)),
+        np.log(np.maximum(history['interval'][source], 1e-3)),
+        np.log(history['ease'][source]),
+        np.log1p(lapses[source]),
+        grade[source] == _HARD,
+        grade[source] == _EASY,
+    ]).astype(float)
+    return X, elapsed, (grade[source + 1] != _AGAIN).astype(float)
+
+def _terms(weights, X, elapsed, recalled):
+    """Predicted recall and the loss's first and second derivative terms for every event"""
+    z = X @ weights
+    u = FACTOR * elapsed * np.exp(-np.minimum(z, 50.0))
+    recall = np.clip((1 + u) ** DECAY, 1e-9, 1 - 1e-9)
+    slope = -DECAY * u * recall / (1 + u)                 # dR/dz
+    spread = recall * (1 - recall)
+    return recall, (recall - recalled) / spread * slope, slope * slope / spread
+
+def log_loss(weights, X, elapsed, recalled):
+    """Mean negative log-likelihood of the observed recalls"""
+    if not len(X):
+        return 0.0
+    z = X @ np.asarray(weights, dtype=float)
+    recall = np.clip((1 + FACTOR * elapsed * np.exp(-np.minimum(z, 50.0))) ** DECAY, 1e-9, 1 - 1e-9)
+    return float(-np.mean(recalled * np.log(recall) + (1 - recalled) * np.log(1 - recall)))
+
+def gradient(weights, X, elapsed, recalled, prior=PRIOR_STRENGTH):
+    """Gradient and Fisher information of the penalized total loss"""
+    weights = np.asarray(weights, dtype=float)
+    _, first, second = _terms(weights, X, elapsed, recalled)
+    offset = weights - np.asarray(BASELINE)
+    grad = X.T @ first + prior * offset
+    fisher = (X * second[:, None]).T @ X + prior * np.eye(len(weights))
+    return grad, fisher
+
+def fit(X, elapsed, recalled, prior=PRIOR_STRENGTH, max_steps=50, tolerance=1e-7):
+    """Fit the weights by Fisher scoring from BASELINE; returns (weights, steps taken)"""
+    _require_numpy()
+    weights = np.asarray(BASELINE, dtype=float)
+
+    def objective(w):
+        return log_loss(w, X, elapsed, recalled) * len(X) + prior / 2 * np.sum((w - BASELINE) ** 2)
+
+    current = objective(weights)
+    for step in range(1, max_steps + 1):
+        grad, fisher = gradient(weights, X, elapsed, recalled, prior)
+        direction = np.linalg.solve(fisher, grad)
+        # Halve the step until the loss goes down
+        scale = 1.0
+        while scale > 1e-4:
+            candidate = weights - scale * direction
+            value = objective(candidate)
+            if value <= current:
+                break
+            scale /= 2
+        else:
+            return weights, step
+        change = np.max(np.abs(candidate - weights))
+        weights, current = candidate, value
+        if change < tolerance:
+            return weights, step
+    return weights, max_steps
+
+def fit_history(history, prior=PRIOR_STRENGTH):
+    """Fit a MemoryModel to review history arrays; None when there are too few reviews"""
+    X, elapsed, recalled = training_events(history)
+    if len(X) < MIN_EVENTS:
+        return None
+    weights, _ = fit(X, elapsed, recalled, prior)
+    return MemoryModel(weights.tolist(), TARGET_RETENTION, len(X), log_loss(weights, X, elapsed, recalled),
+                       log_loss(BASELINE, X, elapsed, recalled))
+
+def simulate_history(cards, true_weights, seed=0, days=730, timing_spread=0.4):
+    """
+    Review history of simulated learners whose memory follows true_weights.
+
+    Cards are scheduled with plain SM-2 and reviewed somewhat early or late
+    (log-normal spread around the due date), as real users do. Returns the
+    arrays load_history() would.
+    """
+    _require_numpy()
+    import random
+    rng = random.Random(seed)
+    truth = MemoryModel(true_weights)
+    columns = {name: [] for name in ('card', 'grade', 'reviewed', 'interval', 'ease')}
+    success_grades, success_weights = ['hard', 'good', 'easy'], [2, 6, 2]
+    horizon = days * DAY
+    for card in range(cards):
+        state = CardState(card)
+        now = rng.random() * DAY
+        grade = rng.choices(success_grades + ['again'], success_weights + [3])[0]
+        while True:
+            review(state, grade, now)
+            columns['card'].append(card)
+            columns['grade'].append(_GRADE_CODES[grade])
+            columns['reviewed'].append(now)
+            columns['interval'].append(state.interval)
+            columns['ease'].append(state.ease)
+            elapsed = (state.due - now) * rng.lognormvariate(0, timing_spread)
+            if now + elapsed > horizon:
+                break
+            if grade == 'again':
+                chance = 0.85
+            else:
+                chance = recall_probability(elapsed / DAY, truth.stability(state.interval, state.ease, state.lapses,
+                                                                            grade))
+            now += elapsed
+            grade = rng.choices(success_grades, success_weights)[0] if rng.random() < chance else 'again'
+    return {name: np.array(values, dtype=float if name in ('reviewed', 'interval', 'ease') else int)
+            for name, values in columns.items()}
+
+def fit_store(store=None, path=MODEL_PATH):
+    """Fit the model to the review log and save it; returns the model or None if there is too little history"""
+    model = fit_history(load_history(store))
+    if model is not None:
+        save_model(model, path)
+    return model
+
+def _run_self_check():
+    """Recover known weights from simulated reviews and check gradients against a per-event loop"""
+    import tempfile
+    from pathlib import Path
+    from review_store import ReviewStore
+
+    _require_numpy()
+    problems = []
+    true_weights = (-0.3, 0.9, 0.4, -0.2, -0.35, 0.3)
+    history = simulate_history(3000, true_weights, seed=1)
+    X, elapsed, recalled = training_events(history)
+
+    # The vectorized lapse counts and review pairs match a straightforward walk over the log
+    expected_pairs = 0
+    lapses = 0
+    for i in range(len(history['card'])):
+        if i == 0 or history['card'][i] != history['card'][i - 1]:
+            lapses = 0
+        lapses += history['grade'][i] == _AGAIN
+        if i + 1 < len(history['card']) and history['card'][i + 1] == history['card'][i] \
+                and history['grade'][i] != _AGAIN:
+            if expected_pairs < len(X) and abs(X[expected_pairs][3] - math.log1p(lapses)) > 1e-12:
+                problems.append(f"lapse count of review {i} is wrong")
+                break
+            expected_pairs += 1
+    if expected_pairs != len(X):
+        problems.append(f"expected {expected_pairs} review pairs, built {len(X)}")
+
+    weights = np.array([-0.1, 1.1, 0.2, -0.1, -0.2, 0.1])
+    grad, _ = gradient(weights, X[:500], elapsed[:500], recalled[:500], prior=0.0)
+    loop_grad = [0.0] * len(FEATURES)
+    for x, t, y in zip(X[:500].tolist(), elapsed[:500].tolist(), recalled[:500].tolist()):
+        z = sum(w * v for w, v in zip(weights, x))
+        u = FACTOR * t * math.exp(-z)
+        r = (1 + u) ** DECAY
+        term = (r - y) / (r * (1 - r)) * (-DECAY * u * r / (1 + u))
+        for j, v in enumerate(x):
+            loop_grad[j] += term * v
+    if np.max(np.abs(grad - loop_grad)) > 1e-6 * max(1.0, np.max(np.abs(grad))):
+        problems.append("vectorized gradient differs from the per-event loop")
+
+    started = time.perf_counter()
+    model = fit_history(history)
+    seconds = time.perf_counter() - started
+    error = max(abs(a - b) for a, b in zip(model.weights, true_weights))
+    if error > 0.15:
+        problems.append(f"fitted weights {[round(w, 2) for w in model.weights]} are far from {true_weights}")
+    if not model.log_loss < model.baseline_log_loss:
+        problems.append("the fitted model does not predict recall better than SM-2")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReviewStore(Path(directory) / "reviews.sqlite3")
+        grades = list(GRADES)
+        for i in range(len(history['card'][:2000])):
+            state = CardState(f"card{history['card'][i]:05d}", interval=history['interval'][i],
+                              ease=history['ease'][i], last_review=history['reviewed'][i])
+            store.record_review("topic", state, grades[history['grade'][i]])
+        loaded = load_history(store)
+        store.close()
+        if any(not np.array_equal(loaded[name], history[name][:2000]) for name in loaded):
+            problems.append("history loaded from the review store differs from what was recorded")
+        path = Path(directory) / "memory_model.json"
+        save_model(model, path)
+        if load_model(path).weights != model.weights:
+            problems.append("the saved model does not load back")
+
+    state = CardState("card", interval=6.0, ease=2.5)
+    if abs(MemoryModel().interval(state, 'good') - 6.0) > 1e-9:
+        problems.append("baseline weights do not reproduce SM-2 intervals")
+
+    if problems:
+        print("❌ Optimizer check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ Fitted {model.events} review pairs in {seconds * 1000:.0f} ms; weights "
+          f"{[round(w, 2) for w in model.weights]} (true {list(true_weights)}); "
+          f"log loss {model.log_loss:.4f} vs {model.baseline_log_loss:.4f} for SM-2")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    elif command == "fit":
+        if not HAS_NUMPY:
+            print("❌ Fitting the memory model needs NumPy: pip install numpy")
+            sys.exit(1)
+        model = fit_store()
+        if model is None:
+            print(f"Not enough reviews to fit yet (need {MIN_EVENTS} reviews of remembered cards)")
+        else:
+            print(f"✅ Fitted to {model.events} reviews: log loss {model.log_loss:.4f} "
+                  f"(SM-2: {model.baseline_log_loss:.4f}), saved to {MODEL_PATH}")
+            for name, weight in zip(FEATURES, model.weights):
+                print(f"   {name:<13}{weight:+.3f}")
+    else:
+        print("Usage: python review_optimizer.py [fit|--self-check]")
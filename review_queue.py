@@ -0,0 +1,286 @@
+"""
+Review everything due: one flashcard queue across all topics
+
+The review store's due index already orders the cards of every topic by
+due time, so reading it in pages is the k-way merge of the topics'
+due-ordered streams, done by SQLite: the queue starts after one short
+index read however many topics and cards there are, and never holds more
+than a small window of due cards in memory. Card texts are loaded per
+topic when that topic's first card comes up.
+
+With interleaving on, the window is served by a heap keyed on when each
+topic was last shown, so consecutive cards come from different topics
+instead of one topic's whole backlog in a row. A daily cap limits how many
+different cards are started per day (reviews done earlier today count),
+and cards forgotten during the session come back once they are due again.
+
+Usage: python review_queue.py [sync [output_dir]|--self-check]
+"""
+
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+from review_store import end_of_today, get_store, start_of_today
+from spaced_repetition import LEARN_AHEAD_SECONDS, card_id, review
+from study_store import CARDS_FILE, load_cards
+
+OUTPUT_DIR = Path("output")
+# Most different cards reviewed per day across all topics
+DAILY_CAP = int(os.getenv("SHRINX_DAILY_REVIEWS", "200"))
+# Due cards read ahead from the store; interleaving picks among these
+WINDOW = 100
+
+def sync_topics(output_dir=OUTPUT_DIR, store=None):
+    """
+    Bring the store's cards up to date with every topic's flashcards.
+
+    Only topics whose cards changed since they were last synced are read,
+    and topics that were deleted are removed. Returns the number of topics
+    that were (re)synced.
+    """
+    store = store or get_store()
+    output_dir = Path(output_dir)
+    synced = store.synced_topics()
+    present = set()
+    changed = 0
+    if output_dir.exists():
+        for topic_dir in output_dir.iterdir():
+            if not topic_dir.is_dir():
+                continue
+            topic = topic_dir.name
+            present.add(topic)
+            mtime = _cards_mtime(topic_dir)
+            if mtime is None or synced.get(topic) == mtime:
+                continue
+            # Loading migrates flashcards.txt to cards.json, so take the time afterwards
+            cards = load_cards(topic_dir)
+            store.sync_cards(topic, (card_id(card) for card in cards))
+            store.mark_synced(topic, _cards_mtime(topic_dir))
+            changed += 1
+    for topic in set(synced) - present:
+        store.forget_topic(topic)
+    return changed
+
+def due_today(output_dir=OUTPUT_DIR, store=None):
+    """{topic: number of flashcards due today}, after syncing the topics"""
+    store = store or get_store()
+    sync_topics(output_dir, store)
+    return store.due_counts()
+
+def _cards_mtime(topic_dir):
+    times = [path.stat().st_mtime for path in (topic_dir / CARDS_FILE, topic_dir / "flashcards.txt")
+             if path.exists()]
+    return max(times) if times else None
+
+class ReviewQueue:
+    """
+    Due cards of every topic, served one at a time.
+
+    next() returns (topic, card, state) or None when the session is over;
+    review() grades the card that next() returned and saves the result.
+    """
+
+    def __init__(self, store=None, output_dir=OUTPUT_DIR, daily_cap=DAILY_CAP, interleave=True,
+                 window=WINDOW, now=None, load=load_cards):
+        now = time.time() if now is None else now
+        self.store = store or get_store()
+        self.output_dir = Path(output_dir)
+        self.interleave = interleave
+        self.window = window
+        self.load = load
+        self.until = end_of_today(now)
+        self.remaining = max(0, daily_cap - self.store.cards_reviewed_since(start_of_today(now)))
+        self.reviewed = 0
+        self._stream = self.store.iter_due(self.until)
+        # topic -> deque of its buffered due states, and a heap of (last shown, first due, topic)
+        self._buffer = {}
+        self._order = []
+        self._buffered = 0
+        self._last_shown = {}
+        self._turns = itertools.count(1)
+        # Cards graded this session that are due again before the day ends: (due, sequence, topic, state)
+        self._relearning = []
+        self._sequence = itertools.count()
+        self._done = set()
+        self._cards = {}
+
+    def next(self, now=None):
+        now = time.time() if now is None else now
+        if self._relearning and self._relearning[0][0] <= now:
+            return self._take_relearning()
+        if self.remaining > 0:
+            item = self._take_due()
+            if item is not None:
+                self.remaining -= 1
+                return item
+        if self._relearning and self._relearning[0][0] <= now + LEARN_AHEAD_SECONDS:
+            return self._take_relearning()
+        return None
+
+    def review(self, topic, state, grade, now=None):
+        """Grade a card and save it; returns its new state"""
+        state = review(state, grade, now)
+        self.store.record_review(topic, state, grade)
+        self._done.add((topic, state.card_id))
+        self.reviewed += 1
+        if state.due < self.until:
+            heapq.heappush(self._relearning, (state.due, next(self._sequence), topic, state))
+        return state
+
+    def upcoming(self, now=None):
+        """Seconds until the next forgotten card is due again, or None"""
+        if not self._relearning:
+            return None
+        return self._relearning[0][0] - (time.time() if now is None else now)
+
+    def _card(self, topic, cid):
+        cards = self._cards.get(topic)
+        if cards is None:
+            cards = self._cards[topic] = {card_id(card): card for card in self.load(self.output_dir / topic)}
+        return cards.get(cid)
+
+    def _take_relearning(self):
+        due, _, topic, state = heapq.heappop(self._relearning)
+        self._last_shown[topic] = next(self._turns)
+        return topic, self._card(topic, state.card_id), state
+
+    def _fill(self):
+        """Read due cards from the store until the window is full"""
+        while self._buffered < self.window:
+            entry = next(self._stream, None)
+            if entry is None:
+                return
+            topic, state = entry
+            if (topic, state.card_id) in self._done:
+                continue
+            cards = self._buffer.get(topic)
+            if cards is None:
+                cards = self._buffer[topic] = deque()
+                heapq.heappush(self._order, (self._turn_key(topic), state.due, topic))
+            cards.append(state)
+            self._buffered += 1
+
+    def _turn_key(self, topic):
+        return self._last_shown.get(topic, 0) if self.interleave else 0
+
+    def _take_due(self):
+        while True:
+            self._fill()
+            if not self._order:
+                return None
+            _, _, topic = heapq.heappop(self._order)
+            cards = self._buffer[topic]
+            state = cards.popleft()
+            self._buffered -= 1
+            if (topic, state.card_id) in self._done:
+                card = None
+            else:
+                card = self._card(topic, state.card_id)
+                if card is not None:
+                    self._last_shown[topic] = next(self._turns)
+            if cards:
+                heapq.heappush(self._order, (self._turn_key(topic), cards[0].due, topic))
+            else:
+                del self._buffer[topic]
+            # Cards whose topic was regenerated or deleted since the last sync are skipped
+            if card is not None:
+                return topic, card, state
+
+def _run_self_check():
+    """Check ordering, interleaving, the daily cap and relearning against a temporary store"""
+    import random
+    import tempfile
+    from review_store import ReviewStore
+    from spaced_repetition import CardState
+
+    problems = []
+    rng = random.Random(0)
+    now = time.time()
+    topics = [f"topic_{i:03d}" for i in range(300)]
+    # Topic i has i % 7 due cards and 20 cards that are not due yet
+    decks = {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReviewStore(Path(directory) / "reviews.sqlite3")
+        expected_due = []
+        for number, topic in enumerate(topics):
+            cards = [{'question': f"{topic} question {i}", 'answer': f"answer {i}"} for i in range(number % 7 + 20)]
+            decks[topic] = cards
+            states = []
+            for i, card in enumerate(cards):
+                due = now - rng.random() * 86400 if i < number % 7 else end_of_today(now) + 86400 * (i + 1)
+                states.append(CardState(card_id(card), due=due))
+                if due < end_of_today(now):
+                    expected_due.append((due, topic))
+            store.save_states(topic, states)
+        store.flush()
+        expected_due.sort()
+        load = lambda topic_dir: decks.get(topic_dir.name, [])
+        loaded = []
+        counting_load = lambda topic_dir: loaded.append(topic_dir.name) or load(topic_dir)
+
+        started = time.perf_counter()
+        queue = ReviewQueue(store, directory, daily_cap=10 ** 6, interleave=False, now=now, load=counting_load)
+        first = queue.next(now)
+        start_ms = (time.perf_counter() - started) * 1000
+        order = [(first[2].due, first[0])]
+        while True:
+            item = queue.next(now)
+            if item is None:
+                break
+            order.append((item[2].due, item[0]))
+        if order != expected_due:
+            problems.append("without interleaving cards do not come out in due order")
+        if len(loaded) != len({topic for _, topic in expected_due}):
+            problems.append("cards were loaded for topics with nothing due")
+
+        queue = ReviewQueue(store, directory, daily_cap=10 ** 6, window=50, now=now, load=load)
+        shown = []
+        while True:
+            item = queue.next(now)
+            if item is None:
+                break
+            shown.append(item[0])
+        repeats = sum(1 for a, b in zip(shown, shown[1:]) if a == b)
+        if sorted(shown) != sorted(topic for _, topic in expected_due):
+            problems.append("interleaving loses or repeats cards")
+        if repeats > len(shown) // 20:
+            problems.append(f"interleaving shows the same topic back to back {repeats} times")
+
+        queue = ReviewQueue(store, directory, daily_cap=5, now=now, load=load)
+        topic, card, state = queue.next(now)
+        queue.review(topic, state, 'again', now)
+        for _ in range(4):
+            topic, card, state = queue.next(now)
+            queue.review(topic, state, 'good', now)
+        if queue.next(now) is None or queue.remaining != 0:
+            problems.append("a forgotten card does not come back within the session")
+        if queue.next(now + 3600) is not None:
+            problems.append("the daily cap is not respected")
+        store.flush()
+        if ReviewQueue(store, directory, daily_cap=5, now=now, load=load).remaining != 0:
+            problems.append("reviews done earlier today do not count towards the cap")
+        store.close()
+
+    if problems:
+        print("❌ Review queue check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ {len(expected_due)} due cards from {len(topics)} topics merged in due order and interleaved "
+          f"({repeats} back-to-back repeats); first card after {start_ms:.1f} ms")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    elif command == "sync":
+        output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT_DIR
+        print(f"✅ Synced flashcards of {sync_topics(output_dir)} topic(s)")
+    else:
+        print("Usage: python review_queue.py [sync [output_dir]|--self-check]")
@@ -0,0 +1,530 @@
+"""
+Persistent study history: flashcard schedules, review log and quiz attempts
+
+Everything lives in one local SQLite database next to the topics. The
+card_state table holds each card's current SM-2 state and is indexed by due
+time, so "what is due today across all topics" is an index range scan that
+answers in milliseconds however long the history grows. review_log keeps
+every grade ever given and quiz_attempts every quiz answer, both indexed by
+topic and card or session.
+
+The database runs in WAL mode with synchronous=NORMAL, where a commit is an
+append to the log without an fsync. Writes are not made by the caller
+either: record_review() and record_attempt() put the statements on a queue
+and return at once, and a writer thread commits whatever has queued up in
+one transaction. Grading a card therefore never waits for the disk. Reads
+flush the queue first, so they always see earlier writes.
+
+Usage: python review_store.py [due|stats|--self-check]
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from spaced_repetition import INITIAL_EASE, CardState
+
+DB_PATH = Path(os.getenv("SHRINX_REVIEW_DB", "output/reviews.sqlite3"))
+# Most statements committed in one transaction by the writer thread
+BATCH_SIZE = 500
+# Rows read per query when iterating over due cards
+PAGE_SIZE = 200
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS card_state (
+        topic TEXT NOT NULL,
+        card_id TEXT NOT NULL,
+        due REAL NOT NULL,
+        interval REAL NOT NULL,
+        ease REAL NOT NULL,
+        repetitions INTEGER NOT NULL,
+        lapses INTEGER NOT NULL,
+        last_review REAL,
+        PRIMARY KEY (topic, card_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS card_state_due ON card_state (due, topic);
+    CREATE INDEX IF NOT EXISTS card_state_topic_due ON card_state (topic, due);
+    CREATE TABLE IF NOT EXISTS review_log (
+        id INTEGER PRIMARY KEY,
+        topic TEXT NOT NULL,
+        card_id TEXT NOT NULL,
+        grade TEXT NOT NULL,
+        reviewed REAL NOT NULL,
+        interval REAL NOT NULL,
+        ease REAL NOT NULL,
+        due REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS review_log_card ON review_log (topic, card_id, reviewed);
+    CREATE INDEX IF NOT EXISTS review_log_reviewed_card ON review_log (reviewed, topic, card_id);
+    CREATE TABLE IF NOT EXISTS quiz_attempts (
+        id INTEGER PRIMARY KEY,
+        session REAL NOT NULL,
+        topic TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        question TEXT NOT NULL,
+        expected TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        score REAL NOT NULL,
+        answered REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS quiz_attempts_topic ON quiz_attempts (topic, session);
+    CREATE TABLE IF NOT EXISTS synced_topics (
+        topic TEXT PRIMARY KEY,
+        cards_mtime REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS item_stats (
+        kind TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        difficulty REAL NOT NULL,
+        discrimination REAL NOT NULL,
+        attempts INTEGER NOT NULL,
+        PRIMARY KEY (kind, item_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS abilities (
+        topic TEXT PRIMARY KEY,
+        ability REAL NOT NULL,
+        answers INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value REAL NOT NULL
+    );
+"""
+
+_STATE_COLUMNS = "card_id, due, interval, ease, repetitions, lapses, last_review"
+_SAVE_STATE = ("INSERT OR REPLACE INTO card_state (topic, card_id, due, interval, ease, repetitions, lapses, "
+               "last_review) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+_ADD_CARD = ("INSERT OR IGNORE INTO card_state (topic, card_id, due, interval, ease, repetitions, lapses) "
+             f"VALUES (?, ?, ?, 0.0, {INITIAL_EASE}, 0, 0)")
+_DELETE_CARD = "DELETE FROM card_state WHERE topic = ? AND card_id = ?"
+_LOG_REVIEW = ("INSERT INTO review_log (topic, card_id, grade, reviewed, interval, ease, due) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+_MARK_SYNCED = "INSERT OR REPLACE INTO synced_topics (topic, cards_mtime) VALUES (?, ?)"
+_FORGET_TOPIC = "DELETE FROM synced_topics WHERE topic = ?"
+_LOG_ATTEMPT = ("INSERT INTO quiz_attempts (session, topic, kind, question, answer, score, answered, expected) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+_SET_SCORE = "UPDATE quiz_attempts SET score = ? WHERE id = ?"
+_SAVE_ITEM = ("INSERT OR REPLACE INTO item_stats (kind, item_id, difficulty, discrimination, attempts) "
+              "VALUES (?, ?, ?, ?, ?)")
+_SAVE_ABILITY = "INSERT OR REPLACE INTO abilities (topic, ability, answers) VALUES (?, ?, ?)"
+_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+def start_of_today(now=None):
+    """Unix time of the last local midnight"""
+    now = time.time() if now is None else now
+    day = time.localtime(now)
+    return time.mktime((day.tm_year, day.tm_mon, day.tm_mday, 0, 0, 0, 0, 0, -1))
+
+def end_of_today(now=None):
+    """Unix time of the coming local midnight"""
+    now = time.time() if now is None else now
+    day = time.localtime(now)
+    return time.mktime((day.tm_year, day.tm_mon, day.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+def _state(row):
+    return CardState(*row)
+
+class ReviewStore:
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Reads use this connection; the writer thread opens its own, which WAL lets run alongside
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._pending = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="review-store-writer", daemon=True)
+        self._writer.start()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Writes: queued and committed in batches by the writer thread ---
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._pending.get()]
+            # Group commit: take everything that queued up while the last transaction ran
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+            statements = [statement for statement in batch if statement is not None]
+            try:
+                with conn:
+                    for sql, group in itertools.groupby(statements, key=lambda statement: statement[0]):
+                        conn.executemany(sql, [params for _, params in group])
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not save {len(statements)} study record(s): {e}")
+            for _ in batch:
+                self._pending.task_done()
+        conn.close()
+
+    def _queue(self, sql, params):
+        if self._closed:
+            raise RuntimeError("review store is closed")
+        self._pending.put((sql, params))
+
+    def record_review(self, topic, state, grade):
+        """Save a card's new state after it was graded and log the review; returns at once"""
+        self._queue(_SAVE_STATE, (topic, state.card_id, state.due, state.interval, state.ease,
+                                  state.repetitions, state.lapses, state.last_review))
+        self._queue(_LOG_REVIEW, (topic, state.card_id, grade, state.last_review, state.interval,
+                                  state.ease, state.due))
+
+    def save_states(self, topic, states):
+        """Save card states without logging reviews, e.g. when importing a schedule"""
+        for state in states:
+            self._queue(_SAVE_STATE, (topic, state.card_id, state.due, state.interval, state.ease,
+                                      state.repetitions, state.lapses, state.last_review))
+
+    def sync_cards(self, topic, card_ids, now=None):
+        """
+        Make the topic's scheduled cards match its current flashcards.
+
+        New cards are added as due now and states of cards that no longer
+        exist (e.g. after the topic was regenerated) are removed; their review
+        log is kept. Returns (added, removed).
+        """
+        now = time.time() if now is None else now
+        card_ids = list(dict.fromkeys(card_ids))
+        existing = set(self.card_ids(topic))
+        added = 0
+        for cid in card_ids:
+            if cid not in existing:
+                self._queue(_ADD_CARD, (topic, cid, now))
+                added += 1
+        stale = existing.difference(card_ids)
+        for cid in stale:
+            self._queue(_DELETE_CARD, (topic, cid))
+        return added, len(stale)
+
+    def mark_synced(self, topic, cards_mtime):
+        """Remember the modification time of the cards file a topic was last synced from"""
+        self._queue(_MARK_SYNCED, (topic, cards_mtime))
+
+    def forget_topic(self, topic):
+        """Remove a topic that no longer exists; its review log is kept"""
+        for cid in self.card_ids(topic):
+            self._queue(_DELETE_CARD, (topic, cid))
+        self._queue(_FORGET_TOPIC, (topic,))
+
+    def record_attempt(self, session, topic, kind, question, answer, score, now=None, expected=""):
+        """
+        Log one quiz answer; session is the time the quiz started and score 0 to 1.
+
+        expected is the correct answer, kept so answers can be regraded later.
+        """
+        now = time.time() if now is None else now
+        self._queue(_LOG_ATTEMPT, (session, topic, kind, question, answer, score, now, expected))
+
+    def update_scores(self, scores):
+        """Change the scores of logged quiz answers, given as (score, attempt id) pairs"""
+        for score, attempt_id in scores:
+            self._queue(_SET_SCORE, (score, attempt_id))
+
+    def save_item_stats(self, kind, stats):
+        """Save quiz item estimates given as {item_id: (difficulty, discrimination, attempts)}"""
+        for item_id, (difficulty, discrimination, attempts) in stats.items():
+            self._queue(_SAVE_ITEM, (kind, item_id, difficulty, discrimination, attempts))
+
+    def save_abilities(self, abilities):
+        """Save ability estimates given as {topic: (ability, answers)}"""
+        for topic, (ability, answers) in abilities.items():
+            self._queue(_SAVE_ABILITY, (topic, ability, answers))
+
+    def set_meta(self, key, value):
+        self._queue(_SET_META, (key, value))
+
+    def flush(self):
+        """Wait until every queued write is committed"""
+        self._pending.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # --- Reads ---
+
+    def _query(self, sql, params=()):
+        self.flush()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def card_ids(self, topic):
+        return [row[0] for row in self._query("SELECT card_id FROM card_state WHERE topic = ?", (topic,))]
+
+    def load_states(self, topic):
+        """CardStates of a topic's cards, soonest due first"""
+        rows = self._query(f"SELECT {_STATE_COLUMNS} FROM card_state WHERE topic = ? ORDER BY due", (topic,))
+        return [_state(row) for row in rows]
+
+    def due_cards(self, until=None, topic=None, limit=None):
+        """(topic, CardState) of the cards due before until (default: end of today), soonest first"""
+        until = end_of_today() if until is None else until
+        sql = f"SELECT topic, {_STATE_COLUMNS} FROM card_state WHERE due < ?"
+        params = [until]
+        if topic is not None:
+            sql += " AND topic = ?"
+            params.append(topic)
+        sql += " ORDER BY due"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(row[0], _state(row[1:])) for row in self._query(sql, params)]
+
+    def iter_due(self, until=None, page_size=PAGE_SIZE):
+        """
+        (topic, CardState) of every card due before until, soonest first, across all topics.
+
+        Rows are read a page at a time, continuing after the last row of the
+        previous page, so the first card comes back after one short index read
+        however many cards are due.
+        """
+        until = end_of_today() if until is None else until
+        sql = f"SELECT topic, {_STATE_COLUMNS} FROM card_state WHERE due < ?"
+        order = " ORDER BY due, topic, card_id LIMIT ?"
+        rows = self._query(sql + order, (until, page_size))
+        while rows:
+            for row in rows:
+                yield row[0], _state(row[1:])
+            if len(rows) < page_size:
+                return
+            topic, cid, due = rows[-1][:3]
+            rows = self._query(sql + " AND (due, topic, card_id) > (?, ?, ?)" + order,
+                               (until, due, topic, cid, page_size))
+
+    def review_history(self):
+        """Every logged review as (topic, card_id, grade, reviewed, interval, ease), card by card, oldest first"""
+        return self._query(
+            "SELECT topic, card_id, grade, reviewed, interval, ease FROM review_log ORDER BY topic, card_id, reviewed"
+        )
+
+    def cards_reviewed_since(self, since):
+        """Number of different cards reviewed since a Unix time"""
+        return self._query(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT topic, card_id FROM review_log INDEXED BY review_log_reviewed_card "
+            "WHERE reviewed >= ?)", (since,)
+        )[0][0]
+
+    def synced_topics(self):
+        """{topic: modification time of the cards file it was last synced from}"""
+        return dict(self._query("SELECT topic, cards_mtime FROM synced_topics"))
+
+    def due_counts(self, until=None):
+        """{topic: number of cards due before until} (default: end of today)"""
+        until = end_of_today() if until is None else until
+        # Without the hint SQLite walks the whole (topic, due) index to avoid sorting the groups
+        return dict(self._query("SELECT topic, COUNT(*) FROM card_state INDEXED BY card_state_due "
+                                "WHERE due < ? GROUP BY topic", (until,)))
+
+    def card_history(self, topic, card_id):
+        """Reviews of one card, oldest first, as (grade, reviewed, interval, ease, due)"""
+        return self._query(
+            "SELECT grade, reviewed, interval, ease, due FROM review_log "
+            "WHERE topic = ? AND card_id = ? ORDER BY reviewed", (topic, card_id)
+        )
+
+    def quiz_sessions(self, topic=None):
+        """Quizzes taken, newest first, as dicts with topic, kind, started, score and total"""
+        sql = "SELECT session, topic, kind, SUM(score), COUNT(*) FROM quiz_attempts"
+        params = ()
+        if topic is not None:
+            sql += " WHERE topic = ?"
+            params = (topic,)
+        sql += " GROUP BY session, topic, kind ORDER BY session DESC"
+        return [{'started': started, 'topic': topic, 'kind': kind, 'score': score, 'total': total}
+                for started, topic, kind, score, total in self._query(sql, params)]
+
+    def quiz_attempts(self, kinds=None):
+        """Logged quiz answers, oldest first, as (id, kind, expected, answer, score)"""
+        sql = "SELECT id, kind, expected, answer, score FROM quiz_attempts"
+        params = ()
+        if kinds is not None:
+            kinds = tuple(kinds)
+            sql += f" WHERE kind IN ({', '.join('?' * len(kinds))})"
+            params = kinds
+        return self._query(sql + " ORDER BY id", params)
+
+    def attempts_since(self, after=0):
+        """Quiz answers logged after attempt id after, oldest first, as (id, topic, kind, question, expected, score)"""
+        return self._query("SELECT id, topic, kind, question, expected, score FROM quiz_attempts "
+                           "WHERE id > ? ORDER BY id", (after,))
+
+    def item_stats(self, kind):
+        """{item_id: (difficulty, discrimination, attempts)} of the quiz items of one kind"""
+        rows = self._query("SELECT item_id, difficulty, discrimination, attempts FROM item_stats WHERE kind = ?",
+                           (kind,))
+        return {row[0]: row[1:] for row in rows}
+
+    def abilities(self):
+        """{topic: (ability, answers)}"""
+        return {row[0]: row[1:] for row in self._query("SELECT topic, ability, answers FROM abilities")}
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def stats(self):
+        counts = {}
+        for table in ('card_state', 'review_log', 'quiz_attempts'):
+            counts[table] = self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+        counts['path'] = str(self.path)
+        return counts
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_store():
+    """Shared store instance, created on first use and flushed at exit"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ReviewStore()
+            atexit.register(_default_store.close)
+        return _default_store
+
+def _run_self_check():
+    """Build years of synthetic history and check the store's results and query speed"""
+    import random
+    import tempfile
+    from spaced_repetition import GRADES, ReviewScheduler
+
+    problems = []
+    rng = random.Random(0)
+    topics = [f"topic_{i:02d}" for i in range(40)]
+    cards_per_topic = 250
+    days = 3 * 365
+    start_time = 1.7e9
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReviewStore(Path(directory) / "reviews.sqlite3")
+        mode = store._query("PRAGMA journal_mode")[0][0]
+        if mode != "wal":
+            problems.append(f"journal mode is {mode}, not wal")
+
+        # Every card is reviewed whenever it falls due, for three years
+        schedulers = {}
+        for topic in topics:
+            ids = [f"{topic}-card{i}" for i in range(cards_per_topic)]
+            store.sync_cards(topic, ids, now=start_time)
+            scheduler = schedulers[topic] = ReviewScheduler()
+            scheduler.add_new(ids, now=start_time)
+        grades = list(GRADES)
+        weights = [1, 2, 6, 2]
+        reviews = 0
+        slowest = 0.0
+        record_seconds = 0.0
+        end_time = start_time + days * 86400
+        for topic, scheduler in schedulers.items():
+            while True:
+                state = scheduler.peek()
+                if state.due >= end_time:
+                    break
+                grade = rng.choices(grades, weights)[0]
+                scheduler.review(state.card_id, grade, state.due)
+                started = time.perf_counter()
+                store.record_review(topic, state, grade)
+                elapsed = time.perf_counter() - started
+                record_seconds += elapsed
+                slowest = max(slowest, elapsed)
+                reviews += 1
+        started = time.perf_counter()
+        store.flush()
+        flush_seconds = time.perf_counter() - started
+
+        loaded = {state.card_id: state.to_dict() for state in store.load_states(topics[0])}
+        expected = {cid: state.to_dict() for cid, state in schedulers[topics[0]].states.items()}
+        if loaded != expected:
+            problems.append("stored card states differ from the scheduler's")
+
+        until = end_time - 10 * 86400
+        expected_counts = {}
+        for topic, scheduler in schedulers.items():
+            count = sum(1 for state in scheduler.states.values() if state.due < until)
+            if count:
+                expected_counts[topic] = count
+        started = time.perf_counter()
+        counts = store.due_counts(until)
+        due = store.due_cards(until, limit=100)
+        query_ms = (time.perf_counter() - started) * 1000
+        if counts != expected_counts:
+            problems.append("due counts per topic are wrong")
+        if [state.due for _, state in due] != sorted(state.due for _, state in due) or len(due) != min(
+                100, sum(expected_counts.values())):
+            problems.append("due cards are not returned soonest first")
+        plan = " ".join(row[-1] for row in store._query(
+            "EXPLAIN QUERY PLAN SELECT * FROM card_state WHERE due < ? ORDER BY due", (until,)))
+        if "card_state_due" not in plan or "TEMP B-TREE" in plan:
+            problems.append(f"due query does not use the due index: {plan}")
+        history = store.card_history(topics[0], f"{topics[0]}-card0")
+        if len(history) < 2 or [row[1] for row in history] != sorted(row[1] for row in history):
+            problems.append("card history is missing or out of order")
+
+        store.sync_cards(topics[0], [f"{topics[0]}-card0", "new card"], now=end_time)
+        if sorted(store.card_ids(topics[0])) != sorted([f"{topics[0]}-card0", "new card"]):
+            problems.append("sync_cards does not add new and remove stale cards")
+
+        for score in (1, 0.5, 0):
+            store.record_attempt(end_time, topics[1], 'fill_blanks', "question", "answer", score, end_time,
+                                 expected="answer")
+        sessions = store.quiz_sessions(topics[1])
+        if len(sessions) != 1 or sessions[0]['score'] != 1.5 or sessions[0]['total'] != 3:
+            problems.append(f"quiz sessions are summed wrongly: {sessions}")
+        attempts = store.quiz_attempts(['fill_blanks'])
+        store.update_scores([(1, attempt_id) for attempt_id, _, _, _, _ in attempts])
+        if [row[2] for row in attempts] != ["answer"] * 3 or store.quiz_sessions(topics[1])[0]['score'] != 3:
+            problems.append("quiz answers cannot be read back and rescored")
+        stats = store.stats()
+        store.close()
+
+    if problems:
+        print("❌ Review store check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ {len(topics) * cards_per_topic} cards, {stats['review_log']} reviews over {days // 365} years")
+    print(f"   record_review: {record_seconds / reviews * 1e6:.1f} µs average, {slowest * 1000:.2f} ms slowest; "
+          f"{flush_seconds:.2f}s to drain the queue")
+    print(f"   due counts for all topics plus the 100 next due cards: {query_ms:.1f} ms")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "due"
+    if command == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    elif command == "due":
+        counts = get_store().due_counts()
+        if not counts:
+            print("🎉 Nothing due today")
+        for topic, count in sorted(counts.items()):
+            print(f"🃏 {topic.replace('_', ' ')}: {count} card(s) due today")
+    elif command == "stats":
+        info = get_store().stats()
+        print(f"Review store: {info['path']}")
+        print(f"  Scheduled cards: {info['card_state']}")
+        print(f"  Reviews logged: {info['review_log']}")
+        print(f"  Quiz answers logged: {info['quiz_attempts']}")
+    else:
+        print("Usage: python review_store.py [due|stats|--self-check]")
@@ -3,17 +3,30 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
 from pathlib import Path
 import threading
+from functools import partial
+
+from generation_engine import iter_generated, DEFAULT_MAX_CONCURRENCY, StreamProgress, write_atomic
 
 # Import your existing modules - make sure these files exist
 try:
-    from pdf_utils import extract_text_from_pdf
+    from pdf_utils import extract_pages_to_file, join_pages
     from ai_utils import (
         generate_summary, generate_notes, generate_flashcards,
         generate_mcq_questions, generate_fill_blanks, 
-        generate_true_false, generate_qa_questions
+        generate_true_false, generate_qa_questions,
+        prime_document_cache, add_usage_listener, remove_usage_listener, format_usage,
+        generate_bundle, format_artifact, bundle_sidecar, BundleError
     )
+    from request_scheduler import add_stream_listener, remove_stream_listener
+    from chunker import chunk_pdf, save_chunk_index
+    from study_store import save_artifact
     from quiz_system import QuizSystem
     from flashcard_system import FlashcardSystem
+    from spaced_repetition import format_interval
+    from review_optimizer import use_fitted_model
+    from study_session import (ASKING, CORRECT, FINISHED, PARTIAL, ReviewSession, due_review, review_message,
+                               topic_flashcards, topic_quiz)
+    from adaptive_quiz import format_mastery
 except ImportError as e:
     print(f"Warning: Could not import modules: {e}")
     print("Make sure you have all the required files in the same directory.")
@@ -22,25 +35,66 @@ except ImportError as e:
     def extract_text_from_pdf(path):
         return "Sample text from PDF for testing purposes."
     
-    def generate_summary(text):
+    def extract_pages_to_file(path, output_path):
+        text = extract_text_from_pdf(path)
+        Path(output_path).write_text(text, encoding="utf-8")
+        return [(1, text)]
+    
+    def join_pages(pages):
+        return "\n".join(text for _, text in pages if text).strip()
+    
+    def chunk_pdf(path, pages=None):
+        return None
+    
+    def save_chunk_index(path, chunks):
+        pass
+    
+    def save_artifact(topic_dir, name, text):
+        return 0
+    
+    def prime_document_cache(text, chunks=None):
+        return 0
+    
+    def add_usage_listener(listener):
+        pass
+    
+    def remove_usage_listener(listener):
+        pass
+    
+    def add_stream_listener(listener):
+        pass
+    
+    def remove_stream_listener(listener):
+        pass
+    
+    def format_usage(record):
+        return str(record)
+    
+    class BundleError(Exception):
+        pass
+    
+    def generate_bundle(text, chunks=None):
+        raise BundleError("bundle mode needs the AI modules")
+    
+    def generate_summary(text, chunks=None):
         return "This is a sample summary of the text."
     
-    def generate_notes(text):
+    def generate_notes(text, chunks=None):
         return "Sample detailed notes from the text."
     
-    def generate_flashcards(text):
+    def generate_flashcards(text, chunks=None):
         return "Q: Sample question?\nA: Sample answer\n---\nQ: Another question?\nA: Another answer"
     
-    def generate_mcq_questions(text):
+    def generate_mcq_questions(text, chunks=None):
         return "Q1: What is this?\nA) Option A\nB) Option B\nC) Option C\nD) Option D\nCorrect: A\nExplanation: This is the explanation."
     
-    def generate_fill_blanks(text):
+    def generate_fill_blanks(text, chunks=None):
         return "Q: This is a ___ question.\nA: sample\nExplanation: Fill in the blank."
     
-    def generate_true_false(text):
+    def generate_true_false(text, chunks=None):
         return "Q: This is true.\nA: True\nExplanation: This statement is correct."
     
-    def generate_qa_questions(text):
+    def generate_qa_questions(text, chunks=None):
         return "Q: What is this about?\nA: This is about sample content."
     
     class QuizSystem:
@@ -56,6 +110,12 @@ except ImportError as e:
     class FlashcardSystem:
         def parse_flashcards(self, text):
             return [{'question': 'Sample question?', 'answer': 'Sample answer'}]
+    
+    def use_fitted_model():
+        return None
+    
+    # Without the session engine the study screens fall back to a notice
+    topic_flashcards = topic_quiz = due_review = None
 
 class ShrinxGUI:
     def __init__(self):
@@ -84,6 +144,12 @@ class ShrinxGUI:
         self.quiz_system = QuizSystem()
         self.flashcard_system = FlashcardSystem()
         self.current_topic = None
+        # Quiz or flashcard session shown on screen
+        self.session = None
+        self.max_concurrency = DEFAULT_MAX_CONCURRENCY
+        self.bundle_mode = os.getenv("SHRINX_BUNDLE_MODE", "0") == "1"
+        # Adaptive quizzes stop once the learner's level is clear
+        self.adaptive_mode = False
         
         self.setup_fonts()
         self.create_main_screen()
@@ -157,6 +223,18 @@ class ShrinxGUI:
                               command=self.browse_topics_screen)
         browse_btn.pack(pady=15)
         
+        # Review everything due button
+        review_btn = tk.Button(buttons_frame, 
+                              text="🔁 Review Due Cards", 
+                              font=self.fonts['heading'],
+                              bg=self.colors['purple'], 
+                              fg='white',
+                              padx=40, pady=20,
+                              border=0,
+                              cursor='hand2',
+                              command=self.review_due_cards)
+        review_btn.pack(pady=15)
+        
         # Exit button
         exit_btn = tk.Button(buttons_frame, 
                             text="🚪 Exit", 
@@ -225,6 +303,17 @@ class ShrinxGUI:
                               width=30)
         topic_entry.pack(anchor='w', pady=10)
         
+        # Bundle mode: all materials from a single request
+        self.bundle_var = tk.BooleanVar(value=self.bundle_mode)
+        bundle_check = tk.Checkbutton(topic_frame,
+                                      text="⚡ Generate everything in one request (faster, uses fewer tokens)",
+                                      variable=self.bundle_var,
+                                      font=self.fonts['small'],
+                                      bg=self.colors['bg'],
+                                      fg=self.colors['dark'],
+                                      activebackground=self.colors['bg'])
+        bundle_check.pack(anchor='w')
+        
         # Process button
         process_btn = tk.Button(content_frame, 
                                text="🔄 Process PDF", 
@@ -250,6 +339,8 @@ class ShrinxGUI:
                                                       insertbackground='white')
         self.progress_text.pack()
         self.progress_text.insert('1.0', "Ready to process PDF...\n")
+        # Log lines go before this mark; text still streaming in is shown after it
+        self.progress_text.mark_set("live", tk.END)
     
     def browse_topics_screen(self):
         """Screen for browsing existing topics"""
@@ -409,6 +500,16 @@ class ShrinxGUI:
                                 cursor='hand2',
                                 command=command)
             quiz_btn.pack(pady=20)
+        
+        self.adaptive_var = tk.BooleanVar(value=self.adaptive_mode)
+        adaptive_check = tk.Checkbutton(quiz_frame,
+                                        text="🧠 Adaptive: pick questions for my level and stop once it is clear",
+                                        variable=self.adaptive_var,
+                                        font=self.fonts['small'],
+                                        bg=self.colors['bg'],
+                                        fg=self.colors['dark'],
+                                        activebackground=self.colors['bg'])
+        adaptive_check.pack(pady=10)
     
     def create_header(self, title, back_command):
         """Create a standard header with title and back button"""
@@ -471,6 +572,7 @@ class ShrinxGUI:
         self.progress_text.delete('1.0', tk.END)
         
         # Start processing in a separate thread
+        self.bundle_mode = self.bundle_var.get()
         thread = threading.Thread(target=self._process_pdf_thread, 
                                  args=(file_path, topic))
         thread.daemon = True
@@ -483,14 +585,19 @@ class ShrinxGUI:
             topic_dir.mkdir(parents=True, exist_ok=True)
             
             self.update_progress("🔄 Extracting text from PDF...")
-            text = extract_text_from_pdf(file_path)
-            
-            # Save raw text
-            raw_text_path = topic_dir / "raw.txt"
-            raw_text_path.write_text(text, encoding="utf-8")
+            # Raw text is saved page by page while the PDF is parsed
+            pages = extract_pages_to_file(file_path, topic_dir / "raw.txt")
+            text = join_pages(pages)
             self.update_progress("✅ Text extracted and saved")
             
-            # Generate all content
+            # Split along the PDF's sections so long documents are processed chunk by chunk,
+            # reusing the pages just extracted instead of reading the PDF again
+            chunks = chunk_pdf(file_path, pages=pages)
+            if chunks:
+                save_chunk_index(topic_dir / "sections.json", chunks)
+                self.update_progress(f"✅ Split into {len(chunks)} section chunk(s)")
+            
+            # Generate all content concurrently; each file is written as soon as it is ready
             content_types = [
                 ("summary", "📖 Generating summary...", generate_summary),
                 ("notes", "📝 Creating detailed notes...", generate_notes),
@@ -500,12 +607,44 @@ class ShrinxGUI:
                 ("true_false", "✓❌ Creating true/false questions...", generate_true_false),
                 ("qa_questions", "❓ Generating Q&A pairs...", generate_qa_questions)
             ]
+            messages = {filename: message for filename, message, func in content_types}
+            generators = [(filename, partial(func, chunks=chunks)) for filename, message, func in content_types]
+            
+            # Write the shared document prefix to the prompt cache once, so the
+            # parallel artifact requests below all read it instead of re-sending it
+            report_usage = lambda record: self.update_progress(f"   📊 {format_usage(record)}")
+            add_usage_listener(report_usage)
+            # Stream text into the progress box as it is generated, a few updates per second at most
+            stream_progress = StreamProgress(self.update_stream_preview)
+            add_stream_listener(stream_progress)
+            try:
+                bundle = {}
+                if self.bundle_mode:
+                    bundle = self._generate_bundle(text, chunks, topic_dir)
+                    generators = [(filename, func) for filename, func in generators if filename not in bundle]
+                
+                if len(generators) > 1 and prime_document_cache(text, chunks):
+                    self.update_progress("✅ Document cached for all artifact prompts")
+                stream_progress.finish("cache warm-up")
+                
+                failed = []
+                for filename, content, error in iter_generated(text, generators, self.max_concurrency,
+                                                               on_start=lambda name: self.update_progress(messages[name])):
+                    stream_progress.finish(filename)
+                    if error is not None:
+                        failed.append(filename)
+                        self.update_progress(f"❌ {filename.replace('_', ' ').title()} failed: {error}")
+                        continue
+                    write_atomic(topic_dir / f"{filename}.txt", content)
+                    save_artifact(topic_dir, filename, content)
+                    self.update_progress(f"✅ {filename.replace('_', ' ').title()} completed")
+            finally:
+                remove_usage_listener(report_usage)
+                remove_stream_listener(stream_progress)
+                self.update_stream_preview({})
             
-            for filename, message, func in content_types:
-                self.update_progress(message)
-                content = func(text)
-                (topic_dir / f"{filename}.txt").write_text(content, encoding="utf-8")
-                self.update_progress(f"✅ {filename.replace('_', ' ').title()} completed")
+            if failed:
+                raise RuntimeError(f"Could not generate: {', '.join(failed)}")
             
             self.update_progress(f"\n🎉 Successfully processed '{topic}'!")
             self.update_progress(f"📁 All content saved in: {topic_dir}")
@@ -520,15 +659,48 @@ class ShrinxGUI:
             self.update_progress(f"❌ Error: {str(e)}")
             self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to process PDF: {str(e)}"))
     
+    def _generate_bundle(self, text, chunks, topic_dir):
+        """Generate all artifacts in one request; returns the ones that came back complete"""
+        self.update_progress("⚡ Generating all materials in one request...")
+        try:
+            bundle = generate_bundle(text, chunks)
+        except BundleError as e:
+            self.update_progress(f"⚠️  Bundle mode unavailable ({e}), generating each artifact separately")
+            return {}
+        
+        write_atomic(topic_dir / "artifacts.json", bundle_sidecar(bundle))
+        for filename, value in bundle.items():
+            content = format_artifact(filename, value)
+            write_atomic(topic_dir / f"{filename}.txt", content)
+            save_artifact(topic_dir, filename, content)
+            self.update_progress(f"✅ {filename.replace('_', ' ').title()} completed")
+        return bundle
+    
     def update_progress(self, message):
         """Update progress text (thread-safe)"""
         def _update():
-            self.progress_text.insert(tk.END, message + "\n")
+            self.progress_text.insert("live", message + "\n")
             self.progress_text.see(tk.END)
             self.root.update_idletasks()
         
         self.root.after(0, _update)
     
+    def update_stream_preview(self, texts):
+        """Show the latest streamed text of each artifact below the progress log (thread-safe)"""
+        lines = [f"   ✍️  {label.replace('_', ' ')}: ...{' '.join(text.split())[-60:]}"
+                 for label, text in sorted(texts.items())]
+        
+        def _update():
+            self.progress_text.delete("live", tk.END)
+            if lines:
+                # Keep the mark in front of the preview so the next log line goes above it
+                self.progress_text.mark_gravity("live", tk.LEFT)
+                self.progress_text.insert(tk.END, "\n".join(lines) + "\n")
+                self.progress_text.mark_gravity("live", tk.RIGHT)
+            self.progress_text.see(tk.END)
+        
+        self.root.after(0, _update)
+    
     def show_summary(self):
         """Show topic summary"""
         self.show_content("summary", "📖 Summary", "summary.txt")
@@ -579,21 +751,225 @@ class ShrinxGUI:
         if not flashcards_file.exists():
             messagebox.showwarning("Warning", "No flashcards found for this topic.")
             return
+        if topic_flashcards is None:
+            messagebox.showinfo("Flashcards", "Flashcard study is not available.\nFor now, use the terminal version.")
+            return
+        
+        self.session = topic_flashcards(self.output_dir / self.current_topic)
+        if not len(self.session):
+            messagebox.showwarning("Warning", "No flashcards found for this topic.")
+            return
+        self.session.start()
+        self.show_flashcard_screen()
+    
+    def show_flashcard_screen(self, revealed=False):
+        """
+        Show the session's current flashcard, with its answer and grade buttons once revealed.
+        
+        Works for a topic's FlashcardSession and for a ReviewSession over the
+        due cards of every topic, which has no browsing but can skip a card.
+        """
+        session = self.session
+        reviewing = isinstance(session, ReviewSession)
+        self.clear_screen()
+        
+        if reviewing:
+            self.create_header("🔁 Review Due Cards", self.create_main_screen)
+        else:
+            topic_display = self.current_topic.replace('_', ' ').title()
+            self.create_header(f"🃏 Flashcards - {topic_display}", lambda: self.topic_detail_screen(self.current_topic))
+        
+        content_frame = tk.Frame(self.root, bg=self.colors['bg'])
+        content_frame.pack(fill='both', expand=True, padx=40, pady=20)
+        
+        if session.state == FINISHED:
+            summary = session.summary()
+            if reviewing:
+                text = review_message(summary)
+            else:
+                text = "🎉 No cards due right now!"
+                if summary['next_review'] is not None:
+                    text += f"\nNext review in {format_interval(summary['next_review'])}"
+            if summary['reviewed']:
+                text = f"📚 {summary['reviewed']} card(s) reviewed. Great work!\n\n" + text
+            tk.Label(content_frame, text=text, font=self.fonts['heading'], bg=self.colors['bg'],
+                     fg=self.colors['dark'], justify='center').pack(expand=True)
+            return
         
-        # For now, show in a simple dialog - can be enhanced later
-        messagebox.showinfo("Flashcards", "Flashcard study feature will be implemented!\nFor now, use the terminal version.")
+        card = session.card()
+        if reviewing:
+            where = f"📚 {session.topic.replace('_', ' ').title()}"
+        else:
+            where = f"Card {session.position + 1} of {len(session)}"
+        tk.Label(content_frame, text=f"{where}  •  reviewed: {session.reviewed}",
+                 font=self.fonts['small'], bg=self.colors['bg'], fg=self.colors['dark']).pack(anchor='w')
+        
+        card_frame = tk.Frame(content_frame, bg='white', relief='raised', bd=2)
+        card_frame.pack(fill='both', expand=True, pady=15)
+        tk.Label(card_frame, text=f"❓ {card['question']}", font=self.fonts['heading'], bg='white',
+                 fg=self.colors['dark'], wraplength=700, justify='center').pack(expand=True, padx=20, pady=20)
+        if revealed:
+            tk.Label(card_frame, text=f"💡 {card['answer']}", font=self.fonts['subtitle'], bg='white',
+                     fg=self.colors['primary_dark'], wraplength=700, justify='center').pack(expand=True, padx=20,
+                                                                                           pady=(0, 20))
+        
+        buttons_frame = tk.Frame(content_frame, bg=self.colors['bg'])
+        buttons_frame.pack()
+        if revealed:
+            buttons = [("Again", self.colors['secondary'], partial(self.grade_flashcard, 'again')),
+                       ("Hard", self.colors['orange'], partial(self.grade_flashcard, 'hard')),
+                       ("Good", self.colors['primary'], partial(self.grade_flashcard, 'good')),
+                       ("Easy", self.colors['purple'], partial(self.grade_flashcard, 'easy'))]
+        elif reviewing:
+            buttons = [("Show Answer", self.colors['primary'], self.reveal_flashcard),
+                       ("Skip →", self.colors['dark'], partial(self.browse_flashcards, session.skip))]
+        else:
+            buttons = [("← Prev", self.colors['dark'], partial(self.browse_flashcards, session.move, -1)),
+                       ("Show Answer", self.colors['primary'], self.reveal_flashcard),
+                       ("Next →", self.colors['dark'], partial(self.browse_flashcards, session.move, 1)),
+                       ("🔀 Shuffle", self.colors['accent'], partial(self.browse_flashcards, session.shuffle))]
+        for text, color, command in buttons:
+            tk.Button(buttons_frame, text=text, font=self.fonts['button'], bg=color, fg='white',
+                      padx=15, pady=8, border=0, cursor='hand2', command=command).pack(side='left', padx=8)
+    
+    def reveal_flashcard(self):
+        self.session.reveal()
+        self.show_flashcard_screen(revealed=True)
+    
+    def grade_flashcard(self, grade):
+        self.session.grade(grade)
+        self.show_flashcard_screen()
+    
+    def browse_flashcards(self, action, *args):
+        action(*args)
+        self.show_flashcard_screen()
+    
+    def review_due_cards(self):
+        """Review the flashcards due today across all topics, interleaved in one session"""
+        if due_review is None:
+            messagebox.showinfo("Review", "Reviewing is not available.\nFor now, use the terminal version.")
+            return
+        self.session = due_review(self.output_dir)
+        if self.session.start() is None:
+            messagebox.showinfo("Review", review_message(self.session.summary()))
+            return
+        self.show_flashcard_screen()
     
     def start_mcq_quiz(self):
         """Start MCQ quiz"""
-        messagebox.showinfo("Quiz", "Quiz feature will be implemented!\nFor now, use the terminal version.")
+        self.start_quiz('mcq_questions')
     
     def start_fill_blanks_quiz(self):
         """Start fill-in-the-blanks quiz"""
-        messagebox.showinfo("Quiz", "Quiz feature will be implemented!\nFor now, use the terminal version.")
+        self.start_quiz('fill_blanks')
     
     def start_true_false_quiz(self):
         """Start true/false quiz"""
-        messagebox.showinfo("Quiz", "Quiz feature will be implemented!\nFor now, use the terminal version.")
+        self.start_quiz('true_false')
+    
+    def start_quiz(self, kind):
+        """Start a quiz of one kind over the current topic's questions"""
+        if topic_quiz is None:
+            messagebox.showinfo("Quiz", "Quizzes are not available.\nFor now, use the terminal version.")
+            return
+        self.adaptive_mode = self.adaptive_var.get()
+        self.session = topic_quiz(self.output_dir / self.current_topic, kind, adaptive=self.adaptive_mode)
+        if not len(self.session):
+            messagebox.showwarning("Warning", "No questions of this kind found for this topic.")
+            return
+        self.session.start()
+        self.show_quiz_question()
+    
+    def show_quiz_question(self):
+        """Show the current question with an input for its answer"""
+        session = self.session
+        prompt = session.prompt()
+        self.clear_screen()
+        
+        topic_display = self.current_topic.replace('_', ' ').title()
+        self.create_header(f"🎯 Quiz - {topic_display}", self.quiz_menu)
+        
+        content_frame = tk.Frame(self.root, bg=self.colors['bg'])
+        content_frame.pack(fill='both', expand=True, padx=40, pady=20)
+        
+        tk.Label(content_frame, text=f"Question {prompt['number']} of {prompt['total']}  •  score: {session.score}",
+                 font=self.fonts['small'], bg=self.colors['bg'], fg=self.colors['dark']).pack(anchor='w')
+        tk.Label(content_frame, text=prompt['question'], font=self.fonts['heading'], bg=self.colors['bg'],
+                 fg=self.colors['dark'], wraplength=780, justify='left').pack(anchor='w', pady=15)
+        
+        answer = tk.StringVar()
+        if session.kind == 'fill_blanks':
+            entry = tk.Entry(content_frame, textvariable=answer, font=self.fonts['body'], width=40)
+            entry.pack(anchor='w', pady=5)
+            entry.focus_set()
+            entry.bind("<Return>", lambda event: self.submit_quiz_answer(answer.get(), feedback_frame, submit_btn))
+        else:
+            choices = ([(option, option[0]) for option in prompt['options']] if session.kind == 'mcq_questions'
+                       else [("True", "true"), ("False", "false")])
+            for text, value in choices:
+                tk.Radiobutton(content_frame, text=text, value=value, variable=answer, tristatevalue="unset",
+                               font=self.fonts['body'], bg=self.colors['bg'], anchor='w', wraplength=760,
+                               justify='left').pack(fill='x', pady=2)
+        
+        submit_btn = tk.Button(content_frame, text="Submit", font=self.fonts['button'], bg=self.colors['primary'],
+                               fg='white', padx=20, pady=8, border=0, cursor='hand2',
+                               command=lambda: self.submit_quiz_answer(answer.get(), feedback_frame, submit_btn))
+        submit_btn.pack(anchor='w', pady=15)
+        feedback_frame = tk.Frame(content_frame, bg=self.colors['bg'])
+        feedback_frame.pack(fill='x')
+    
+    def submit_quiz_answer(self, text, feedback_frame, submit_btn):
+        """Grade the answer, show the verdict and turn Submit into Next"""
+        if self.session.state != ASKING:
+            return
+        try:
+            result = self.session.submit(text)
+        except ValueError as e:
+            messagebox.showwarning("Quiz", str(e))
+            return
+        
+        if result['verdict'] == CORRECT:
+            verdict, color = "✅ Correct! Good going!", self.colors['primary']
+        elif result['verdict'] == PARTIAL:
+            verdict, color = f"🟡 Nearly there! The answer is: {result['expected']}", self.colors['yellow']
+        else:
+            verdict, color = f"❌ Wrong! The correct answer is: {result['expected']}", self.colors['secondary']
+        tk.Label(feedback_frame, text=verdict, font=self.fonts['button'], bg=self.colors['bg'], fg=color,
+                 wraplength=780, justify='left').pack(anchor='w')
+        if result['explanation']:
+            tk.Label(feedback_frame, text=f"💡 {result['explanation']}", font=self.fonts['body'],
+                     bg=self.colors['bg'], fg=self.colors['dark'], wraplength=780, justify='left').pack(anchor='w')
+        
+        last = self.session.position + 1 == len(self.session)
+        submit_btn.configure(text="See Results" if last else "Next →", command=self.next_quiz_question)
+    
+    def next_quiz_question(self):
+        if self.session.next() is None:
+            self.show_quiz_summary()
+        else:
+            self.show_quiz_question()
+    
+    def show_quiz_summary(self):
+        """Show the final score of the quiz"""
+        summary = self.session.summary()
+        self.clear_screen()
+        
+        topic_display = self.current_topic.replace('_', ' ').title()
+        self.create_header(f"🏆 Quiz Completed - {topic_display}", self.quiz_menu)
+        
+        content_frame = tk.Frame(self.root, bg=self.colors['bg'])
+        content_frame.pack(fill='both', expand=True, padx=40, pady=20)
+        
+        tk.Label(content_frame, text=f"Your Score: {summary['score']}/{summary['total']} ({summary['percentage']:.1f}%)",
+                 font=self.fonts['title'], bg=self.colors['bg'], fg=self.colors['primary']).pack(pady=(40, 10))
+        tk.Label(content_frame, text=summary['message'], font=self.fonts['heading'], bg=self.colors['bg'],
+                 fg=self.colors['dark']).pack(pady=10)
+        if 'mastery' in summary:
+            tk.Label(content_frame, text=format_mastery(summary), font=self.fonts['body'], bg=self.colors['bg'],
+                     fg=self.colors['dark']).pack(pady=10)
+        tk.Button(content_frame, text="🔁 Try Again", font=self.fonts['button'], bg=self.colors['primary'], fg='white',
+                  padx=20, pady=8, border=0, cursor='hand2',
+                  command=partial(self.start_quiz, self.session.kind)).pack(pady=20)
     
     def run(self):
         """Start the GUI application"""
@@ -602,6 +978,8 @@ class ShrinxGUI:
 def main():
     """Main function to run the GUI"""
     try:
+        # Schedule flashcards with the model fitted by 'python review_optimizer.py fit', if there is one
+        use_fitted_model()
         app = ShrinxGUI()
         app.run()
     except Exception as e:
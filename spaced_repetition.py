@@ -0,0 +1,248 @@
+"""
+Spaced repetition scheduling for flashcards
+
+Every card has an SM-2 state: ease factor, interval, repetition count and
+the time it is next due. Grading a card ('again', 'hard', 'good' or
+'easy') updates that state, so cards that are easy come back after weeks
+and cards that were forgotten come back within the session.
+
+ReviewScheduler keeps the states in a dict and the due times in a
+min-heap. Picking the next card and rescheduling one are O(log n); old
+heap entries of a rescheduled card are skipped when they reach the top,
+and the heap is rebuilt once stale entries outnumber live ones. This keeps
+it fast with hundreds of thousands of cards.
+
+Usage: python spaced_repetition.py --self-check
+"""
+
+import hashlib
+import heapq
+import itertools
+import time
+
+DAY = 86400.0
+
+# SM-2 answer quality for each grade; below 3 counts as forgotten
+GRADES = {'again': 1, 'hard': 3, 'good': 4, 'easy': 5}
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+# A forgotten card is shown again this soon, within the same session
+RELEARN_SECONDS = 600.0
+# Cards due within this window count as due, so relearning cards come back in the session
+LEARN_AHEAD_SECONDS = 1200.0
+# Easy answers stretch the interval beyond plain SM-2
+EASY_BONUS = 1.3
+
+# Memory model fitted to the user's own reviews (see review_optimizer); None schedules with plain SM-2
+_memory_model = None
+
+def set_memory_model(model):
+    """Let model.interval(state, grade) decide when remembered cards are due; None restores plain SM-2"""
+    global _memory_model
+    _memory_model = model
+
+def card_id(card):
+    """Stable id of a flashcard, from its question and answer"""
+    text = f"{card['question']}\n{card['answer']}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+class CardState:
+    """Scheduling state of one card; due and last_review are Unix timestamps"""
+
+    def __init__(self, card_id, due=0.0, interval=0.0, ease=INITIAL_EASE, repetitions=0, lapses=0,
+                 last_review=None):
+        self.card_id = card_id
+        self.due = due
+        self.interval = interval      # days
+        self.ease = ease
+        self.repetitions = repetitions
+        self.lapses = lapses
+        self.last_review = last_review
+
+    def to_dict(self):
+        return {'card_id': self.card_id, 'due': self.due, 'interval': self.interval, 'ease': self.ease,
+                'repetitions': self.repetitions, 'lapses': self.lapses, 'last_review': self.last_review}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        return f"CardState({self.card_id}, interval={self.interval:g}d, ease={self.ease:.2f}, due={self.due:.0f})"
+
+def review(state, grade, now=None):
+    """Apply one SM-2 review to state in place and return it"""
+    if grade not in GRADES:
+        raise ValueError(f"unknown grade: {grade}")
+    now = time.time() if now is None else now
+    quality = GRADES[grade]
+    if quality < 3:
+        state.repetitions = 0
+        state.interval = 0.0
+        state.lapses += 1
+        state.due = now + RELEARN_SECONDS
+    else:
+        if state.repetitions == 0:
+            interval = 1.0
+        elif state.repetitions == 1:
+            interval = 6.0
+        else:
+            interval = state.interval * state.ease
+        if grade == 'easy':
+            interval *= EASY_BONUS
+        state.interval = round(interval, 2)
+        state.repetitions += 1
+        state.due = now + state.interval * DAY
+    state.ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality >= 3 and _memory_model is not None:
+        # interval keeps the SM-2 value, which is what the model's features are built from
+        state.due = now + _memory_model.interval(state, grade) * DAY
+    state.last_review = now
+    return state
+
+class ReviewScheduler:
+    """Card states with a min-heap of due times"""
+
+    def __init__(self, states=()):
+        self.states = {}
+        self._heap = []
+        # card_id -> sequence number of its live heap entry; the sequence also breaks ties in order added
+        self._live = {}
+        self._sequence = itertools.count()
+        for state in states:
+            self.add(state)
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, card_id):
+        return card_id in self.states
+
+    def add(self, state):
+        """Add or replace a card's state"""
+        self.states[state.card_id] = state
+        self._push(state)
+
+    def add_new(self, card_ids, now=None):
+        """Add cards that have no state yet as new cards, due now in the given order"""
+        now = time.time() if now is None else now
+        added = 0
+        for cid in card_ids:
+            if cid not in self.states:
+                self.add(CardState(cid, due=now))
+                added += 1
+        return added
+
+    def review(self, card_id, grade, now=None):
+        """Grade a card and reschedule it; returns its new state"""
+        state = review(self.states[card_id], grade, now)
+        self._push(state)
+        return state
+
+    def peek(self):
+        """State of the card due soonest, or None when there are no cards"""
+        heap = self._heap
+        while heap:
+            due, sequence, cid = heap[0]
+            if self._live.get(cid) == sequence:
+                return self.states[cid]
+            heapq.heappop(heap)
+        return None
+
+    def next_due(self, now=None, learn_ahead=LEARN_AHEAD_SECONDS):
+        """State of the next card to study, or None if nothing is due yet"""
+        now = time.time() if now is None else now
+        state = self.peek()
+        if state is not None and state.due <= now + learn_ahead:
+            return state
+        return None
+
+    def due_count(self, now=None):
+        now = time.time() if now is None else now
+        return sum(1 for state in self.states.values() if state.due <= now)
+
+    def _push(self, state):
+        sequence = next(self._sequence)
+        self._live[state.card_id] = sequence
+        heapq.heappush(self._heap, (state.due, sequence, state.card_id))
+        if len(self._heap) > 2 * len(self.states) + 64:
+            self._compact()
+
+    def _compact(self):
+        """Drop stale heap entries"""
+        self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+def format_interval(seconds):
+    """Human-readable time until a card is due again"""
+    minutes = round(seconds / 60)
+    if minutes < 60:
+        return f"{max(1, minutes)} min"
+    hours = round(seconds / 3600)
+    if hours < 24:
+        return f"{hours} h"
+    days = round(seconds / DAY)
+    if days < 60:
+        return f"{days} day{'s' if days != 1 else ''}"
+    return f"{seconds / DAY / 30:.1f} months"
+
+def _run_self_check():
+    """Check the SM-2 intervals and that the heap always yields the card due soonest"""
+    import random
+
+    problems = []
+    state = CardState("card")
+    now = 0.0
+    intervals = []
+    for grade in ('good', 'good', 'good', 'easy'):
+        review(state, grade, now)
+        intervals.append(state.interval)
+        now = state.due
+    if intervals[:2] != [1.0, 6.0] or not intervals[0] < intervals[1] < intervals[2] < intervals[3]:
+        problems.append(f"intervals do not grow as expected: {intervals}")
+    review(state, 'again', now)
+    if state.repetitions != 0 or state.lapses != 1 or state.due != now + RELEARN_SECONDS:
+        problems.append("a forgotten card is not relearned in the session")
+    hard, easy = CardState("hard"), CardState("easy")
+    for _ in range(3):
+        review(hard, 'hard', 0.0)
+        review(easy, 'easy', 0.0)
+    if not hard.interval < easy.interval or not hard.ease < INITIAL_EASE < easy.ease:
+        problems.append("hard and easy answers do not move intervals and ease apart")
+
+    rng = random.Random(0)
+    scheduler = ReviewScheduler()
+    count = 200000
+    start = time.perf_counter()
+    scheduler.add_new((f"card{i}" for i in range(count)), now=0.0)
+    grades = list(GRADES)
+    now = 0.0
+    reviews = 20000
+    for _ in range(reviews):
+        state = scheduler.next_due(now, learn_ahead=0.0)
+        if state is None:
+            now = scheduler.peek().due
+            continue
+        scheduler.review(state.card_id, rng.choice(grades), now)
+        now += 1.0
+    elapsed = time.perf_counter() - start
+    soonest = min(state.due for state in scheduler.states.values())
+    if scheduler.peek().due != soonest:
+        problems.append("the heap does not yield the card due soonest")
+    if len(scheduler._heap) > 2 * count + 64:
+        problems.append("stale heap entries are not compacted")
+
+    if problems:
+        print("❌ Scheduler check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ SM-2 intervals {intervals}; {count} cards added and {reviews} reviews in {elapsed:.2f}s")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    print("Usage: python spaced_repetition.py --self-check")
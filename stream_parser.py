@@ -0,0 +1,80 @@
+"""
+Incremental parse of quiz questions and flashcards while they are generated
+
+make_parser returns an artifact_parser.LineParser, which takes a response
+in whatever pieces it streams in and hands back each item as soon as it is
+complete. Feeding a text in any number of pieces and then calling close()
+gives exactly the items artifact_parser.parse returns for the whole text.
+
+Usage: python stream_parser.py --self-check
+"""
+
+from artifact_parser import LineParser
+
+def make_parser(artifact):
+    """Incremental parser for one of the question or flashcard artifacts"""
+    return LineParser(artifact)
+
+def _run_self_check():
+    """
+    Check that incremental parsing matches the batch parser for every way of cutting the text,
+    both on regular output and on output with blank lines and wrapped lines inside blocks.
+    """
+    import random
+    from artifact_parser import parse
+    from llm_backend import FakeClient
+
+    prompts = {
+        'flashcards': "Create 10 flashcards from the document above.",
+        'mcq_questions': "Create 5 multiple choice questions based on the document above.",
+        'fill_blanks': "Create 5 fill-in-the-blank questions from the document above.",
+        'true_false': "Create 5 true/false questions from the document above.",
+        'qa_questions': "Create 5 detailed question-answer pairs from the document above.",
+    }
+    client = FakeClient(latency=0)
+    document = "The mitochondria is the powerhouse of the cell. Ribosomes assemble proteins from amino acids. " * 20
+    rng = random.Random(0)
+    problems = []
+    for artifact, prompt in prompts.items():
+        message = client.create(model="fake", max_tokens=4000, messages=[{"role": "user", "content": [
+            {"type": "text", "text": f"<document>\n{document}\n</document>"}, {"type": "text", "text": prompt}]}])
+        text = message.content[0].text
+        expected, errors = parse(artifact, text)
+        # Every other question gets a blank line after it and every answer line a wrapped continuation
+        irregular = "\n".join(f"{line}\n" if line.startswith("Q") and i % 2 else
+                               f"{line}\n  (continued)" if line.startswith("A:") else line
+                               for i, line in enumerate(text.split("\n")))
+        irregular_items, irregular_errors = parse(artifact, irregular)
+        if errors or irregular_errors or len(irregular_items) != len(expected):
+            problems.append(f"{artifact}: batch parse found {len(expected)}/{len(irregular_items)} items, "
+                            f"{len(errors) + len(irregular_errors)} errors")
+            continue
+        for variant, variant_text, variant_items in (("regular", text, expected),
+                                                     ("irregular", irregular, irregular_items)):
+            for trial in range(50):
+                parser = make_parser(artifact)
+                items = []
+                position = 0
+                while position < len(variant_text):
+                    step = rng.randint(1, 40)
+                    items.extend(parser.feed(variant_text[position:position + step]))
+                    position += step
+                items.extend(parser.close())
+                if items != variant_items:
+                    problems.append(f"{artifact} ({variant}): trial {trial} parsed {len(items)} items, "
+                                    f"expected {len(variant_items)}")
+                    break
+
+    if problems:
+        print("❌ Incremental parser check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print(f"✅ Incremental parsing matches the batch parser for {len(prompts)} artifact types")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    print("Usage: python stream_parser.py --self-check")
@@ -0,0 +1,518 @@
+"""
+Headless quiz and flashcard sessions
+
+A session is a small state machine that owns everything a study session
+decides (which item comes next, whether an answer is valid, how it is
+graded, how a card is rescheduled, the score) and nothing about how items
+are shown or answers typed. The terminal loops in quiz_system and
+flashcard_system, the Tk screens in shrinx_gui and the simulation harness
+in benchmarks/bench_sessions.py all drive the same sessions:
+
+    QuizSession:      ready -> start() -> asking -> submit() -> answered -> next() -> ... -> finished
+    FlashcardSession: ready -> start() -> asking -> reveal() -> answered -> grade() -> asking/finished
+    ReviewSession:    the same as FlashcardSession, over the due cards of every topic
+
+Calling an action the current state does not allow raises SessionError;
+an answer that cannot be understood (e.g. "X" to a multiple choice
+question) raises ValueError with a message to show the user, and the
+question stays open. Sessions read the time through a clock function, so
+simulations can run months of study in a second. A ReviewSession serves
+the cards of a review_queue.ReviewQueue, which decides what is due.
+
+Usage: python study_session.py --self-check
+"""
+
+import random
+import time
+from pathlib import Path
+
+from answer_matcher import CORRECT, SCORES, WRONG, grade_answer
+from deck import OPTION_LETTERS, as_deck
+from spaced_repetition import GRADES, ReviewScheduler, card_id, format_interval
+
+READY = 'ready'
+ASKING = 'asking'
+ANSWERED = 'answered'
+FINISHED = 'finished'
+
+QUIZ_KINDS = ('mcq_questions', 'fill_blanks', 'true_false')
+
+class SessionError(Exception):
+    """An action the session's current state does not allow"""
+
+def parse_answer(kind, text):
+    """A typed answer in the form the kind is graded in; ValueError says what to type instead"""
+    text = text.strip()
+    if kind == 'mcq_questions':
+        letter = text.upper()
+        if len(letter) != 1 or letter not in OPTION_LETTERS:
+            raise ValueError("Please enter A, B, C, or D")
+        return letter
+    if kind == 'true_false':
+        answer = text.lower()
+        if answer not in ('true', 't', 'false', 'f'):
+            raise ValueError("Please enter True/False or T/F")
+        return 'true' if answer in ('true', 't') else 'false'
+    return text
+
+def expected_answer(kind, item):
+    """The correct answer of a question as it is shown and stored"""
+    return item['correct'] if kind == 'mcq_questions' else item['answer']
+
+def grade(kind, answer, item):
+    """CORRECT, PARTIAL or WRONG for a parsed answer"""
+    if kind == 'mcq_questions':
+        return CORRECT if answer == item['correct'] else WRONG
+    if kind == 'true_false':
+        # Stored answers may carry a reason after the verdict ("False, it ...")
+        return CORRECT if item['answer'].strip().lower().startswith(answer) else WRONG
+    return grade_answer(answer, item['answer'])
+
+def score_message(percentage):
+    if percentage >= 90:
+        return "🌟 Excellent! You're a star!"
+    if percentage >= 80:
+        return "🎉 Great job! Well done!"
+    if percentage >= 70:
+        return "👏 Good work! Keep it up!"
+    if percentage >= 60:
+        return "📚 Not bad! Try reviewing the material again."
+    return "💪 Keep studying! You'll get there!"
+
+def review_message(summary):
+    """Why a ReviewSession ran out of cards, from its summary"""
+    if summary['next_review'] is not None:
+        return f"🎉 Nothing else due right now. Forgotten cards come back in {format_interval(summary['next_review'])}"
+    if summary['limit_reached']:
+        return "🎉 Daily review limit reached. Come back tomorrow!"
+    return "🎉 All caught up! Nothing is due today."
+
+class _Session:
+    state = READY
+
+    def _expect(self, *states):
+        if self.state not in states:
+            raise SessionError(f"cannot do that while the session is {self.state}")
+
+class QuizSession(_Session):
+    """
+    One pass over a quiz's questions.
+
+    on_answer(kind, item, answer, points) is called after every graded
+    answer, e.g. to save it (QuizSystem.record_answer has that signature).
+    """
+
+    def __init__(self, kind, questions, on_answer=None, clock=time.time):
+        if kind not in QUIZ_KINDS:
+            raise ValueError(f"not a quiz kind: {kind}")
+        self.kind = kind
+        self.questions = as_deck(kind, questions)
+        # Indices into self.questions in the order they are asked
+        self.order = self.questions.order()
+        self.on_answer = on_answer
+        self.clock = clock
+        self.position = -1
+        self.score = 0
+        self.results = []
+        self.started = None
+        self.finished = None
+
+    def __len__(self):
+        return len(self.order)
+
+    def start(self):
+        """Begin the quiz; returns the first prompt, or None if there are no questions"""
+        self._expect(READY)
+        self.started = self.clock()
+        return self._advance()
+
+    def current(self):
+        """The question being asked or just answered"""
+        return self.questions[self.order[self.position]]
+
+    def prompt(self):
+        """What to show for the current question: number, total, question and, for MCQs, options"""
+        self._expect(ASKING, ANSWERED)
+        item = self.current()
+        prompt = {'number': self.position + 1, 'total': len(self), 'question': item['question']}
+        if self.kind == 'mcq_questions':
+            prompt['options'] = item['options']
+        return prompt
+
+    def submit(self, text):
+        """
+        Grade an answer to the current question.
+
+        Returns a dict with the parsed answer, verdict, points, expected
+        answer and explanation.
+        """
+        self._expect(ASKING)
+        answer = parse_answer(self.kind, text)
+        item = self.current()
+        verdict = grade(self.kind, answer, item)
+        points = SCORES[verdict]
+        self.score += points
+        result = {'answer': answer, 'verdict': verdict, 'points': points,
+                  'expected': expected_answer(self.kind, item), 'explanation': item['explanation']}
+        self.results.append(result)
+        self.state = ANSWERED
+        if self.on_answer:
+            self.on_answer(self.kind, item, answer, points)
+        return result
+
+    def next(self):
+        """Move on from an answered question; returns the next prompt, or None when the quiz is over"""
+        self._expect(ANSWERED)
+        return self._advance()
+
+    def _advance(self):
+        self.position += 1
+        if self.position >= len(self.order):
+            self.state = FINISHED
+            self.finished = self.clock()
+            return None
+        self.state = ASKING
+        return self.prompt()
+
+    def summary(self):
+        """Score so far, as a dict with score, total, answered, percentage and message"""
+        total = len(self.order)
+        percentage = self.score / total * 100 if total else 0.0
+        end = self.finished if self.finished is not None else self.clock()
+        return {'score': self.score, 'total': total, 'answered': len(self.results), 'percentage': percentage,
+                'correct': sum(1 for result in self.results if result['verdict'] == CORRECT),
+                'message': score_message(percentage),
+                'seconds': end - self.started if self.started is not None else 0.0}
+
+class FlashcardSession(_Session):
+    """
+    A topic's flashcards in order of when they are due.
+
+    Grading a card reschedules it and moves to the card due next; the
+    session is finished when nothing is due. Cards can also be browsed
+    (move, jump, shuffle) without grading them. Pass the CardStates of an
+    earlier session to continue its schedule; on_review(state, grade) is
+    called after every graded card, e.g. to save it.
+    """
+
+    def __init__(self, cards, states=(), on_review=None, clock=time.time, rng=random):
+        self.cards = as_deck('flashcards', cards)
+        # Browsing and shuffling reorder this index array, never the cards
+        self.order = self.cards.order()
+        # slots[card index] is the card's position in self.order
+        self.slots = self.cards.order()
+        self.card_ids = [card_id(card) for card in self.cards]
+        self.indices = {cid: i for i, cid in enumerate(self.card_ids)}
+        self.on_review = on_review
+        self.clock = clock
+        self.rng = rng
+        self.scheduler = ReviewScheduler(state for state in states if state.card_id in self.indices)
+        self.scheduler.add_new(self.indices, now=clock())
+        self.position = 0
+        self.reviewed = 0
+        self.grades = dict.fromkeys(GRADES, 0)
+
+    def __len__(self):
+        return len(self.order)
+
+    def start(self):
+        """Go to the card due first; returns it, or None if nothing is due"""
+        self._expect(READY)
+        return self._next_due()
+
+    def card(self):
+        """The card at the current position"""
+        return self.cards[self.order[self.position]]
+
+    def card_state(self):
+        """Schedule of the current card"""
+        return self.scheduler.states[self.card_ids[self.order[self.position]]]
+
+    def reveal(self):
+        """Show the current card's answer; returns it"""
+        self._expect(ASKING, ANSWERED)
+        self.state = ANSWERED
+        return self.card()['answer']
+
+    def grade(self, grade):
+        """Grade the revealed card and move to the card due next; returns its new CardState"""
+        self._expect(ANSWERED)
+        if grade not in GRADES:
+            raise ValueError("Please grade again, hard, good or easy")
+        state = self.scheduler.review(self.card_ids[self.order[self.position]], grade, self.clock())
+        self.reviewed += 1
+        self.grades[grade] += 1
+        if self.on_review:
+            self.on_review(state, grade)
+        self._next_due()
+        return state
+
+    def move(self, step):
+        """Browse to the card step positions away, wrapping around"""
+        self._expect(ASKING, ANSWERED)
+        self.position = (self.position + step) % len(self.order)
+        self.state = ASKING
+        return self.card()
+
+    def jump_random(self):
+        self._expect(ASKING, ANSWERED)
+        self.position = self.rng.randrange(len(self.order))
+        self.state = ASKING
+        return self.card()
+
+    def shuffle(self):
+        """Shuffle the browsing order and go to its first card"""
+        self._expect(ASKING, ANSWERED)
+        self.rng.shuffle(self.order)
+        for position, index in enumerate(self.order):
+            self.slots[index] = position
+        self.position = 0
+        self.state = ASKING
+        return self.card()
+
+    def next_review(self):
+        """Seconds until the card due soonest, or None when there are no cards"""
+        state = self.scheduler.peek()
+        return None if state is None else state.due - self.clock()
+
+    def _next_due(self):
+        state = self.scheduler.next_due(self.clock())
+        if state is None:
+            self.state = FINISHED
+            return None
+        self.position = self.slots[self.indices[state.card_id]]
+        self.state = ASKING
+        return self.card()
+
+    def summary(self):
+        return {'cards': len(self.order), 'reviewed': self.reviewed, 'grades': dict(self.grades),
+                'due': self.scheduler.due_count(self.clock()), 'next_review': self.next_review()}
+
+class ReviewSession(_Session):
+    """
+    The due flashcards of every topic, one at a time from a ReviewQueue.
+
+    Works like a FlashcardSession without browsing: topic is the current
+    card's topic, skip() moves on without grading, and grading saves the
+    card through the queue. The session is finished when nothing else is
+    due, the daily cap is reached or every forgotten card is still some
+    time away.
+    """
+
+    def __init__(self, queue, clock=time.time):
+        self.queue = queue
+        self.clock = clock
+        self.topic = None
+        self._card = None
+        self._state = None
+        self.grades = dict.fromkeys(GRADES, 0)
+
+    @property
+    def reviewed(self):
+        return self.queue.reviewed
+
+    def start(self):
+        """Go to the first due card; returns it, or None if nothing is due"""
+        self._expect(READY)
+        return self._next_due()
+
+    def card(self):
+        return self._card
+
+    def card_state(self):
+        return self._state
+
+    def reveal(self):
+        """Show the current card's answer; returns it"""
+        self._expect(ASKING, ANSWERED)
+        self.state = ANSWERED
+        return self._card['answer']
+
+    def grade(self, grade):
+        """Grade the revealed card, save it and move to the next due card; returns its new CardState"""
+        self._expect(ANSWERED)
+        if grade not in GRADES:
+            raise ValueError("Please grade again, hard, good or easy")
+        state = self.queue.review(self.topic, self._state, grade, self.clock())
+        self.grades[grade] += 1
+        self._next_due()
+        return state
+
+    def skip(self):
+        """Move to the next due card without grading this one"""
+        self._expect(ASKING, ANSWERED)
+        return self._next_due()
+
+    def next_review(self):
+        """Seconds until a card forgotten this session is due again, or None"""
+        return self.queue.upcoming(self.clock())
+
+    def _next_due(self):
+        item = self.queue.next(self.clock())
+        if item is None:
+            self.topic = self._card = self._state = None
+            self.state = FINISHED
+            return None
+        self.topic, self._card, self._state = item
+        self.state = ASKING
+        return self._card
+
+    def summary(self):
+        return {'reviewed': self.reviewed, 'grades': dict(self.grades), 'next_review': self.next_review(),
+                'limit_reached': self.queue.remaining == 0 and self.reviewed > 0}
+
+# --- Sessions of a topic, saved to the review store ---
+
+def topic_quiz(topic_dir, kind, store=None, clock=time.time, adaptive=False):
+    """
+    QuizSession over a topic's stored questions whose answers are logged in
+    the review store; adaptive=True gives an adaptive_quiz.AdaptiveQuizSession.
+    """
+    from review_store import get_store
+    from study_store import load_questions
+    topic = Path(topic_dir).name
+    store = store or get_store()
+    if adaptive:
+        from adaptive_quiz import AdaptiveQuizSession, load_estimates
+        item_stats, ability = load_estimates(kind, topic, store)
+        session = AdaptiveQuizSession(kind, load_questions(topic_dir, kind), item_stats, ability, clock=clock)
+    else:
+        session = QuizSession(kind, load_questions(topic_dir, kind), clock=clock)
+
+    def on_answer(kind, item, answer, points):
+        store.record_attempt(session.started, topic, kind, item['question'], answer, points,
+                             now=clock(), expected=expected_answer(kind, item))
+    session.on_answer = on_answer
+    return session
+
+def topic_flashcards(topic_dir, store=None, clock=time.time):
+    """FlashcardSession over a topic's cards that continues and saves their schedule"""
+    from review_store import get_store
+    from study_store import load_cards
+    topic = Path(topic_dir).name
+    store = store or get_store()
+    cards = as_deck('flashcards', load_cards(topic_dir))
+    store.sync_cards(topic, (card_id(card) for card in cards), now=clock())
+    return FlashcardSession(cards, store.load_states(topic),
+                            on_review=lambda state, grade: store.record_review(topic, state, grade), clock=clock)
+
+def due_review(output_dir, store=None, clock=time.time):
+    """ReviewSession over the due cards of every topic in output_dir, after syncing them to the store"""
+    from review_queue import ReviewQueue, sync_topics
+    from review_store import get_store
+    store = store or get_store()
+    sync_topics(output_dir, store)
+    return ReviewSession(ReviewQueue(store, output_dir, now=clock()), clock=clock)
+
+# --- Drivers for automated sessions ---
+
+def run_quiz(session, answer):
+    """Answer every question with answer(prompt, item) -> typed text; returns the summary"""
+    prompt = session.start() if session.state == READY else session.prompt()
+    while prompt is not None:
+        session.submit(answer(prompt, session.current()))
+        prompt = session.next()
+    return session.summary()
+
+def run_flashcards(session, grade, limit=None):
+    """Grade due cards with grade(card, state) -> grade until none is due or limit cards; returns the summary"""
+    card = session.start() if session.state == READY else session.card()
+    while card is not None and (limit is None or session.reviewed < limit):
+        session.reveal()
+        session.grade(grade(card, session.card_state()))
+        card = None if session.state == FINISHED else session.card()
+    return session.summary()
+
+def _run_self_check():
+    """Drive scripted sessions through every transition and check their scores and schedules"""
+    problems = []
+    clock = [1e9]
+    now = lambda: clock[0]
+
+    mcq = [{'question': f"Q{i}?", 'options': [f"{letter}) {letter.lower()}{i}" for letter in OPTION_LETTERS],
+            'correct': "ABCD"[i % 4], 'explanation': ""} for i in range(8)]
+    logged = []
+    session = QuizSession('mcq_questions', mcq, on_answer=lambda *args: logged.append(args), clock=now)
+    for action in (session.next, lambda: session.submit("A"), session.prompt):
+        try:
+            action()
+            problems.append("a ready quiz accepts actions before start()")
+            break
+        except SessionError:
+            pass
+    summary = run_quiz(session, lambda prompt, item: item['correct'] if prompt['number'] % 2 else "a")
+    if (summary['score'], summary['total'], len(logged)) != (4, 8, 8) or session.state != FINISHED:
+        problems.append(f"MCQ quiz scored {summary} with {len(logged)} answers logged")
+
+    session = QuizSession('mcq_questions', mcq[:1])
+    session.start()
+    for text in ("ab", "ABCD", "", "E"):
+        try:
+            session.submit(text)
+            problems.append(f"an MCQ answer of {text!r} is accepted")
+        except ValueError:
+            pass
+    if session.state != ASKING:
+        problems.append("an invalid MCQ answer closes the question")
+
+    session = QuizSession('true_false', [{'question': "S.", 'answer': "False, it is not", 'explanation': ""}])
+    session.start()
+    try:
+        session.submit("maybe")
+        problems.append("an invalid true/false answer is accepted")
+    except ValueError:
+        pass
+    if session.state != ASKING or session.submit(" f ")['verdict'] != CORRECT:
+        problems.append("a true/false answer with a reason is not graded correct")
+    try:
+        session.submit("t")
+        problems.append("a question can be answered twice")
+    except SessionError:
+        pass
+
+    blanks = [{'question': "The ___ makes energy.", 'answer': "mitochondrion", 'explanation': "Powerhouse."},
+              {'question': "Plants make ___.", 'answer': "glucose", 'explanation': ""}]
+    results = []
+    session = QuizSession('fill_blanks', blanks, clock=now)
+    session.start()
+    for text in ("Mitochondria.", "oxygen"):
+        results.append(session.submit(text)['verdict'])
+        session.next()
+    if results != [CORRECT, WRONG] or session.summary()['percentage'] != 50:
+        problems.append(f"fill-in-the-blank answers graded {results}")
+    if QuizSession('fill_blanks', []).start() is not None:
+        problems.append("an empty quiz does not finish at once")
+
+    cards = [{'question': f"Card {i}?", 'answer': f"Answer {i}"} for i in range(20)]
+    reviews = []
+    session = FlashcardSession(cards, on_review=lambda state, grade: reviews.append(grade), clock=now,
+                               rng=random.Random(0))
+    first = session.start()
+    session.shuffle()
+    session.move(3)
+    session.jump_random()
+    if sorted(session.order) != list(range(20)) or first['question'] != "Card 0?":
+        problems.append("browsing the flashcards loses or misorders cards")
+    rng = random.Random(1)
+    summary = run_flashcards(session, lambda card, state: 'again' if rng.random() < 0.2 else 'good')
+    if session.state != FINISHED or summary['due'] != 0 or summary['grades']['good'] != 20 \
+            or len(reviews) != summary['reviewed']:
+        problems.append(f"flashcard session ended with {summary}")
+    clock[0] += 2 * 86400
+    later = FlashcardSession(cards, session.scheduler.states.values(), clock=now)
+    if later.start() is None:
+        problems.append("cards are not due again after two days")
+
+    if problems:
+        print("❌ Study session check failed:")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+    print("✅ Quiz and flashcard sessions move through every state and grade and schedule as expected")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "--self-check":
+        sys.exit(0 if _run_self_check() else 1)
+    print("Usage: python study_session.py --self-check")
@@ -0,0 +1,121 @@
+"""
+Structured question and flashcard store for each topic
+
+Questions and cards are parsed once, when they are generated, and saved
+next to the text files as questions.json and cards.json with a schema
+version. Study sessions load these files directly instead of re-parsing the
+text every time. Topics created before this store existed are migrated on
+first load by parsing their .txt files.
+
+Usage: python study_store.py migrate [output_dir]
+"""
+
+import json
+from pathlib import Path
+
+from generation_engine import write_atomic
+from artifact_parser import parse
+
+SCHEMA_VERSION = 1
+QUESTIONS_FILE = "questions.json"
+CARDS_FILE = "cards.json"
+
+QUESTION_KINDS = ('mcq_questions', 'fill_blanks', 'true_false', 'qa_questions')
+# The terminal app saves its multiple choice questions as questions.txt
+ALIASES = {'questions': 'mcq_questions'}
+
+class StoreError(Exception):
+    """A structured store file is unreadable or has an unknown schema version"""
+
+def parse_artifact(kind, text):
+    """
+    Parse an artifact's text into items.
+
+    Returns (items, errors) where errors describes each block that could not
+    be parsed, so malformed output is visible instead of silently lost.
+    """
+    items, errors = parse(kind, text)
+    return items, [error.to_dict() for error in errors]
+
+def _read(path):
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise StoreError(f"could not read {path}: {e}")
+    if data.get('version') != SCHEMA_VERSION:
+        raise StoreError(f"{path} has schema version {data.get('version')}, expected {SCHEMA_VERSION}")
+    return data
+
+def _store_file(kind):
+    return CARDS_FILE if kind == 'flashcards' else QUESTIONS_FILE
+
+def save_artifact(topic_dir, name, text):
+    """
+    Parse a generated artifact and record it in the topic's structured store.
+
+    Artifacts that are not questions or flashcards are ignored. Returns the
+    number of items stored.
+    """
+    kind = ALIASES.get(name, name)
+    if kind != 'flashcards' and kind not in QUESTION_KINDS:
+        return 0
+    items, errors = parse_artifact(kind, text)
+    path = Path(topic_dir) / _store_file(kind)
+    try:
+        data = _read(path) if path.exists() else {'version': SCHEMA_VERSION}
+    except StoreError:
+        # Rebuilt from the text files on the next migration; start fresh rather than fail generation
+        data = {'version': SCHEMA_VERSION}
+    key = 'cards' if kind == 'flashcards' else kind
+    data[key] = items
+    data.setdefault('errors', {})[key] = errors
+    write_atomic(path, json.dumps(data, indent=1, ensure_ascii=False))
+    return len(items)
+
+def load_cards(topic_dir):
+    """Flashcards of a topic as a list of {'question', 'answer'} dicts"""
+    return _load(Path(topic_dir), 'flashcards', 'cards')
+
+def load_questions(topic_dir, kind):
+    """Questions of one kind ('mcq_questions', 'fill_blanks', 'true_false' or 'qa_questions')"""
+    return _load(Path(topic_dir), kind, kind)
+
+def _load(topic_dir, kind, key):
+    path = topic_dir / _store_file(kind)
+    if path.exists():
+        try:
+            data = _read(path)
+        except StoreError:
+            data = {}
+        if key in data:
+            return data[key]
+    # Not stored yet (or unreadable): migrate from the text file, if there is one
+    for name in [kind] + [alias for alias, target in ALIASES.items() if target == kind]:
+        text_path = topic_dir / f"{name}.txt"
+        if text_path.exists():
+            save_artifact(topic_dir, kind, text_path.read_text(encoding="utf-8"))
+            return _read(path).get(key, [])
+    return []
+
+def migrate_topic(topic_dir):
+    """(Re)build the structured store of a topic from its text files; returns {kind: item count}"""
+    topic_dir = Path(topic_dir)
+    counts = {}
+    for name in ('flashcards',) + QUESTION_KINDS + tuple(ALIASES):
+        text_path = topic_dir / f"{name}.txt"
+        if name in ALIASES and (topic_dir / f"{ALIASES[name]}.txt").exists():
+            continue
+        if text_path.exists():
+            counts[ALIASES.get(name, name)] = save_artifact(topic_dir, name, text_path.read_text(encoding="utf-8"))
+    return counts
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("output")
+        for topic_dir in sorted(p for p in output_dir.iterdir() if p.is_dir()):
+            counts = migrate_topic(topic_dir)
+            if counts:
+                print(f"✅ {topic_dir.name}: " + ", ".join(f"{count} {kind}" for kind, count in counts.items()))
+    else:
+        print("Usage: python study_store.py migrate [output_dir]")